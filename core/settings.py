@@ -26,6 +26,52 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 NEWSAPI_API_KEY = os.getenv("NEWSAPI_API_KEY", "")
 NEWSDATA_API_KEY = os.getenv("NEWSDATA_API_KEY", "")
 
+# Coleta de notícias: conexões simultâneas (total e por host) e timeout em segundos
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "20"))
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST", "2"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "20"))
+# Clientes buscados em paralelo e tempo máximo (segundos) de uma coleta; passado
+# o limite, clientes que ainda não começaram ficam para a próxima (0 = sem limite)
+FETCH_CLIENT_CONCURRENCY = int(os.getenv("FETCH_CLIENT_CONCURRENCY", "4"))
+FETCH_RUN_BUDGET = float(os.getenv("FETCH_RUN_BUDGET", "0"))
+# Cota das APIs (requisições, por segundos), dividida entre todos os workers, e
+# quanto esperar por uma ficha antes de desistir; páginas por busca
+API_RATE_LIMITS = {
+    "newsapi": (int(os.getenv("NEWSAPI_RATE", "100")), 24 * 3600),
+    "newsdata": (int(os.getenv("NEWSDATA_RATE", "30")), 15 * 60),
+}
+API_RATE_MAX_WAIT = float(os.getenv("API_RATE_MAX_WAIT", "30"))
+API_MAX_PAGES = int(os.getenv("API_MAX_PAGES", "5"))
+# NewsData/NewsAPI buscam só desde a última coleta do cliente, menos esta folga
+FETCH_WINDOW_OVERLAP_HOURS = float(os.getenv("FETCH_WINDOW_OVERLAP_HOURS", "2"))
+# Feeds RSS (modelo Feed): teto do intervalo entre leituras quando o feed falha
+# ou não traz novidade, e quando desativá-lo de vez
+FEED_MAX_INTERVAL_HOURS = float(os.getenv("FEED_MAX_INTERVAL_HOURS", "24"))
+FEED_DISABLE_AFTER_FAILURES = int(os.getenv("FEED_DISABLE_AFTER_FAILURES", "10"))
+FEED_STALE_DAYS = int(os.getenv("FEED_STALE_DAYS", "60"))
+
+# Extração do texto completo (manage.py extract_articles). Com EXTRACT_ENABLED,
+# cada busca feita pelo worker agenda uma passada de até EXTRACT_BUDGET notícias
+EXTRACT_ENABLED = os.getenv("EXTRACT_ENABLED", "False") == "True"
+EXTRACT_BUDGET = int(os.getenv("EXTRACT_BUDGET", "200"))
+EXTRACT_MAX_CONNECTIONS = int(os.getenv("EXTRACT_MAX_CONNECTIONS", "8"))
+
+# Métricas das coletas (FetchRun): dias guardados e token do endpoint /metrics
+# (o Prometheus manda "Authorization: Bearer <token>"; vazio = só staff logado)
+FETCH_RUNS_KEEP_DAYS = int(os.getenv("FETCH_RUNS_KEEP_DAYS", "30"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Cache de respostas de feeds e APIs: "filesystem", "sqlite" ou "django" (usa CACHES)
+NEWSCLIP_CACHE_BACKEND = os.getenv("NEWSCLIP_CACHE_BACKEND", "filesystem")
+NEWSCLIP_CACHE_LOCATION = os.getenv("NEWSCLIP_CACHE_LOCATION", "/tmp/newsclip_cache")
+NEWSCLIP_CACHE_MAX_ENTRIES = int(os.getenv("NEWSCLIP_CACHE_MAX_ENTRIES", "5000"))
+NEWSCLIP_CACHE_PRUNE_INTERVAL = int(os.getenv("NEWSCLIP_CACHE_PRUNE_INTERVAL", "300"))
+# validade (segundos) por tipo de resposta
+NEWSCLIP_CACHE_TTLS = {
+    "feeds": int(os.getenv("NEWSCLIP_CACHE_FEEDS_TTL", "600")),
+    "api": int(os.getenv("NEWSCLIP_CACHE_API_TTL", str(6 * 3600))),
+}
+
 ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "").split(",")
 ALLOWED_HOSTS += [".onrender.com"]
 GPTNEO_MODEL = os.getenv("GPTNEO_MODEL", "distilgpt2")
@@ -104,6 +150,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+# Motor padrão dos relatórios PDF: "pdfkit" (wkhtmltopdf) ou "reportlab"
+REPORT_PDF_ENGINE = os.getenv("REPORT_PDF_ENGINE", "pdfkit")
 WKHTMLTOPDF_CMD = os.getenv(
     "WKHTMLTOPDF_CMD",
     r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"  # Windows
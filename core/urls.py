@@ -19,6 +19,7 @@ from newsclip.views import (
     client_reports,
     generate_report_view,
     download_report,
+    job_status_view,
 )
 
 urlpatterns = [
@@ -55,6 +56,11 @@ urlpatterns = [
     path('dashboard/<int:client_id>/news/bulk-update/', login_required(bulk_update_news), name='bulk_update_news'),
     path('noticias/todos/', views.BuscarTodasNoticiasView.as_view(), name='buscar_todas_noticias'),
     path('api/noticias/cliente/<int:pk>/', views.noticias_cliente_json, name='noticias_cliente_json'),
+    path('jobs/<int:job_id>/status/', login_required(job_status_view), name='job_status'),
+
+    # Coletas: painel das fontes e métricas para o Prometheus
+    path('fetch-runs/', views.fetch_runs_view, name='fetch_runs'),
+    path('metrics', views.metrics_view, name='metrics'),
    
     # Relatórios
     path('dashboard/<int:client_id>/reports/',            login_required(client_reports),          name='client_reports'),
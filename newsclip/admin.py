@@ -1,14 +1,132 @@
 from django.contrib import admin
-from .models import Client, Article
+from .models import (
+    Client, Article, ArticleDailyStat, Feed, FeedState, FetchRun, FetchSourceStat, FetchWatermark, Job,
+    RateBucket, ResolvedURL, Story, Topic,
+)
+from .rollup import apply_deltas, article_deltas, delete_articles, queryset_deltas
+from .search import index_stories, unindex_stories
 
 @admin.register(Client)
 class ClientAdmin(admin.ModelAdmin):
-    list_display = ("name",)
+    list_display = ("name", "priority", "sources")
+    list_editable = ("priority",)
+    ordering = ("-priority", "name")
     filter_horizontal = ("users",)
 
+@admin.register(Topic)
+class TopicAdmin(admin.ModelAdmin):
+    # alterações só valem para as notícias novas; as antigas: manage.py reclassify_topics
+    list_display = ("name", "active")
+    list_filter = ("active",)
+
+@admin.register(Story)
+class StoryAdmin(admin.ModelAdmin):
+    list_display = ("title", "published_at", "source", "topic")
+    search_fields = ("title", "url")
+
+    # data/fonte/tópico entram na chave do rollup de todos os clientes ligados
+    def save_model(self, request, obj, form, change):
+        deltas = queryset_deltas(obj.links.all(), -1) if change else None
+        super().save_model(request, obj, form, change)
+        index_stories([obj])
+        if change:
+            # published_at é copiado nas ligações
+            obj.links.update(published_at=obj.published_at)
+            deltas.update(queryset_deltas(obj.links.all()))
+            apply_deltas(deltas)
+
+    def delete_model(self, request, obj):
+        delete_articles(obj.links.all())
+        unindex_stories([obj.pk])
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        delete_articles(Article.objects.filter(story__in=queryset))
+        unindex_stories(queryset.values_list("pk", flat=True))
+        super().delete_queryset(request, queryset)
+
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
     list_display = ("title", "client", "published_at", "source")
     list_filter = ("client",)
-    search_fields = ("title",)
+    list_select_related = ("client", "story")
+    search_fields = ("story__title",)
+    raw_id_fields = ("story",)
+
+    # mantém o rollup diário (ArticleDailyStat) em dia com edições pelo admin
+    def save_model(self, request, obj, form, change):
+        deltas = article_deltas([obj])
+        if change:
+            # versão anterior, ainda no banco
+            deltas.update(article_deltas(Article.objects.filter(pk=obj.pk), -1))
+        super().save_model(request, obj, form, change)
+        apply_deltas(deltas)
+
+    def delete_model(self, request, obj):
+        apply_deltas(article_deltas([obj], -1))
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        delete_articles(queryset)
+
+@admin.register(ArticleDailyStat)
+class ArticleDailyStatAdmin(admin.ModelAdmin):
+    list_display = ("client", "day", "source", "topic", "excluded", "count")
+    list_filter = ("client", "excluded")
+
+@admin.register(Feed)
+class FeedAdmin(admin.ModelAdmin):
+    list_display = ("url", "region", "category", "interval", "active", "next_poll_at", "failures",
+                    "empty_polls", "last_new_at", "disabled_reason")
+    list_editable = ("interval",)
+    list_filter = ("active", "region", "category")
+    search_fields = ("url",)
+    actions = ["reactivate"]
+
+    @admin.action(description="Reativar e ler na próxima coleta")
+    def reactivate(self, request, queryset):
+        queryset.update(active=True, disabled_reason="", failures=0, empty_polls=0, next_poll_at=None)
+
+@admin.register(FeedState)
+class FeedStateAdmin(admin.ModelAdmin):
+    list_display = ("url", "last_status", "last_entry_at", "checked_at")
+    search_fields = ("url",)
+
+@admin.register(ResolvedURL)
+class ResolvedURLAdmin(admin.ModelAdmin):
+    list_display = ("url", "resolved_url", "status", "resolved_at")
+    search_fields = ("url", "resolved_url")
+
+@admin.register(FetchWatermark)
+class FetchWatermarkAdmin(admin.ModelAdmin):
+    # apagar a linha faz a próxima coleta buscar a janela completa de novo
+    list_display = ("client", "source", "fetched_until", "updated_at")
+    list_filter = ("source",)
+
+@admin.register(RateBucket)
+class RateBucketAdmin(admin.ModelAdmin):
+    list_display = ("name", "tokens", "paused_until")
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("kind", "client", "status", "progress", "attempts", "created_at", "finished_at")
+    list_filter = ("kind", "status")
+
+class FetchSourceStatInline(admin.TabularInline):
+    model = FetchSourceStat
+    extra = 0
+    can_delete = False
+    fields = ("kind", "url", "client", "http_status", "error", "total_ms", "parse_ms", "entries", "inserted")
+    readonly_fields = fields
+
+@admin.register(FetchRun)
+class FetchRunAdmin(admin.ModelAdmin):
+    list_display = ("started_at", "status", "duration", "clients", "skipped", "inserted", "duplicates")
+    list_filter = ("status",)
+    inlines = [FetchSourceStatInline]
 
+@admin.register(FetchSourceStat)
+class FetchSourceStatAdmin(admin.ModelAdmin):
+    list_display = ("run", "kind", "url", "client", "http_status", "total_ms", "entries", "inserted")
+    list_filter = ("kind",)
+    search_fields = ("url",)
@@ -0,0 +1,321 @@
+# newsclip/apis.py
+#
+# Conectores das APIs de notícias (NewsData, NewsAPI): paginam os resultados,
+# respeitam a cota de cada provedor com um balde de fichas guardado no banco
+# (vale para todas as threads e processos), esperam e tentam de novo em 429 e
+# 5xx, e juntam as buscas de vários clientes numa query só enquanto couber no
+# limite de tamanho, para render mais resultados por crédito.
+
+import json
+import random
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote_plus
+
+import requests
+from django.conf import settings
+from django.db.models import F
+
+from newsclip.cache import get_cache
+from newsclip.matching import KeywordMatcher
+from newsclip.models import RateBucket
+
+
+# (requisições, por segundos) quando API_RATE_LIMITS não define a API
+DEFAULT_RATE = (30, 900)
+MAX_ATTEMPTS = 4
+MAX_BACKOFF = 60
+
+
+class QuotaExhausted(Exception):
+    """A cota acabou e só volta depois do tempo que aceitamos esperar"""
+
+
+class TokenBucket:
+    """
+    `capacity` requisições por `period` segundos. O estado fica numa linha de
+    RateBucket, atualizada com controle de versão (sem lock), então vários
+    workers dividem a mesma cota.
+    """
+
+    def __init__(self, name, capacity, period):
+        self.name = name
+        self.capacity = capacity
+        self.rate = capacity / period
+
+    @classmethod
+    def for_api(cls, name):
+        capacity, period = getattr(settings, "API_RATE_LIMITS", {}).get(name, DEFAULT_RATE)
+        return cls(name, capacity, period)
+
+    def _bucket(self, now):
+        bucket, _ = RateBucket.objects.get_or_create(
+            name=self.name, defaults={"tokens": self.capacity, "updated_at": now}
+        )
+        return bucket
+
+    def acquire(self, max_wait=None):
+        """Consome uma ficha, esperando até `max_wait` segundos; False se não der"""
+        if max_wait is None:
+            max_wait = getattr(settings, "API_RATE_MAX_WAIT", 30)
+        deadline = time.monotonic() + max_wait
+        while True:
+            now = time.time()
+            bucket = self._bucket(now)
+            if bucket.paused_until > now:
+                wait = bucket.paused_until - now
+                if time.monotonic() + wait > deadline:
+                    return False
+                time.sleep(wait)
+                continue
+            tokens = min(self.capacity, bucket.tokens + max(now - bucket.updated_at, 0) * self.rate)
+            if tokens >= 1:
+                taken = RateBucket.objects.filter(pk=bucket.pk, version=bucket.version).update(
+                    tokens=tokens - 1, updated_at=now, version=F("version") + 1
+                )
+                if taken:
+                    return True
+                # outro worker pegou uma ficha entre a leitura e o update: relê
+                continue
+            wait = (1 - tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """O provedor respondeu 429: ninguém pede de novo pelos próximos `seconds`"""
+        until = time.time() + seconds
+        self._bucket(time.time())
+        RateBucket.objects.filter(name=self.name, paused_until__lt=until).update(paused_until=until)
+
+
+def _retry_after(resp):
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return None
+
+
+def get_with_backoff(url, bucket, params=None, headers=None, timeout=30):
+    """
+    GET com uma ficha do balde por tentativa. 429, 5xx e erros de conexão são
+    tentados de novo com espera exponencial (ou o Retry-After do provedor);
+    devolve a última resposta. QuotaExhausted se a cota não voltar a tempo.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        if not bucket.acquire():
+            raise QuotaExhausted(f"cota da {bucket.name} esgotada")
+        delay = 2 ** attempt + random.random()
+        try:
+            resp = requests.get(url, params=params, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt + 1 == MAX_ATTEMPTS:
+                raise
+        else:
+            if resp.status_code != 429 and resp.status_code < 500:
+                return resp
+            delay = _retry_after(resp) or delay
+            if resp.status_code == 429:
+                bucket.pause(delay)
+            if attempt + 1 == MAX_ATTEMPTS:
+                return resp
+        time.sleep(min(delay, MAX_BACKOFF))
+
+
+def combine_queries(items, max_length):
+    """
+    Agrupa [(chave, query)] em [(chaves, query combinada)] com "(q1) OR (q2)…"
+    sem passar de `max_length` caracteres. Uma query que sozinha já passa do
+    limite vai sozinha (a API decide o que fazer com ela).
+    """
+    batches = []
+    keys, queries, length = [], [], 0
+    for key, query in items:
+        extra = len(query) + 2 + (4 if queries else 0)
+        if queries and length + extra > max_length:
+            batches.append((keys, queries))
+            keys, queries, length = [], [], 0
+            extra = len(query) + 2
+        keys.append(key)
+        queries.append(query)
+        length += extra
+    if queries:
+        batches.append((keys, queries))
+    return [
+        (keys, queries[0] if len(queries) == 1 else " OR ".join(f"({q})" for q in queries))
+        for keys, queries in batches
+    ]
+
+
+def assign_to_clients(entries, clients):
+    """
+    Preenche entry["clients"] nas entradas de uma busca combinada: os clientes
+    cujas keywords aparecem no título ou na descrição. Devolve só as que
+    ficaram com algum cliente.
+    """
+    if len(clients) == 1:
+        for entry in entries:
+            entry["clients"] = {clients[0].id}
+        return list(entries)
+    matcher = KeywordMatcher.from_clients(clients)
+    for entry in entries:
+        entry["clients"] = matcher.match(f"{entry['title']} {entry['description']}")
+    return [e for e in entries if e["clients"]]
+
+
+class APIConnector:
+    """Busca paginada; as subclasses sabem montar a página e ler a resposta"""
+    name = ""
+    url = ""
+    max_query_length = 500
+
+    def __init__(self, api_key, max_pages=None):
+        self.api_key = api_key
+        self.max_pages = max_pages or getattr(settings, "API_MAX_PAGES", 5)
+        self.bucket = TokenBucket.for_api(self.name)
+        self.cache = get_cache("api")
+
+    def request(self, params):
+        """(status, corpo, veio do cache) de uma página; páginas em cache não gastam cota"""
+        key = self.cache.make_key(self.url, *sorted(params.items()))
+        raw = self.cache.get(key)
+        if raw is not None:
+            return 200, raw, True
+        resp = get_with_backoff(self.url, self.bucket, params=params, headers=self.headers())
+        if resp.ok:
+            self.cache.set(key, resp.content)
+        return resp.status_code, resp.content, False
+
+    def search(self, query, since, until, **filters):
+        """
+        Todas as páginas (até max_pages) de uma busca. Devolve um dict com
+        entries, pages, status, bytes, cached, elapsed, error e complete (False
+        se parou no meio: erro ou cota).
+        """
+        result = {"entries": [], "pages": 0, "status": None, "bytes": 0, "cached": True,
+                  "elapsed": 0.0, "error": "", "complete": False, "url": self.search_url(query)}
+        started = time.monotonic()
+        page = None
+        try:
+            while result["pages"] < self.max_pages:
+                status, body, cached = self.request(self.params(query, since, until, page, **filters))
+                result["status"] = status
+                result["bytes"] += len(body)
+                result["cached"] = result["cached"] and cached
+                data = json.loads(body or b"{}")
+                if status != 200:
+                    result["complete"] = self.is_last_page_error(status, data)
+                    if not result["complete"]:
+                        result["error"] = f"HTTP {status}: {self.error_message(data)}"
+                    break
+                result["pages"] += 1
+                result["entries"] += [self.normalize(item) for item in self.items(data)]
+                page = self.next_page(data, page, len(result["entries"]))
+                if page is None:
+                    result["complete"] = True
+                    break
+        except (QuotaExhausted, requests.RequestException, ValueError) as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["elapsed"] = time.monotonic() - started
+        return result
+
+    def search_url(self, query):
+        return f"{self.url}?q={quote_plus(query)}"
+
+    def headers(self):
+        return {}
+
+    def is_last_page_error(self, status, data):
+        return False
+
+    def error_message(self, data):
+        return data.get("message", "")
+
+
+class NewsDataAPI(APIConnector):
+    name = "newsdata"
+    url = "https://newsdata.io/api/1/latest"
+    max_query_length = 512
+
+    def params(self, query, since, until, page, **filters):
+        params = {
+            "apikey": self.api_key,
+            "q": query,
+            "language": "pt",
+            "from_date": since.strftime("%Y-%m-%d"),
+            "to_date": until.strftime("%Y-%m-%d"),
+        }
+        if page:
+            params["page"] = page
+        return params
+
+    def items(self, data):
+        return data.get("results") or []
+
+    def next_page(self, data, page, seen):
+        return data.get("nextPage") or None
+
+    def error_message(self, data):
+        results = data.get("results")
+        return results.get("message", "") if isinstance(results, dict) else ""
+
+    def normalize(self, item):
+        return {
+            "title": (item.get("title") or "")[:300],
+            "url": item.get("link") or item.get("url"),
+            "published": item.get("pubDate"),
+            "source": item.get("source_id") or item.get("source_name") or "",
+            "description": item.get("description") or "",
+        }
+
+
+class NewsAPI(APIConnector):
+    name = "newsapi"
+    url = "https://newsapi.org/v2/everything"
+    page_size = 100
+
+    def headers(self):
+        return {"X-Api-Key": self.api_key}
+
+    def params(self, query, since, until, page, domains=None):
+        params = {
+            "q": query,
+            "language": "pt",
+            "from": since.strftime("%Y-%m-%d"),
+            "to": until.strftime("%Y-%m-%d"),
+            "sortBy": "relevancy",
+            "pageSize": self.page_size,
+            "page": page or 1,
+        }
+        if domains:
+            params["domains"] = domains
+        return params
+
+    def items(self, data):
+        return data.get("articles") or []
+
+    def next_page(self, data, page, seen):
+        items = len(data.get("articles") or [])
+        if items < self.page_size or seen >= (data.get("totalResults") or 0):
+            return None
+        return (page or 1) + 1
+
+    def is_last_page_error(self, status, data):
+        # o plano gratuito só entrega os primeiros 100 resultados
+        return data.get("code") == "maximumResultsReached"
+
+    def normalize(self, item):
+        source = item.get("source")
+        return {
+            "title": (item.get("title") or "")[:300],
+            "url": item.get("url"),
+            "published": item.get("publishedAt") or "",
+            "source": source.get("name", "") if isinstance(source, dict) else "",
+            "description": item.get("description") or "",
+        }
@@ -0,0 +1,277 @@
+# newsclip/cache.py
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+
+# —————————————————————————————————————————
+# Backends: guardam bytes por chave com instante de gravação e de último acesso
+# —————————————————————————————————————————
+
+class FileSystemBackend:
+    """
+    Um arquivo por chave. A gravação é atômica (arquivo temporário + rename);
+    o mtime marca quando a entrada foi gravada e o atime o último acesso (LRU).
+    """
+
+    def __init__(self, location):
+        self.location = location
+        os.makedirs(self.location, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.location, key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path, (time.time(), stat.st_mtime))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime, value
+
+    def set(self, key, value):
+        fd, tmp = tempfile.mkstemp(dir=self.location, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, ttl, max_entries):
+        now = time.time()
+        alive, evicted = [], 0
+        with os.scandir(self.location) as it:
+            for entry in it:
+                if entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > ttl:
+                    self.delete(entry.name)
+                    evicted += 1
+                else:
+                    alive.append((stat.st_atime, entry.name))
+        if max_entries and len(alive) > max_entries:
+            alive.sort()
+            for _, name in alive[:len(alive) - max_entries]:
+                self.delete(name)
+                evicted += 1
+        return evicted
+
+
+class SQLiteBackend:
+    """Tabela única num arquivo SQLite à parte do banco do Django"""
+
+    def __init__(self, location, table):
+        os.makedirs(os.path.dirname(location) or ".", exist_ok=True)
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(location, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB, stored_at REAL, accessed_at REAL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)"
+        )
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT stored_at, value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                self._conn.execute(
+                    f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key)
+                )
+        return row
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), now, now),
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def prune(self, ttl, max_entries):
+        with self._lock:
+            evicted = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE stored_at < ?", (time.time() - ttl,)
+            ).rowcount
+            if max_entries:
+                evicted += self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at DESC "
+                    "LIMIT -1 OFFSET ?)",
+                    (max_entries,),
+                ).rowcount
+        return evicted
+
+
+class DjangoCacheBackend:
+    """Usa um cache do Django (settings.CACHES); expiração e limite ficam por conta dele"""
+
+    def __init__(self, alias, prefix, ttl):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key):
+        return self.cache.get(f"{self.prefix}:{key}")
+
+    def set(self, key, value):
+        self.cache.set(f"{self.prefix}:{key}", (time.time(), value), self.ttl)
+
+    def delete(self, key):
+        self.cache.delete(f"{self.prefix}:{key}")
+
+    def prune(self, ttl, max_entries):
+        return 0
+
+
+# —————————————————————————————————————————
+# Cache de respostas com TTL, limite LRU, limpeza em segundo plano e métricas
+# —————————————————————————————————————————
+
+class ResponseCache:
+
+    def __init__(self, backend, ttl, max_entries=None, prune_interval=300):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        self.hits = self.misses = self.sets = self.evictions = 0
+        self._lock = threading.Lock()
+        self._pruner = None
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha1("\x1f".join(str(p) for p in parts).encode()).hexdigest()
+
+    def get(self, key):
+        self._start_pruner()
+        found = self.backend.get(key)
+        if found is not None and time.time() - found[0] <= self.ttl:
+            self._incr("hits")
+            return found[1]
+        if found is not None:
+            self.backend.delete(key)
+        self._incr("misses")
+        return None
+
+    def set(self, key, value):
+        self._start_pruner()
+        self.backend.set(key, bytes(value))
+        self._incr("sets")
+
+    def prune(self):
+        evicted = self.backend.prune(self.ttl, self.max_entries)
+        self._incr("evictions", evicted)
+        return evicted
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def _incr(self, counter, n=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def _start_pruner(self):
+        if self._pruner is not None or not self.prune_interval:
+            return
+        with self._lock:
+            if self._pruner is not None:
+                return
+            self._pruner = threading.Thread(target=self._prune_loop, daemon=True)
+            self._pruner.start()
+
+    def _prune_loop(self):
+        while True:
+            try:
+                self.prune()
+            except Exception:
+                pass
+            time.sleep(self.prune_interval)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace):
+    """
+    Cache compartilhado do processo para um namespace ("feeds", "api"…),
+    configurado por NEWSCLIP_CACHE_* no settings.
+    """
+    with _caches_lock:
+        if namespace not in _caches:
+            backend_name = getattr(settings, "NEWSCLIP_CACHE_BACKEND", "filesystem")
+            location = getattr(settings, "NEWSCLIP_CACHE_LOCATION", "/tmp/newsclip_cache")
+            ttl = getattr(settings, "NEWSCLIP_CACHE_TTLS", {}).get(namespace, 600)
+            if backend_name == "sqlite":
+                backend = SQLiteBackend(os.path.join(location, "cache.sqlite3"), f"cache_{namespace}")
+            elif backend_name == "django":
+                backend = DjangoCacheBackend(
+                    getattr(settings, "NEWSCLIP_CACHE_ALIAS", "default"), f"newsclip:{namespace}", ttl
+                )
+            else:
+                backend = FileSystemBackend(os.path.join(location, namespace))
+            _caches[namespace] = ResponseCache(
+                backend,
+                ttl=ttl,
+                max_entries=getattr(settings, "NEWSCLIP_CACHE_MAX_ENTRIES", 5000),
+                prune_interval=getattr(settings, "NEWSCLIP_CACHE_PRUNE_INTERVAL", 300),
+            )
+        return _caches[namespace]
+
+
+def cache_stats(since=None):
+    """
+    Métricas de todos os caches já usados neste processo (acumuladas desde
+    que ele começou). Com `since`, um cache_stats() anterior, só o que
+    aconteceu desde então: o worker de jobs roda várias coletas no mesmo
+    processo.
+    """
+    stats = {name: cache.stats() for name, cache in _caches.items()}
+    for name, st in stats.items():
+        before = (since or {}).get(name, {})
+        for counter in ("hits", "misses", "sets", "evictions"):
+            st[counter] -= before.get(counter, 0)
+        total = st["hits"] + st["misses"]
+        st["hit_rate"] = st["hits"] / total if total else 0.0
+    return stats
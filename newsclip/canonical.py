@@ -0,0 +1,164 @@
+# newsclip/canonical.py
+#
+# Forma canônica das URLs de artigos, aplicada antes de qualquer deduplicação:
+# o mesmo artigo com ?utm_source=… ou via redirect do Google News precisa
+# virar a mesma string. http e https da mesma página são comparados pela
+# url_key (sem o esquema), já que a URL gravada mantém o esquema original.
+#
+# Na coleta os wrappers de redirect só são resolvidos se isso não custar
+# rede (tabela ResolvedURL ou id do Google News decodificável); os demais
+# ficam como vieram e são resolvidos pela extração (newsclip.extraction).
+
+import base64
+import binascii
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.utils import timezone
+
+from newsclip.fetch_engine import fetch_all
+from newsclip.models import ResolvedURL
+
+
+# parâmetros de rastreamento/campanha que não mudam o conteúdo
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "ref_url", "referrer", "ocid", "cmpid",
+    "xtor", "amp_js_v", "_ga", "_gl", "s_cid",
+    "oc",  # Google News
+}
+TRACKING_PREFIXES = ("utm_", "at_", "pk_", "__twitter", "hsa_")
+
+# hosts que só redirecionam para o artigo de verdade
+REDIRECT_HOSTS = {"news.google.com", "feedproxy.google.com", "t.co", "bit.ly", "ow.ly", "lnkd.in"}
+
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+_URL_IN_BYTES_RE = re.compile(rb"https?://[\x21-\x7e]+")
+_GOOGLE_AU_RE = re.compile(r'data-n-au="([^"]+)"')
+
+
+def _is_tracking(param):
+    p = param.lower()
+    return p in TRACKING_PARAMS or p.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url):
+    """
+    Esquema e host em minúsculas, sem porta padrão nem ponto final, sem
+    fragmento e sem parâmetros de rastreamento (os demais em ordem).
+    URLs que não são http(s) voltam como vieram.
+    """
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return url
+
+    host = parts.hostname.rstrip(".")
+    if port and str(port) != _DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(k)
+    )
+    path = parts.path or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def url_key(url):
+    """Chave de deduplicação (Story.url_key): a URL canônica sem o esquema"""
+    canonical = canonical_url(url)
+    scheme, sep, rest = canonical.partition("://")
+    return rest if sep and scheme in _DEFAULT_PORTS else canonical
+
+
+def needs_resolution(url):
+    return (urlsplit(url).hostname or "") in REDIRECT_HOSTS
+
+
+def decode_google_news_url(url):
+    """
+    Links antigos do Google News (/rss/articles/CBMi…) trazem a URL real
+    codificada em base64 no próprio id; devolve None se não for o caso.
+    """
+    parts = urlsplit(url)
+    if parts.hostname != "news.google.com" or "/articles/" not in parts.path:
+        return None
+    token = parts.path.rsplit("/", 1)[-1]
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    match = _URL_IN_BYTES_RE.search(raw)
+    return match.group().decode() if match else None
+
+
+def _resolved_from_response(result):
+    """URL final de uma requisição que seguiu os redirects (None se continuou no wrapper)"""
+    if not result["status"] or result["status"] >= 400:
+        return None
+    final = result.get("final_url") or result["url"]
+    if not needs_resolution(final):
+        return final
+    # páginas do Google News que não redirecionam, mas trazem o destino no HTML
+    match = _GOOGLE_AU_RE.search(result["content"].decode("utf-8", "replace"))
+    return match.group(1) if match else None
+
+
+def resolve_urls(urls, network=True):
+    """
+    Mapa {url: url canônica final} para uma lista de URLs. Wrappers de redirect
+    (Google News, encurtadores) são resolvidos uma única vez: o resultado fica
+    em ResolvedURL e as próximas execuções só consultam a tabela. Com
+    network=False (a coleta) os que precisariam de requisição ficam como estão.
+    """
+    canonical = {url: canonical_url(url) for url in urls}
+    wrappers = {c for c in canonical.values() if needs_resolution(c)}
+    memo = dict(
+        ResolvedURL.objects.filter(url__in=wrappers).values_list("url", "resolved_url")
+    )
+
+    new = {}
+    to_fetch = []
+    for wrapper in wrappers - memo.keys():
+        decoded = decode_google_news_url(wrapper)
+        if decoded:
+            new[wrapper] = (canonical_url(decoded), None)
+        elif network:
+            to_fetch.append(wrapper)
+    results = fetch_all(
+        {"url": w, "delay": 0.25, "timeout": 10} for w in to_fetch
+    )
+    for wrapper, result in zip(to_fetch, results):
+        if result["error"]:
+            # falha de rede: usa o wrapper agora e tenta de novo na próxima execução
+            continue
+        final = _resolved_from_response(result)
+        # sem destino: fica o próprio wrapper (e não tenta de novo)
+        new[wrapper] = (canonical_url(final) if final else wrapper, result["status"])
+
+    if new:
+        now = timezone.now()
+        # ignore_conflicts: outro worker pode ter resolvido a mesma URL ao mesmo tempo
+        ResolvedURL.objects.bulk_create(
+            [
+                ResolvedURL(url=w, resolved_url=r, status=status, resolved_at=now)
+                for w, (r, status) in new.items()
+            ],
+            ignore_conflicts=True,
+        )
+        memo.update({w: r for w, (r, _) in new.items()})
+
+    return {url: memo.get(c, c) for url, c in canonical.items()}
+
+
+def canonicalize_entries(entries, network=False):
+    """Troca entry['url'] pela forma canônica resolvida, em lote"""
+    resolved = resolve_urls({e["url"] for e in entries}, network=network)
+    for entry in entries:
+        entry["url"] = resolved[entry["url"]]
+    return entries
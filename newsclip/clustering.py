@@ -0,0 +1,143 @@
+# newsclip/clustering.py
+#
+# Agrupamento de quase-duplicatas: a mesma matéria de agência publicada por
+# vários portais (ou vinda por redirects do Google News) cai no mesmo grupo.
+# Cada notícia (Story) recebe um SimHash de 64 bits do título + resumo normalizados;
+# dois artigos são do mesmo grupo se os hashes diferem em até MAX_DISTANCE bits.
+# O índice LSH divide o hash em BANDS faixas: com MAX_DISTANCE < BANDS, dois
+# hashes próximos têm pelo menos uma faixa idêntica, então a busca só olha os
+# artigos de um punhado de baldes (O(1) esperado por artigo).
+
+import hashlib
+import re
+from datetime import timedelta
+
+from django.db.models import Count, F, Window
+from django.db.models.functions import Coalesce, RowNumber
+from django.utils import timezone
+
+from newsclip.matching import tokenize
+
+
+BITS = 64
+BANDS = 4
+BAND_BITS = BITS // BANDS
+MAX_DISTANCE = 3
+# artigos mais antigos que isso não entram no índice de novos grupos
+WINDOW_DAYS = 3
+
+_MASK = (1 << BITS) - 1
+_BAND_MASK = (1 << BAND_BITS) - 1
+# " - G1", " | UOL": nome do portal no fim do título
+_SOURCE_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[^-|–—]{2,60}$")
+
+
+# palavras que não ajudam a distinguir notícias (já sem acento)
+STOPWORDS = frozenset("""
+    a o as os um uma uns umas de do da dos das em no na nos nas ao aos e ou
+    que com por para pelo pela pelos pelas se sem sob sobre entre apos ate
+    mais menos muito ja nao sim foi ser sao esta este essa esse isso
+""".split())
+
+
+def normalize_text(title, summary=""):
+    """Título e resumo sem o sufixo do portal; o resumo só entra se não repetir o título"""
+    title = _SOURCE_SUFFIX_RE.sub("", (title or "").strip())
+    summary = _SOURCE_SUFFIX_RE.sub("", (summary or "").strip().rstrip("."))
+    if summary == title.rstrip("."):
+        summary = ""
+    return f"{title} {summary}"
+
+
+def simhash(text):
+    """
+    SimHash de 64 bits das palavras do texto (inteiro com sinal, cabe num
+    BigIntegerField); None se não sobrar nenhuma palavra significativa.
+    """
+    words = set(tokenize(text)) - STOPWORDS
+    if not words:
+        return None
+    weights = [0] * BITS
+    for word in words:
+        h = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "big")
+        for bit in range(BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    value = sum(1 << bit for bit, w in enumerate(weights) if w > 0)
+    return value - (1 << BITS) if value >= 1 << (BITS - 1) else value
+
+
+def article_simhash(story):
+    return simhash(normalize_text(story.title, story.summary))
+
+
+def hamming(a, b):
+    return bin((a ^ b) & _MASK).count("1")
+
+
+class ClusterIndex:
+    """Índice LSH em memória: simhash -> grupo (o simhash do primeiro artigo do grupo)"""
+
+    def __init__(self):
+        self._bands = [{} for _ in range(BANDS)]
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._bands[0].values())
+
+    @staticmethod
+    def _keys(h):
+        h &= _MASK
+        return [(h >> (i * BAND_BITS)) & _BAND_MASK for i in range(BANDS)]
+
+    def add(self, h, cluster):
+        for band, key in zip(self._bands, self._keys(h)):
+            band.setdefault(key, []).append((h, cluster))
+
+    def find(self, h):
+        """Grupo de um hash a até MAX_DISTANCE bits, ou None"""
+        for band, key in zip(self._bands, self._keys(h)):
+            for other, cluster in band.get(key, ()):
+                if hamming(h, other) <= MAX_DISTANCE:
+                    return cluster
+        return None
+
+    def assign(self, h):
+        """Grupo do hash; se não houver nenhum parecido, o hash funda um grupo novo"""
+        if h is None:
+            return None
+        cluster = self.find(h)
+        if cluster is None:
+            cluster = h
+        self.add(h, cluster)
+        return cluster
+
+    @classmethod
+    def recent(cls, days=WINDOW_DAYS):
+        """Índice com as notícias gravadas nos últimos `days` dias"""
+        from newsclip.models import Story
+
+        index = cls()
+        rows = (
+            Story.objects
+            .filter(created_at__gte=timezone.now() - timedelta(days=days), simhash__isnull=False)
+            .order_by("id")
+            .values_list("simhash", "cluster")
+        )
+        for h, cluster in rows.iterator(chunk_size=5000):
+            index.add(h, cluster if cluster is not None else h)
+        return index
+
+
+def collapse_clusters(qs):
+    """
+    Um artigo por grupo (o primeiro publicado), anotado com `copies`: quantos
+    artigos do queryset caem no mesmo grupo. Artigos sem grupo ficam sozinhos.
+    """
+    group = Coalesce(F("story__cluster"), F("story_id"))
+    return qs.annotate(
+        cluster_rank=Window(
+            RowNumber(),
+            partition_by=[group],
+            order_by=[F("published_at").asc(nulls_last=True), F("id").asc()],
+        ),
+        copies=Window(Count("id"), partition_by=[group]),
+    ).filter(cluster_rank=1)
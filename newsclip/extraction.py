@@ -0,0 +1,212 @@
+# newsclip/extraction.py
+#
+# Extração do texto completo das notícias, numa passada separada da coleta
+# (manage.py extract_articles): resolve os links de redirect que a coleta
+# gravou como vieram (Google News, encurtadores), baixa a página das notícias
+# novas com o fetch_engine (conexões limitadas), acha o bloco principal do
+# texto no estilo do Readability, guarda o texto comprimido em Story.body e
+# troca o "resumo" (que era só o título) por um resumo extrativo de verdade;
+# o texto entra também no índice de busca (newsclip.search).
+
+import re
+import time
+import zlib
+from collections import Counter
+from datetime import timedelta
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from newsclip.canonical import needs_resolution, resolve_urls, url_key
+from newsclip.clustering import STOPWORDS
+from newsclip.fetch_engine import fetch_all
+from newsclip.matching import tokenize
+from newsclip.models import Story
+from newsclip.search import index_stories
+
+
+# nada disso é texto da matéria
+_JUNK_TAGS = ["script", "style", "noscript", "template", "nav", "header", "footer",
+              "aside", "form", "iframe", "svg", "button", "figure"]
+# class/id de blocos que quase nunca são o texto (a não ser que também pareçam conteúdo)
+_UNLIKELY_RE = re.compile(
+    r"comment|share|social|related|recommend|sidebar|menu|breadcrumb|newsletter|"
+    r"banner|promo|advert|publicidade|cookie|modal|popup|paywall|tags", re.I
+)
+_LIKELY_RE = re.compile(r"article|body|content|entry|main|materia|post|story|text", re.I)
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+(?=[\"“'(]?[A-ZÀ-Ý0-9])")
+_MIN_PARAGRAPH = 40
+_MAX_BODY_CHARS = 100_000
+
+
+def compress(text):
+    return zlib.compress(text.encode(), 6)
+
+
+def _text(node):
+    return " ".join(node.get_text(" ", strip=True).split())
+
+
+def _link_density(node, length):
+    links = sum(len(_text(a)) for a in node.find_all("a"))
+    return links / length if length else 1
+
+
+def extract_main_text(html):
+    """
+    Texto principal da página: os parágrafos do bloco com maior pontuação
+    (parágrafos longos e com vírgulas contam mais; blocos cheios de links,
+    menos). Devolve "" se não encontrar nada com cara de matéria.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(_JUNK_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(True):
+        if tag.decomposed or tag.name in ("html", "body", "article", "main"):
+            continue
+        attrs = " ".join([*tag.get("class", []), tag.get("id", "")])
+        if attrs and _UNLIKELY_RE.search(attrs) and not _LIKELY_RE.search(attrs):
+            tag.decompose()
+
+    scores = Counter()
+    for p in soup.find_all("p"):
+        text = _text(p)
+        if len(text) < _MIN_PARAGRAPH:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = p.parent
+        if parent is not None:
+            scores[parent] += score
+            if parent.parent is not None:
+                scores[parent.parent] += score / 2
+    if not scores:
+        return ""
+
+    best = max(
+        scores,
+        key=lambda node: scores[node] * (1 - _link_density(node, len(_text(node)))),
+    )
+    paragraphs = [_text(p) for p in best.find_all("p")]
+    return "\n\n".join(p for p in paragraphs if len(p) >= _MIN_PARAGRAPH)[:_MAX_BODY_CHARS]
+
+
+def summarize(text, num_sentences=3, max_chars=600):
+    """
+    Resumo extrativo: as frases cujas palavras mais se repetem no texto,
+    na ordem original. A primeira frase (o lide) ganha um bônus.
+    """
+    sentences = [s.strip() for s in _SENTENCE_RE.split(text.replace("\n", " ")) if s.strip()]
+    if len(sentences) <= num_sentences:
+        return " ".join(sentences)[:max_chars]
+
+    words = [[w for w in tokenize(s) if w not in STOPWORDS and len(w) > 2] for s in sentences]
+    freq = Counter(w for ws in words for w in ws)
+    top = max(freq.values(), default=1)
+
+    def score(i):
+        ws = words[i]
+        if len(ws) < 5:
+            return 0
+        value = sum(freq[w] / top for w in set(ws)) / len(ws) ** 0.5
+        return value * 1.5 if i == 0 else value
+
+    chosen = sorted(sorted(range(len(sentences)), key=score, reverse=True)[:num_sentences])
+    summary = ""
+    for i in chosen:
+        if summary and len(summary) + len(sentences[i]) > max_chars:
+            break
+        summary = f"{summary} {sentences[i]}".strip()
+    return summary[:max_chars]
+
+
+def pending_stories(days=3):
+    """Notícias ainda sem tentativa de extração, das mais novas para as mais antigas"""
+    return (
+        Story.objects
+        .filter(extracted_at__isnull=True, created_at__gte=timezone.now() - timedelta(days=days))
+        .order_by("-created_at")
+    )
+
+
+def resolve_wrappers(stories):
+    """
+    Troca a URL das notícias que ainda são um wrapper de redirect pelo destino
+    (resolvido uma vez por wrapper, newsclip.canonical). Se o destino já é
+    outra notícia, esta fica com o wrapper: o agrupamento por simhash junta
+    as duas nas listagens.
+    """
+    wrappers = [s for s in stories if needs_resolution(s.url)]
+    if not wrappers:
+        return
+    resolved = resolve_urls({s.url for s in wrappers})
+    # compara pela chave: o destino pode diferir de uma notícia já gravada só no esquema
+    keys = {url: url_key(final) for url, final in resolved.items()}
+    taken = set(Story.objects.filter(url_key__in=set(keys.values())).values_list("url_key", flat=True))
+    for story in wrappers:
+        final, key = resolved[story.url], keys[story.url]
+        if key in taken:
+            continue
+        taken.add(key)
+        try:
+            # a coleta pode ter gravado o destino neste meio-tempo
+            with transaction.atomic():
+                Story.objects.filter(pk=story.pk).update(url=final, url_key=key)
+        except IntegrityError:
+            continue
+        story.url, story.url_key = final, key
+
+
+def _apply(story, result):
+    story.extracted_at = timezone.now()
+    story.extract_status = result["status"] or 0
+    if result["error"] or result["status"] != 200:
+        return False
+    if "html" not in result["headers"].get("content-type", "text/html"):
+        return False
+    text = extract_main_text(result["content"])
+    if not text:
+        return False
+    story.body = compress(text)
+    # o simhash/grupo continua o da inserção: o agrupamento já foi decidido
+    story.summary = summarize(text) or story.summary
+    return True
+
+
+def extract_pending(budget=None, days=3, max_seconds=None, max_connections=None, stdout=None):
+    """
+    Extrai até `budget` notícias pendentes (e para antes se passar de
+    `max_seconds`), em lotes baixados em paralelo. Cada notícia é tentada uma
+    vez só: falhas ficam registradas em extract_status. Devolve
+    (tentadas, extraídas).
+    """
+    if budget is None:
+        budget = getattr(settings, "EXTRACT_BUDGET", 200)
+    if max_connections is None:
+        max_connections = getattr(settings, "EXTRACT_MAX_CONNECTIONS", 8)
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+
+    stories = list(
+        pending_stories(days).only("id", "url", "url_key", "title", "summary", "body")[:budget]
+    )
+    tried = extracted = 0
+    chunk_size = max_connections * 4
+    for start in range(0, len(stories), chunk_size):
+        if deadline and time.monotonic() > deadline:
+            break
+        chunk = stories[start:start + chunk_size]
+        resolve_wrappers(chunk)
+        results = fetch_all(
+            ({"url": s.url, "timeout": 15} for s in chunk),
+            max_connections=max_connections,
+            per_host=2,
+        )
+        for story, result in zip(chunk, results):
+            extracted += _apply(story, result)
+        Story.objects.bulk_update(chunk, ["body", "summary", "extracted_at", "extract_status"])
+        index_stories([s for s in chunk if s.body])
+        tried += len(chunk)
+        if stdout:
+            stdout.write(f"  {tried}/{len(stories)} notícias, {extracted} com texto…", ending="\r")
+    return tried, extracted
@@ -0,0 +1,149 @@
+# newsclip/feeds.py
+
+import calendar
+from datetime import datetime, timedelta, timezone
+
+import feedparser
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone as dj_timezone
+
+from newsclip.fetch_engine import fetch_all
+from newsclip.models import Feed, FeedState
+
+
+def entry_datetime(entry):
+    """Data de publicação (UTC) de uma entrada do feedparser, ou None"""
+    pub_struct = entry.get('published_parsed') or entry.get('updated_parsed')
+    if not pub_struct:
+        return None
+    return datetime.fromtimestamp(calendar.timegm(pub_struct), tz=timezone.utc)
+
+
+def load_feed_states(urls):
+    """FeedState de cada URL; os que ainda não existem são criados só em memória"""
+    urls = list(dict.fromkeys(urls))
+    states = {s.url: s for s in FeedState.objects.filter(url__in=urls)}
+    for url in urls:
+        states.setdefault(url, FeedState(url=url))
+    return states
+
+
+def feed_request(state):
+    """Requisição para o fetch_engine com os cabeçalhos do GET condicional"""
+    headers = {}
+    if state.etag:
+        headers["If-None-Match"] = state.etag
+    if state.modified:
+        headers["If-Modified-Since"] = state.modified
+    return {"url": state.url, "headers": headers, "cache": "feeds"}
+
+
+def read_feed(state, result):
+    """
+    Interpreta a resposta de um feed e atualiza o estado (sem salvar).
+    Devolve só as entradas mais novas que a última vista; respostas 304 ou
+    com erro não são interpretadas e a lista vem vazia. Respostas vindas do
+    cache não alteram os dados HTTP do estado.
+    """
+    cached = result.get("cached")
+    if not cached:
+        state.last_status = result["status"]
+        state.checked_at = dj_timezone.now()
+    if result["error"] or result["status"] != 200:
+        return []
+
+    feed = feedparser.parse(result["content"], response_headers=result["headers"])
+    entries = []
+    newest = state.last_entry_at
+    for entry in feed.entries:
+        pub_dt = entry_datetime(entry)
+        if pub_dt and state.last_entry_at and pub_dt <= state.last_entry_at:
+            continue
+        entries.append(entry)
+        if pub_dt and (newest is None or pub_dt > newest):
+            newest = pub_dt
+
+    if not cached:
+        state.etag = result["headers"].get("etag", "")[:500]
+        state.modified = result["headers"].get("last-modified", "")[:100]
+    state.last_entry_at = newest
+    return entries
+
+
+def save_feed_states(states):
+    """Grava os estados em lote (insere os novos e atualiza os existentes)"""
+    states = list(states)
+    FeedState.objects.bulk_create(
+        [s for s in states if s.pk is None], ignore_conflicts=True
+    )
+    FeedState.objects.bulk_update(
+        [s for s in states if s.pk is not None],
+        ["etag", "modified", "last_entry_at", "last_status", "checked_at"],
+        batch_size=200,
+    )
+
+
+def fetch_feeds(urls):
+    """Baixa vários feeds em paralelo com GET condicional; devolve {url: entradas novas}"""
+    states = load_feed_states(urls)
+    results = fetch_all(feed_request(state) for state in states.values())
+    entries = {r["url"]: read_feed(states[r["url"]], r) for r in results}
+    save_feed_states(states.values())
+    return entries
+
+
+# —————————————————————————————————————————
+# Catálogo (modelo Feed): agenda e saúde
+# —————————————————————————————————————————
+
+def due_feeds(now=None):
+    """Feeds ativos cuja próxima leitura já chegou (ou que nunca foram lidos)"""
+    now = now or dj_timezone.now()
+    return Feed.objects.filter(active=True).filter(Q(next_poll_at__isnull=True) | Q(next_poll_at__lte=now))
+
+
+def record_poll(feed, ok, new_items, now=None, unchanged=False):
+    """
+    Atualiza a saúde do feed depois de uma leitura e agenda a próxima (sem
+    salvar). O intervalo dobra a cada falha seguida e a cada 3 leituras
+    seguidas que trouxeram o feed sem nenhum item novo, até
+    FEED_MAX_INTERVAL_HOURS. `unchanged` (304 ou resposta do cache) conta
+    como leitura saudável: o feed só não mudou. O feed é desativado depois de
+    FEED_DISABLE_AFTER_FAILURES falhas ou FEED_STALE_DAYS sem item novo.
+    """
+    now = now or dj_timezone.now()
+    streak = 0
+    if not ok:
+        feed.failures += 1
+        streak = feed.failures
+        if feed.failures >= settings.FEED_DISABLE_AFTER_FAILURES:
+            feed.active = False
+            feed.disabled_reason = f"{feed.failures} falhas seguidas"
+    elif new_items:
+        feed.failures = feed.empty_polls = 0
+        feed.last_new_at = now
+    else:
+        feed.failures = 0
+        if unchanged:
+            feed.empty_polls = 0
+        else:
+            feed.empty_polls += 1
+            # algumas leituras vazias seguidas são normais em feeds pequenos
+            streak = feed.empty_polls // 3
+        if (feed.last_new_at or feed.created_at or now) < now - timedelta(days=settings.FEED_STALE_DAYS):
+            feed.active = False
+            feed.disabled_reason = f"sem itens novos há {settings.FEED_STALE_DAYS} dias"
+
+    interval = timedelta(minutes=feed.interval)
+    ceiling = max(timedelta(hours=settings.FEED_MAX_INTERVAL_HOURS), interval)
+    feed.next_poll_at = now + min(interval * 2 ** min(streak, 16), ceiling)
+    return feed
+
+
+def save_polls(feeds):
+    Feed.objects.bulk_update(
+        feeds,
+        ["active", "disabled_reason", "next_poll_at", "failures", "empty_polls", "last_new_at"],
+        batch_size=200,
+    )
@@ -0,0 +1,190 @@
+# newsclip/fetch_engine.py
+
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+import httpx
+from django.conf import settings
+
+from newsclip.cache import ResponseCache, get_cache
+
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+class _HostSlot:
+    """Limita requisições simultâneas a um host e espaça o início de cada uma"""
+
+    def __init__(self, limit, delay):
+        self.sem = asyncio.Semaphore(limit)
+        self.delay = delay
+        self.lock = asyncio.Lock()
+        self.next_start = 0.0
+
+    async def __aenter__(self):
+        await self.sem.acquire()
+        if self.delay:
+            async with self.lock:
+                wait = self.next_start - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self.next_start = time.monotonic() + self.delay
+        return self
+
+    async def __aexit__(self, *exc):
+        self.sem.release()
+
+
+def _tracer(timings):
+    """
+    Callback de trace do httpcore: soma a duração de cada fase da requisição
+    em `timings` (segundos). "connect" inclui a resolução DNS, que o httpcore
+    faz dentro da abertura do socket; conexões reaproveitadas não têm connect/tls.
+    """
+    started = {}
+
+    async def trace(event, info):
+        name, _, step = event.rpartition(".")
+        phase = _TRACE_PHASES.get(name)
+        if phase is None:
+            return
+        if step == "started":
+            started[name] = time.monotonic()
+        elif step in ("complete", "failed") and name in started:
+            timings[phase] = timings.get(phase, 0.0) + time.monotonic() - started.pop(name)
+
+    return trace
+
+
+_TRACE_PHASES = {
+    "connection.connect_tcp": "connect",
+    "connection.start_tls": "tls",
+    "http11.receive_response_headers": "wait",
+    "http2.receive_response_headers": "wait",
+}
+
+
+async def _fetch_one(client, slot, req, timeout):
+    result = {
+        "request": req,
+        "url": req["url"],
+        "final_url": req["url"],
+        "status": None,
+        "content": b"",
+        "headers": {},
+        "error": None,
+        "elapsed": 0.0,
+        "timings": {},
+    }
+    async with slot:
+        started = time.monotonic()
+        try:
+            resp = await client.get(
+                req["url"],
+                params=req.get("params"),
+                headers=req.get("headers"),
+                timeout=req.get("timeout", timeout),
+                extensions={"trace": _tracer(result["timings"])},
+            )
+            result["status"] = resp.status_code
+            result["final_url"] = str(resp.url)
+            result["content"] = resp.content
+            result["headers"] = {k.lower(): v for k, v in resp.headers.items()}
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["elapsed"] = time.monotonic() - started
+    return result
+
+
+async def _fetch_all(reqs, max_connections, per_host, delay, timeout):
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+    )
+    slots = {}
+    async with httpx.AsyncClient(
+        limits=limits,
+        headers=DEFAULT_HEADERS,
+        follow_redirects=True,
+        timeout=timeout,
+    ) as client:
+        hosts = [urlsplit(req["url"]).netloc.lower() for req in reqs]
+        # fontes diferentes no mesmo lote: vale o maior intervalo pedido para o host
+        delays = {}
+        for host, req in zip(hosts, reqs):
+            delays[host] = max(delays.get(host, 0.0), req.get("delay", delay))
+        tasks = []
+        for host, req in zip(hosts, reqs):
+            if host not in slots:
+                slots[host] = _HostSlot(per_host, delays[host])
+            tasks.append(_fetch_one(client, slots[host], req, timeout))
+        return await asyncio.gather(*tasks)
+
+
+def _cache_key(req):
+    return ResponseCache.make_key(req["url"], *sorted((req.get("params") or {}).items()))
+
+
+def _cached_result(req, raw):
+    header, _, content = raw.partition(b"\n")
+    return {
+        "request": req,
+        "url": req["url"],
+        "final_url": req["url"],
+        "status": 200,
+        "content": content,
+        "headers": json.loads(header),
+        "error": None,
+        "elapsed": 0.0,
+        "timings": {},
+        "cached": True,
+    }
+
+
+def fetch_all(reqs, max_connections=None, per_host=None, delay=0.0, timeout=None):
+    """
+    Baixa todas as requisições em paralelo num único event loop, com um pool
+    de conexões global, limite de conexões por host, intervalo mínimo entre
+    requisições ao mesmo host e timeout por requisição.
+
+    Cada requisição é um dict com "url" e, opcionalmente, "params", "headers",
+    "timeout", "delay" e "cache" (namespace do newsclip.cache: respostas 200
+    ficam guardadas e, enquanto válidas, nem vão para a rede). Devolve, na
+    mesma ordem, dicts com "request", "url", "final_url" (após redirects),
+    "status", "content", "headers", "error", "elapsed", "timings" (segundos
+    por fase: connect, tls, wait) e "cached"; falhas de rede não levantam
+    exceção, ficam em "error".
+    """
+    reqs = list(reqs)
+    if not reqs:
+        return []
+
+    results = [None] * len(reqs)
+    pending = []
+    for i, req in enumerate(reqs):
+        raw = get_cache(req["cache"]).get(_cache_key(req)) if req.get("cache") else None
+        if raw is not None:
+            results[i] = _cached_result(req, raw)
+        else:
+            pending.append(i)
+    if not pending:
+        return results
+    if max_connections is None:
+        max_connections = getattr(settings, "FETCH_MAX_CONNECTIONS", 20)
+    if per_host is None:
+        per_host = getattr(settings, "FETCH_PER_HOST", 2)
+    if timeout is None:
+        timeout = getattr(settings, "FETCH_TIMEOUT", 20)
+    fetched = asyncio.run(_fetch_all(
+        [reqs[i] for i in pending], max_connections, per_host, delay, timeout
+    ))
+    for i, result in zip(pending, fetched):
+        result["cached"] = False
+        req = reqs[i]
+        if req.get("cache") and result["status"] == 200:
+            header = json.dumps(result["headers"]).encode()
+            get_cache(req["cache"]).set(_cache_key(req), header + b"\n" + result["content"])
+        results[i] = result
+    return results
@@ -14,4 +14,8 @@ class ReportForm(forms.Form):
         ("csv", "CSV"),
     ]
     days = forms.ChoiceField(choices=DAYS_CHOICES, label="Intervalo")
-    out_format = forms.ChoiceField(choices=FORMAT_CHOICES, label="Formato")
\ No newline at end of file
+    out_format = forms.ChoiceField(choices=FORMAT_CHOICES, label="Formato")
+    collapse = forms.BooleanField(
+        required=False, label="Agrupar notícias repetidas",
+        help_text="Uma linha por notícia, mesmo que publicada por vários portais",
+    )
\ No newline at end of file
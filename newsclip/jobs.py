@@ -0,0 +1,227 @@
+# newsclip/jobs.py
+
+import io
+import json
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from newsclip.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# intervalo antes de cada nova tentativa: 30s, 60s, 120s, …
+RETRY_BASE_SECONDS = 30
+# guarda só o fim da saída do comando
+OUTPUT_TAIL = 5000
+# de quanto em quanto tempo o worker marca heartbeat_at enquanto roda um job
+HEARTBEAT_SECONDS = 30
+
+
+def _dedupe_key(kind, params):
+    return f"{kind}:{json.dumps(params, sort_keys=True, default=str)}"[:300]
+
+
+def _active_job(key):
+    return (
+        Job.objects
+        .filter(dedupe_key=key, status__in=("queued", "running"))
+        .order_by("created_at")
+        .first()
+    )
+
+
+def enqueue(kind, client=None, user=None, **params):
+    """
+    Coloca um job na fila. Se já existe um job idêntico na fila ou em execução,
+    devolve esse em vez de criar outro (a restrição job_active_dedupe_key
+    garante isso também para pedidos simultâneos).
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Tipo de job desconhecido: {kind}")
+    key = _dedupe_key(kind, params)
+    existing = _active_job(key)
+    if existing:
+        return existing
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                kind=kind,
+                params=params,
+                dedupe_key=key,
+                client=client,
+                created_by=user if user is not None and user.is_authenticated else None,
+            )
+    except IntegrityError:
+        # outro pedido criou o mesmo job entre a consulta e o insert
+        existing = _active_job(key)
+        if existing is None:
+            raise
+        return existing
+
+
+def report_progress(job, done, total, message=""):
+    """Atualiza o progresso (0–100) de um job em execução"""
+    job.progress = int(100 * done / total) if total else 100
+    job.message = (message or "")[:500]
+    Job.objects.filter(pk=job.pk).update(progress=job.progress, message=job.message, heartbeat_at=timezone.now())
+
+
+def claim_next():
+    """
+    Reserva o próximo job pronto para rodar. A reserva é um UPDATE condicional
+    no status, então vários workers podem disputar a fila sem pegar o mesmo job.
+    """
+    now = timezone.now()
+    candidates = (
+        Job.objects
+        .filter(status="queued", run_after__lte=now)
+        .order_by("run_after", "created_at")
+        .values_list("pk", flat=True)[:10]
+    )
+    for pk in candidates:
+        claimed = Job.objects.filter(pk=pk, status="queued").update(
+            status="running", started_at=now, heartbeat_at=now, progress=0, message=""
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def requeue_stale(older_than):
+    """
+    Trata jobs em 'running' cujo worker não dá sinal há mais de `older_than`
+    (worker morto no meio): cada um conta como tentativa e volta para a fila,
+    ou falha se as tentativas acabaram. Devolve (devolvidos, falhos).
+    """
+    now = timezone.now()
+    limit = now - older_than
+    stale = Job.objects.filter(status="running").filter(
+        Q(heartbeat_at__lt=limit) | Q(heartbeat_at__isnull=True, started_at__lt=limit)
+    )
+    failed = stale.filter(attempts__gte=F("max_attempts") - 1).update(
+        status="failed", attempts=F("attempts") + 1, finished_at=now,
+        message="O worker parou de responder",
+    )
+    requeued = stale.update(
+        status="queued", attempts=F("attempts") + 1, run_after=now,
+        message="O worker parou de responder — nova tentativa agendada",
+    )
+    return requeued, failed
+
+
+def _heartbeat(job, stop):
+    """Marca heartbeat_at a cada HEARTBEAT_SECONDS até `stop`"""
+    try:
+        while not stop.wait(HEARTBEAT_SECONDS):
+            Job.objects.filter(pk=job.pk, status="running").update(heartbeat_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def run_job(job):
+    """Executa um job já reservado, registrando sucesso, nova tentativa ou falha"""
+    handler = HANDLERS[job.kind]
+    # o sinal de vida continua mesmo em etapas longas sem progresso
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(job, stop), daemon=True)
+    beat.start()
+    try:
+        output = handler(job)
+    except Exception as e:
+        logger.exception("Job %s falhou", job.pk)
+        job.attempts += 1
+        job.error = traceback.format_exc()[-OUTPUT_TAIL:]
+        if job.attempts < job.max_attempts:
+            job.status = "queued"
+            job.run_after = timezone.now() + timedelta(
+                seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            )
+            job.message = f"Erro: {e} — nova tentativa agendada"[:500]
+        else:
+            job.status = "failed"
+            job.finished_at = timezone.now()
+            job.message = f"Erro: {e}"[:500]
+        job.save(update_fields=["attempts", "error", "status", "run_after", "message", "finished_at"])
+        return job
+    finally:
+        stop.set()
+
+    job.status = "done"
+    job.progress = 100
+    job.message = "Concluído"
+    job.output = (output or "")[-OUTPUT_TAIL:]
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "progress", "message", "output", "finished_at"])
+    return job
+
+
+def job_status(job):
+    """Representação em JSON usada pelo endpoint de acompanhamento"""
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "message": job.message,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+# —————————————————————————————————————————
+# Handlers: cada tipo de job chama o management command correspondente
+# —————————————————————————————————————————
+
+def _run_fetch_news(job):
+    from newsclip.management.commands.fetch_news import Command
+
+    cmd = Command()
+    cmd.progress = lambda done, total, msg: report_progress(job, done, total, msg)
+    args = []
+    if job.params.get("client_id"):
+        args = ["--client-id", str(job.params["client_id"])]
+    out = io.StringIO()
+    call_command(cmd, *args, stdout=out, stderr=out)
+    # o texto completo vem depois, num job à parte, sem atrasar a busca
+    if settings.EXTRACT_ENABLED:
+        enqueue("extract_articles")
+    return out.getvalue()
+
+
+def _run_extract_articles(job):
+    out = io.StringIO()
+    report_progress(job, 0, 1, "Extraindo texto das notícias…")
+    call_command("extract_articles", stdout=out, stderr=out)
+    return out.getvalue()
+
+
+def _run_generate_report(job):
+    out = io.StringIO()
+    report_progress(job, 0, 1, "Gerando relatório…")
+    call_command(
+        "generate_report",
+        client_id=job.params["client_id"],
+        days=job.params["days"],
+        format=job.params["format"],
+        collapse=job.params.get("collapse", False),
+        stdout=out,
+        stderr=out,
+    )
+    return out.getvalue()
+
+
+HANDLERS = {
+    "fetch_news": _run_fetch_news,
+    "generate_report": _run_generate_report,
+    "extract_articles": _run_extract_articles,
+}
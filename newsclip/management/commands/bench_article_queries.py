@@ -0,0 +1,244 @@
+# newsclip/management/commands/bench_article_queries.py
+
+import itertools
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from newsclip.models import Client, Article, ArticleDailyStat, Story
+from newsclip.pagination import encode_cursor, keyset_page
+from newsclip.rollup import rebuild
+from newsclip.search import index_stories, search_articles, unindex_stories
+from newsclip.views import client_news_queryset
+
+
+BENCH_PREFIX = "__bench__"
+SOURCES = [
+    "g1.globo.com", "uol.com.br", "folha.uol.com.br", "estadao.com.br", "cnnbrasil.com.br",
+    "terra.com.br", "metropoles.com", "correiobraziliense.com.br", "valor.globo.com", "r7.com",
+]
+
+
+def _vocabulary(rng, size=20000):
+    """Palavras sintéticas (sílabas sorteadas), para a busca ter termos raros e comuns"""
+    syllables = [c + v for c in "bcdfglmnprstv" for v in "aeiou"]
+    return list(dict.fromkeys(
+        "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(size)
+    ))
+
+
+def seed_articles(total, n_clients, prefix=BENCH_PREFIX, stdout=None):
+    """Cria n_clients clientes de benchmark e distribui `total` artigos sintéticos entre eles"""
+    rng = random.Random(42)
+    clients = [
+        Client.objects.create(name=f"{prefix}{i}", keywords=f"bench{i}")
+        for i in range(n_clients)
+    ]
+    # distribuição desigual: alguns clientes concentram a maioria dos artigos
+    weights = [1 / (i + 1) for i in range(n_clients)]
+    now = timezone.now()
+    words = _vocabulary(rng)
+    # frequência das palavras segue Zipf: poucas muito comuns, a maioria rara
+    word_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(words))))
+    batch, created = [], 0
+
+    def flush(batch):
+        # notícia e ligação criadas juntas; ids das notícias vêm do bulk_create
+        Story.objects.bulk_create([story for story, _ in batch])
+        index_stories([story for story, _ in batch])
+        Article.objects.bulk_create(
+            Article(client=client, story=story, published_at=story.published_at, excluded=excluded)
+            for story, (client, excluded) in batch
+        )
+
+    for i in range(total):
+        client = rng.choices(clients, weights)[0]
+        story = Story(
+            title=" ".join(rng.choices(words, cum_weights=word_weights, k=rng.randint(6, 14))),
+            url=f"https://bench.example/{client.pk}/{i}",
+            url_key=f"bench.example/{client.pk}/{i}",
+            published_at=now - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+            source=rng.choice(SOURCES),
+            topic="Sem classificação",
+        )
+        batch.append((story, (client, rng.random() < 0.05)))
+        if len(batch) >= 5000:
+            flush(batch)
+            created += len(batch)
+            batch = []
+            if stdout:
+                stdout.write(f"  {created} artigos criados…", ending="\r")
+    flush(batch)
+    # bulk_create direto não passa pelo ArticleWriter: recalcula o rollup
+    rebuild([c.pk for c in clients])
+    return created + len(batch)
+
+
+def delete_bench_data(clients, all_stories=True):
+    """
+    Apaga clientes de benchmark, os artigos e as notícias sintéticas (com o
+    índice de busca). Em lotes: o cascade de milhões de linhas de uma vez
+    estoura o limite de parâmetros do SQLite (SET NULL em ClippingEntry).
+    Com all_stories=False só saem as notícias desses clientes.
+    """
+    client_ids = list(clients.values_list("pk", flat=True))
+    deleted = 0
+    articles = Article.objects.filter(client_id__in=client_ids).order_by()
+    while ids := list(articles.values_list("pk", flat=True)[:5000]):
+        deleted += Article.objects.filter(pk__in=ids).delete()[0]
+    deleted += Client.objects.filter(pk__in=client_ids).delete()[0]
+
+    # as notícias não são apagadas junto com os clientes
+    prefixes = ["https://bench.example/"] if all_stories else [
+        f"https://bench.example/{pk}/" for pk in client_ids
+    ]
+    for prefix in prefixes:
+        stories = Story.objects.filter(url__startswith=prefix).order_by()
+        while ids := list(stories.values_list("pk", flat=True)[:5000]):
+            unindex_stories(ids)
+            deleted += Story.objects.filter(pk__in=ids).delete()[0]
+    return deleted
+
+
+def hot_queries(client):
+    """As consultas quentes das views/relatórios, na forma em que elas rodam"""
+    visible = Article.objects.filter(client=client, excluded=False)
+    page = client_news_queryset(client)
+    # cursor equivalente ao fim da página 500 de 20 itens
+    deep = Article.objects.filter(client=client).order_by("-published_at", "-id")[9999:10000]
+    deep_cursor = encode_cursor(*deep.values_list("published_at", "id").get()) if deep else None
+    return {
+        "client_news (página 1)": lambda: list(page[:20]),
+        "client_news (página 500)": lambda: list(page[10000:10020]),
+        "API cursor (página 500)": lambda: keyset_page(
+            Article.objects.filter(client=client), deep_cursor, 20
+        ),
+        "client_news (count)": lambda: visible.count(),
+        "gráfico por dia": lambda: list(
+            visible.exclude(published_at__isnull=True)
+            .annotate(day=TruncDate("published_at"))
+            .values("day").annotate(count=Count("id")).order_by("day")
+        ),
+        "top 5 fontes": lambda: list(
+            visible.exclude(published_at__isnull=True)
+            .values("story__source").annotate(count=Count("id")).order_by("-count")[:5]
+        ),
+        "gráfico por dia (rollup)": lambda: list(
+            ArticleDailyStat.objects.filter(client=client, excluded=False, count__gt=0)
+            .exclude(day__isnull=True)
+            .values("day").annotate(count=Sum("count")).order_by("day")
+        ),
+        "top 5 fontes (rollup)": lambda: list(
+            ArticleDailyStat.objects.filter(client=client, excluded=False, count__gt=0)
+            .exclude(day__isnull=True)
+            .values("source").annotate(count=Sum("count")).order_by("-count")[:5]
+        ),
+        "client_news (count rollup)": lambda: ArticleDailyStat.objects.filter(
+            client=client, excluded=False
+        ).aggregate(total=Sum("count"))["total"],
+        "fontes distintas": lambda: list(
+            Article.objects.filter(client=client)
+            .order_by("story__source").values_list("story__source", flat=True).distinct()
+        ),
+        "relatório 30 dias": lambda: list(
+            Article.objects.filter(
+                client=client, published_at__gte=timezone.now() - timedelta(days=30)
+            ).order_by("published_at").values_list("id", flat=True)
+        ),
+        "visão geral (top 5)": lambda: list(
+            Article.objects.filter(client=client).order_by("-published_at")[:5]
+        ),
+        **{
+            f"busca ({label})": (lambda q=q: search_articles(client.pk, q, limit=20))
+            for label, q in search_samples().items()
+        },
+    }
+
+
+def search_samples():
+    """Termos do vocabulário sintético com frequências diferentes, e dois termos juntos"""
+    words = _vocabulary(random.Random(42))
+    return {
+        "termo em ~60%": words[0],
+        "termo em ~5%": words[20],
+        "termo médio": words[200],
+        "termo raro": words[5000],
+        "dois termos": f"{words[3]} {words[40]}",
+    }
+
+
+def explain_sql(client):
+    visible = Article.objects.filter(client=client, excluded=False)
+    return {
+        "client_news (página 1)": client_news_queryset(client)[:20],
+        "top 5 fontes": visible.values("story__source").annotate(count=Count("id")).order_by("-count")[:5],
+        "relatório 30 dias": Article.objects.filter(
+            client=client, published_at__gte=timezone.now() - timedelta(days=30)
+        ).order_by("published_at"),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede planos de execução e tempos das consultas de Article. "
+        "Com --seed, cria clientes de benchmark com artigos sintéticos antes de medir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Quantidade de artigos sintéticos a criar (ex.: 1000000)")
+        parser.add_argument("--clients", type=int, default=20,
+                            help="Em quantos clientes de benchmark distribuir os artigos")
+        parser.add_argument("--repeat", type=int, default=5,
+                            help="Execuções de cada consulta (mostra a mediana)")
+        parser.add_argument("--cleanup", action="store_true",
+                            help="Remove os clientes/artigos de benchmark e sai")
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            deleted = delete_bench_data(Client.objects.filter(name__startswith=BENCH_PREFIX))
+            self.stdout.write(self.style.SUCCESS(f"{deleted} registros de benchmark removidos"))
+            return
+
+        if options["seed"]:
+            self.seed(options["seed"], options["clients"])
+
+        bench_clients = Client.objects.filter(name__startswith=BENCH_PREFIX)
+        if not bench_clients.exists():
+            self.stderr.write(self.style.ERROR("Nenhum cliente de benchmark. Use --seed N."))
+            return
+
+        # o maior cliente é o caso mais pesado
+        client = (
+            bench_clients.annotate(n=Count("articles")).order_by("-n").first()
+        )
+        self.stdout.write(f"Cliente medido: {client.name} ({client.n} artigos)\n")
+
+        for label, qs in explain_sql(client).items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"EXPLAIN {label}"))
+            self.stdout.write(qs.explain())
+            self.stdout.write("")
+
+        for label, run in hot_queries(client).items():
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"{label:<28} mediana {statistics.median(timings):8.2f} ms   "
+                f"máx {max(timings):8.2f} ms"
+            )
+
+    def seed(self, total, n_clients):
+        started = time.perf_counter()
+        created = seed_articles(total, n_clients, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} artigos criados em {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,116 @@
+# newsclip/management/commands/bench_connectors.py
+
+import base64
+import json
+import operator
+import statistics
+import time
+from datetime import datetime, timedelta
+from functools import reduce
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from newsclip.management.commands.fetch_news import LOOKBACK_DAYS, parse_client_ids
+from newsclip.matching import client_keywords
+from newsclip.models import Client
+from newsclip.sources import CONNECTORS, FetchContext
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode()}
+    raise TypeError(f"{type(value).__name__} não serializável")
+
+
+def _decode(obj):
+    if "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+
+def load_fixture(path):
+    with open(path) as f:
+        return json.load(f, object_hook=_decode)
+
+
+def save_fixture(path, fixture):
+    with open(path, "w") as f:
+        json.dump(fixture, f, default=_encode)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede cada conector de fontes separadamente: tempo de download e de parse "
+        "(normalização, casamento com os clientes). Com --record as respostas "
+        "baixadas vão para um arquivo; com --fixture o parse roda sobre esse "
+        "arquivo, sem rede. Nada é gravado no banco além da cota das APIs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("connectors", nargs="*",
+                            help=f"Conectores a medir (padrão: todos): {', '.join(CONNECTORS)}")
+        parser.add_argument("--client-id", type=parse_client_ids,
+                            help="Clientes usados no casamento (padrão: todos com keywords)")
+        parser.add_argument("--record", metavar="ARQUIVO",
+                            help="Grava as respostas baixadas (um conector por vez)")
+        parser.add_argument("--fixture", metavar="ARQUIVO",
+                            help="Mede só o parse sobre respostas gravadas com --record")
+        parser.add_argument("--repeat", type=int, default=5,
+                            help="Repetições do parse (mediana)")
+
+    def handle(self, *args, **options):
+        names = options["connectors"] or list(CONNECTORS)
+        fixture = load_fixture(options["fixture"]) if options["fixture"] else None
+        if fixture:
+            names = [fixture["connector"]]
+        unknown = set(names) - CONNECTORS.keys()
+        if unknown:
+            raise CommandError(f"Conectores desconhecidos: {', '.join(sorted(unknown))}")
+        if options["record"] and len(names) != 1:
+            raise CommandError("--record grava um conector por vez")
+
+        client_ids = options["client_id"]
+        if isinstance(client_ids, (int, str)):
+            client_ids = parse_client_ids(str(client_ids))
+        clients = Client.objects.order_by("id")
+        if client_ids:
+            clients = clients.filter(reduce(operator.or_, (Q(id__range=r) for r in client_ids)))
+        clients = [c for c in clients if client_keywords(c)]
+
+        until = datetime.utcnow()
+        ctx = FetchContext(until - timedelta(days=LOOKBACK_DAYS), until, self.stdout, self.style,
+                           concurrency=4, bench=True)
+
+        self.stdout.write(f"{len(clients)} clientes")
+        self.stdout.write(f"{'conector':<10} {'download':>10} {'parse (med)':>12} {'respostas':>10} "
+                          f"{'entradas':>9} {'pares':>7}")
+        for name in names:
+            connector = CONNECTORS[name]()
+            candidates = [c for c in clients if connector.accepts(c)]
+            download = None
+            if fixture:
+                raw = fixture["raw"]
+            else:
+                if not connector.enabled():
+                    self.stdout.write(f"{name:<10} desabilitado (sem chave configurada?)")
+                    continue
+                started = time.perf_counter()
+                raw = connector.download(ctx, candidates)
+                download = time.perf_counter() - started
+                if options["record"]:
+                    save_fixture(options["record"], {"connector": name, "raw": raw})
+
+            timings = []
+            for _ in range(max(options["repeat"], 1)):
+                # parse altera as entradas (URLs canônicas): cada rodada parte de uma cópia
+                copy = json.loads(json.dumps(raw, default=_encode), object_hook=_decode)
+                started = time.perf_counter()
+                entries = connector.parse(ctx, candidates, copy)
+                timings.append(time.perf_counter() - started)
+
+            pairs = sum(len(e["clients"]) for e in entries)
+            self.stdout.write(
+                f"{name:<10} {'-' if download is None else f'{download:.2f}s':>10} "
+                f"{statistics.median(timings) * 1000:>10.1f}ms {len(raw):>10} {len(entries):>9} {pairs:>7}"
+            )
@@ -0,0 +1,82 @@
+# newsclip/management/commands/bench_report_pdf.py
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from newsclip.management.commands.bench_article_queries import BENCH_PREFIX, delete_bench_data, seed_articles
+from newsclip.models import Client
+
+
+def run_report(client_id, engine):
+    """
+    Roda generate_report num processo filho e devolve (segundos, pico de RSS em MB,
+    saída do comando). O pico de memória vem do rusage do próprio filho (os.wait4).
+    """
+    cmd = [
+        sys.executable, os.path.join(settings.BASE_DIR, "manage.py"), "generate_report",
+        "--client_id", str(client_id), "--days", "all", "--format", "pdf", "--engine", engine,
+    ]
+    with tempfile.TemporaryFile() as out:
+        started = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdout=out, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        elapsed = time.perf_counter() - started
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        out.seek(0)
+        output = out.read().decode("utf-8", "replace")
+    # ru_maxrss vem em KB no Linux
+    return elapsed, usage.ru_maxrss / 1024, output
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara tempo e pico de memória da geração de PDF entre os motores "
+        "(pdfkit/wkhtmltopdf e reportlab) para relatórios de vários tamanhos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,50000",
+                            help="Quantidades de artigos a medir, separadas por vírgula")
+        parser.add_argument("--engines", default="pdfkit,reportlab",
+                            help="Motores a comparar, separados por vírgula")
+        parser.add_argument("--keep", action="store_true",
+                            help="Mantém os clientes de benchmark e os PDFs gerados")
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["sizes"].split(",") if s.strip()]
+        engines = [e.strip() for e in options["engines"].split(",") if e.strip()]
+
+        results = []
+        for size in sizes:
+            # cada tamanho tem seu próprio cliente (1 cliente recebe todos os artigos)
+            delete_bench_data(Client.objects.filter(name=f"{BENCH_PREFIX}pdf{size}_0"), all_stories=False)
+            seed_articles(size, 1, prefix=f"{BENCH_PREFIX}pdf{size}_")
+            client = Client.objects.get(name=f"{BENCH_PREFIX}pdf{size}_0")
+
+            for engine in engines:
+                self.stdout.write(f"{size} artigos / {engine}…", ending="\r")
+                elapsed, peak_mb, output = run_report(client.pk, engine)
+                if "→" not in output:
+                    results.append((size, engine, None, None, output.strip().splitlines()[-1:]))
+                    continue
+                path = output.rsplit("→", 1)[1].strip()
+                if not options["keep"] and os.path.exists(path):
+                    os.remove(path)
+                results.append((size, engine, elapsed, peak_mb, None))
+
+            if not options["keep"]:
+                delete_bench_data(Client.objects.filter(pk=client.pk), all_stories=False)
+
+        self.stdout.write("")
+        self.stdout.write(f"{'artigos':>8}  {'motor':<10} {'tempo':>9}  {'pico RSS':>10}")
+        for size, engine, elapsed, peak_mb, error in results:
+            if elapsed is None:
+                self.stdout.write(f"{size:>8}  {engine:<10} indisponível: {' '.join(error)}")
+            else:
+                self.stdout.write(f"{size:>8}  {engine:<10} {elapsed:8.2f}s  {peak_mb:8.1f} MB")
@@ -0,0 +1,52 @@
+# newsclip/management/commands/cluster_articles.py
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from newsclip.clustering import ClusterIndex, article_simhash
+from newsclip.models import Story
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula SimHash e grupo de quase-duplicatas para notícias gravadas antes do "
+        "agrupamento existir (as novas já são agrupadas na inserção)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=30,
+            help="Só notícias gravadas nos últimos N dias (0 = todas)"
+        )
+        parser.add_argument(
+            "--rebuild", action="store_true",
+            help="Recalcula também as notícias que já têm grupo"
+        )
+
+    def handle(self, *args, **options):
+        qs = Story.objects.order_by("id").only("id", "title", "summary", "simhash", "cluster")
+        if options["days"]:
+            qs = qs.filter(created_at__gte=timezone.now() - timedelta(days=options["days"]))
+
+        index = ClusterIndex()
+        batch, updated, total = [], 0, 0
+        for art in qs.iterator(chunk_size=2000):
+            total += 1
+            if art.simhash is not None and not options["rebuild"]:
+                index.add(art.simhash, art.cluster if art.cluster is not None else art.simhash)
+                continue
+            art.simhash = article_simhash(art)
+            art.cluster = index.assign(art.simhash)
+            batch.append(art)
+            if len(batch) >= 1000:
+                updated += Story.objects.bulk_update(batch, ["simhash", "cluster"])
+                batch = []
+        if batch:
+            updated += Story.objects.bulk_update(batch, ["simhash", "cluster"])
+
+        clusters = Story.objects.filter(pk__in=qs.values("pk")).values("cluster").distinct().count()
+        self.stdout.write(self.style.SUCCESS(
+            f"{updated} de {total} notícias agrupadas ({clusters} grupos)"
+        ))
@@ -0,0 +1,45 @@
+# newsclip/management/commands/extract_articles.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from newsclip.extraction import extract_pending, pending_stories
+
+
+class Command(BaseCommand):
+    help = (
+        "Baixa o texto completo das notícias novas, guarda comprimido e gera o resumo "
+        "extrativo. Passada incremental e limitada, separada da coleta (fetch_news)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budget", type=int, default=None,
+            help="Máximo de notícias por execução (padrão: settings.EXTRACT_BUDGET)"
+        )
+        parser.add_argument(
+            "--days", type=int, default=3,
+            help="Só notícias gravadas nos últimos N dias"
+        )
+        parser.add_argument(
+            "--max-seconds", type=float, default=300,
+            help="Para de pegar novos lotes depois desse tempo (0 = sem limite)"
+        )
+        parser.add_argument(
+            "--max-connections", type=int, default=None,
+            help="Downloads simultâneos (padrão: settings.EXTRACT_MAX_CONNECTIONS)"
+        )
+
+    def handle(self, *args, **options):
+        tried, extracted = extract_pending(
+            budget=options["budget"],
+            days=options["days"],
+            max_seconds=options["max_seconds"],
+            max_connections=options["max_connections"],
+            stdout=self.stdout,
+        )
+        self.stdout.write("")
+        left = pending_stories(options["days"]).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"{extracted} de {tried} notícias com texto extraído ({left} pendentes)"
+        ))
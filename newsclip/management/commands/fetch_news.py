@@ -1,540 +1,291 @@
-import os
 import time
-import json
-import hashlib
-import requests
-import feedparser
-import dateutil.parser
-import unicodedata
-from urllib.parse import quote_plus
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta, timezone
+import argparse
+import operator
+import traceback
+from datetime import datetime, timedelta
+from functools import reduce
+from itertools import islice
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.conf import settings
-from newsclip.utils import buscar_com_google
-from newsclip.utils import save_article
+from newsclip.utils import ArticleWriter
 
 
-from django.db import IntegrityError
+from django.db import connection
+from django.db.models import Q
 from django.core.management.base import BaseCommand
 from django.utils import timezone as dj_timezone
 
-from newsclip.models import Client, Article
-from newsapi import NewsApiClient  # pip install newsapi-python
-from newsclip.utils import generate_summary, SimpleTopicClassifier
+from newsclip.models import Client, FetchRun
+from newsclip.metrics import FetchRecorder, prune_runs
+from newsclip.watermarks import save_watermarks
+from newsclip.fetch_engine import fetch_all
+from newsclip.sources import FetchContext, HTTPConnector, get_connectors
+from newsclip.cache import cache_stats
+from newsclip.matching import client_keywords
 
-# Quantos dias atrás a NewsAPI permite buscar no plano gratuito
-MAX_NEWSAPI_DAYS = 30
 # Quantos dias atrás olhar em todas as fontes
 LOOKBACK_DAYS = 90
 
 
-def strip_accents(s: str) -> str:
-    """Remove acentos de uma string"""
-    return ''.join(
-        c for c in unicodedata.normalize('NFKD', s)
-        if not unicodedata.combining(c)
-    )
-
-
-class SimpleCache:
-    """Cache simples em arquivo para resultados de busca"""
-    def __init__(self, cache_dir="/tmp/newsclip_cache", ttl_hours=6):
-        self.cache_dir = cache_dir
-        self.ttl = timedelta(hours=ttl_hours)
-        os.makedirs(self.cache_dir, exist_ok=True)
-
-    def _key_path(self, key):
-        return os.path.join(self.cache_dir, key)
-
-    def _get_cache_key(self, query, source):
-        return hashlib.md5(f"{query}:{source}".encode()).hexdigest()
-
-    def get(self, query, source):
-        path = self._key_path(self._get_cache_key(query, source))
-        if not os.path.exists(path):
-            return None
-        with open(path, 'r', encoding='utf-8') as f:
-            entry = json.load(f)
-        ts = datetime.fromisoformat(entry['timestamp'])
-        if datetime.now() - ts > self.ttl:
-            os.remove(path)
-            return None
-        return entry['content']
-
-    def set(self, query, source, content):
-        path = self._key_path(self._get_cache_key(query, source))
-        entry = {'timestamp': datetime.now().isoformat(), 'content': content}
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(entry, f)
-
-
-cache = SimpleCache()
-_topic_clf = SimpleTopicClassifier()
-
-RSS_FEEDS = {
-    "nacionais": {
-        "grandes_portais": [
-            "https://g1.globo.com/rss/g1/",
-            "https://www.uol.com.br/rss/",
-            "https://rss.folha.uol.com.br/emcimadahora/rss091.xml",
-            "https://www.estadao.com.br/rss/",
-            "https://www.cnnbrasil.com.br/feed/",
-            "https://www.terra.com.br/rss/",
-            "https://www.gazetadopovo.com.br/rss/",
-            "https://www.noticiasaominuto.com.br/rss",
-            "https://agenciabrasil.ebc.com.br/rss/ultimasnoticias/feed.xml",
-            "https://www.brasildefato.com.br/rss2.xml",
-            "https://www.jornaldebrasilia.com.br/feed",
-            "https://braziljournal.com/feed",
-            "https://www.camara.leg.br/noticias/rss/noticias.xml",
-            "https://res.stj.jus.br/hrestp-c-portalp/RSS.xml",
-            "https://www.bcb.gov.br/rss/ultimasnoticias",
-            "https://www.gov.br/pt-br/noticias/rss.xml"
-        ],
-        "regionais": [
-            "https://diariodeolimpia.com.br/rss",
-            "https://www.revistaeriopreto.com.br/feed",
-            "https://www.opopular.com.br/rss",
-            "https://www.acritica.com/rss",
-            "https://www.jornaldocomercio.com/rss",
-            "https://www.jornalnh.com.br/rss",
-            "https://www.correiodopovo.com.br/rss",
-            "https://www.jornaldacapital.com.br/rss"
-        ],
-        "sao_paulo": {
-            "capital": [
-                "https://noticias.r7.com/sao-paulo/rss.xml",
-                "https://www.band.uol.com.br/sao-paulo/noticias/rss.xml",
-                "https://www.metropoles.com/sao-paulo/feed"
-            ],
-            "sao_jose_do_rio_preto": [
-                "https://www.diariodaregiao.com.br/rss",
-                "https://www.sbtinterior.com/noticias/sao-jose-do-rio-preto/rss",
-                "https://temmais.com/sao-jose-do-rio-preto-e-regiao/feed/",
-                "https://www.acidadeon.com/riopreto/feed/"
-            ],
-            "olimpia": [
-                "https://diariodeolimpia.com.br/rss"
-            ],
-            "interior": [
-                "https://www.acidadeon.com/araraquara/feed/",
-                "https://www.acidadeon.com/campinas/feed/",
-                "https://jornalcidade.net/feed/",
-                "https://www.liberal.com.br/rss/"
-            ]
-        },
-        "minas_gerais": [
-            "https://www.em.com.br/rss.xml",
-            "https://www.itatiaia.com.br/rss/noticias",
-            "https://www.otempo.com.br/rss",
-            "https://www.hojeemdia.com.br/rss",
-            "https://www.mg.supernoticia.com.br/rss"
-        ],
-        "rio_de_janeiro": [
-            "https://g1.globo.com/rj/rss/g1-rj/feed.xml",
-            "https://odia.ig.com.br/_Conteúdo/rss.xml",
-            "https://extra.globo.com/rss.xml",
-            "https://www.band.uol.com.br/rio-de-janeiro/noticias/rss.xml",
-            "https://noticias.r7.com/rio-de-janeiro/rss.xml"
-        ],
-        "brasilia": [
-            "https://correiobraziliense.webnode.com.br/rss/all.xml",
-            "https://agenciabrasil.ebc.com.br/feed/"
-        ],
-        "economia": [
-            "https://www.bcb.gov.br/rss/ultimasnoticias",
-            "https://www.bcb.gov.br/rss/notas",
-            "https://agenciabrasil.ebc.com.br/economia/feed",
-            "https://br.investing.com/rss/news.rss",
-            "https://br.investing.com/rss/news_285.rss",
-            "https://rss.folha.uol.com.br/mercado/rss091.xml",
-            "https://www.gazetadopovo.com.br/economia/feed/",
-            "https://www.cepea.org.br/br/rss/indicadores.xml",
-            "https://www.bloomberglinea.com.br/feed/",
-            "https://valor.globo.com/rss"
-        ],
-        "tecnologia": [
-            "https://news.google.com/rss/topics/CAAqJQgKIh9DQkFTRVFvSUwyMHZNREUxWm5JU0JYQjBMVUpTS0FBUAE?hl=pt-BR&gl=BR&ceid=BR%3Apt-419",
-            "https://canaltech.com.br/rss/",
-            "https://www.tudocelular.com/rss/rss.xml",
-            "https://www.nextpit.com.br/feed/main.xml",
-            "https://tecnoblog.net/feed/",
-            "https://macmagazine.com.br/feed/",
-            "https://www.oficinadanet.com.br/rss",
-            "https://g1.globo.com/dynamo/tecnologia/rss2.xml",
-            "https://insideevs.uol.com.br/rss/articles/all/",
-            "https://www.inovacaotecnologica.com.br/boletim/rss.php",
-            "https://www.tecmundo.com.br/rss"
-        ],
-        "agro": [
-            "https://www.noticiasagricolas.com.br/rss/",
-            "https://www.noticiasagricolas.com.br/rss/cotacoes",
-            "https://www.cepea.org.br/br/rss/agricola.xml",
-            "https://www.canalrural.com.br/feed/",
-            "https://summitagro.estadao.com.br/feed/",
-            "https://www.embrapa.br/busca-de-noticias/-/asset_publisher/hMIqZUyfOUt3/rss?inheritRedirect=true"
-        ],
-        "politica": [
-            "https://agenciabrasil.ebc.com.br/politica/feed",
-            "https://www1.folha.uol.com.br/poder/rss091.xml",
-            "https://www.gazetadopovo.com.br/republica/feed/",
-            "https://www.camara.leg.br/noticias/rss/agencia",
-            "https://www12.senado.leg.br/noticias/feed"
-        ],
-        "imobiliario": [
-            "https://exame.com/invest/onde-investir/imoveis/feed/",
-            "https://valor.globo.com/imoveis/rss"
-        ],
-        "parques_turismo": [
-            "https://www.panrotas.com.br/rss/noticias",
-            "https://g1.globo.com/dynamo/turismo-e-viagem/rss2.xml"
-        ]
-    },
-    "internacionais": {
-        "principais": [
-            "https://feeds.bbci.co.uk/news/rss.xml",
-            "https://rss.cnn.com/rss/edition.rss",
-            "https://www.reuters.com/rssFeed/topNews",
-            "https://rss.nytimes.com/services/xml/rss/nyt/HomePage.xml",
-            "https://feeds.elpais.com/mrss-s/pages/ep/site/elpais.com/section/america/portada",
-            "https://rss.dw.com/rdf/rss-en-top",
-            "https://www.voaportugues.com/rssfeeds",
-            "https://www.latimes.com/feeds",
-            "http://feeds.feedburner.com/vfdotcomrss",
-            "https://feeds.bbci.co.uk/news/world/rss.xml",
-            "https://rss.cnn.com/rss/edition_world.rss",
-            "https://www.reuters.com/rssFeed/worldNews",
-            "https://rss.nytimes.com/services/xml/rss/nyt/World.xml",
-            "https://feeds.elpais.com/mrss-s/pages/ep/site/elpais.com/section/internacional/portada",
-            "https://rss.dw.com/rdf/rss-en-world",
-            "https://www.aljazeera.com/xml/rss/all.xml",
-            "https://feeds.nbcnews.com/nbcnews/public/news",
-            "https://www.cnbc.com/id/100727362/device/rss/rss.html",
-            "https://abcnews.go.com/abcnews/internationalheadlines",
-            "https://www.cbsnews.com/latest/rss/world",
-            "https://news.un.org/feed/subscribe/en/news/all/rss.xml",
-            "https://globalnews.ca/feed/",
-            "https://news.sky.com/feeds/rss/world.xml"
-        ]
-    }
-}
-
-
-SCRAPE_SITES = [
-    {
-        "url": "https://www.camara.leg.br/noticias/",
-        "title_selector": "h3.g-chamada__titulo",
-        "link_selector": "h3.g-chamada__titulo a",
-        "date_selector": "span.g-chamada__data",
-    },
-    {
-        "url": "https://www12.senado.leg.br/noticias/ultimas",
-        "title_selector": "h3.title",
-        "link_selector": "h3.title a",
-        "date_selector": "span.date",
-    },
-]
-
-NEWSDATA_KEY = os.getenv("NEWSDATA_API_KEY")
-NEWSDATA_URL = "https://newsdata.io/api/1/latest"
-NEWSAPI_KEY = os.getenv("NEWSAPI_API_KEY")
-
-
-def build_advanced_query(keywords, operators=None):
-    """Monta query avançada com operadores OR padrão"""
-    if not operators:
-        return " OR ".join(f'"{kw}"' if ' ' in kw else kw for kw in keywords)
-    parts = []
-    for i, kw in enumerate(keywords):
-        if i > 0:
-            parts.append(operators.get(keywords[i-1], 'OR'))
-        parts.append(f'"{kw}"' if ' ' in kw else kw)
-    return ' '.join(parts)
+def parse_client_ids(value):
+    """ "3,7,10-20" -> [(3, 3), (7, 7), (10, 20)]: faixas fechadas de IDs"""
+    ranges = []
+    for part in filter(None, (p.strip() for p in str(value).split(","))):
+        start, sep, end = part.partition("-")
+        try:
+            start, end = int(start), int(end if sep else start)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"ID ou faixa de IDs inválida: {part!r}")
+        if end < start:
+            raise argparse.ArgumentTypeError(f"Faixa de IDs invertida: {part!r}")
+        ranges.append((start, end))
+    return ranges
+
 
 class Command(BaseCommand):
     help = "Busca notícias para cada cliente e salva as novas entradas"
 
+    # callback opcional (feitos, total, mensagem), usado pela fila de jobs
+    progress = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # todas as fontes gravam pelo mesmo buffer, descarregado em lotes
+        self.writer = ArticleWriter()
+        # tempos/status/contagens por fonte, gravados numa FetchRun no fim
+        self.recorder = FetchRecorder()
+
     def add_arguments(self, parser):
-        parser.add_argument("--client-id", type=int, help="ID do cliente para filtrar")
+        parser.add_argument(
+            "--client-id", type=parse_client_ids,
+            help="IDs dos clientes: um número, lista e/ou faixas (ex.: 3,7,10-20)",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=None,
+            help="Clientes buscados em paralelo (padrão: FETCH_CLIENT_CONCURRENCY)",
+        )
+        parser.add_argument(
+            "--budget", type=float, default=None,
+            help="Tempo máximo da coleta em segundos; 0 = sem limite (padrão: FETCH_RUN_BUDGET)",
+        )
 
     def handle(self, *args, **options):
-        client_id = options.get("client_id")
-        clients = Client.objects.filter(id=client_id) if client_id else Client.objects.all()
-
+        client_ids = options.get("client_id")
+        if isinstance(client_ids, (int, str)):
+            # call_command(client_id=…) não passa pelo parser
+            client_ids = parse_client_ids(str(client_ids))
+        concurrency = options.get("concurrency") or getattr(settings, "FETCH_CLIENT_CONCURRENCY", 4)
+        budget = options.get("budget")
+        if budget is None:
+            budget = getattr(settings, "FETCH_RUN_BUDGET", 0)
+
+        clients = Client.objects.order_by("-priority", "id")
+        if client_ids:
+            # faixas viram BETWEEN: "1-100000" não gera uma lista de 100 mil IDs
+            clients = clients.filter(reduce(operator.or_, (Q(id__range=r) for r in client_ids)))
+        clients = list(clients)
+
+        run = FetchRun.objects.create(clients=len(clients))
+        try:
+            run.skipped = self.fetch_clients(clients, max(concurrency, 1), budget, scoped=bool(client_ids))
+        except BaseException:
+            run.status = "failed"
+            run.error = traceback.format_exc()[-5000:]
+            raise
+        else:
+            run.status = "done"
+        finally:
+            run.finished_at = dj_timezone.now()
+            run.inserted = self.writer.inserted
+            run.duplicates = self.writer.duplicates
+            run.save()
+            self.recorder.save(run, self.writer)
+            prune_runs(getattr(settings, "FETCH_RUNS_KEEP_DAYS", 30))
+
+    def fetch_clients(self, clients, concurrency=1, budget=0, scoped=False):
+        """
+        Roda os conectores (cada um busca para todos os clientes de uma vez) e
+        grava as entradas de cada cliente em `concurrency` threads, na ordem de
+        prioridade. Com `budget` (segundos, contados do início, downloads
+        inclusive), lotes de API e clientes que não começaram até o limite são
+        pulados; os que já estão em andamento terminam. O estado dos feeds só é
+        gravado se todos os clientes que casaram com as entradas deles foram
+        gravados, como as janelas das APIs; com `scoped` (só parte dos
+        clientes) ele nem é lido. Devolve quantos clientes pulou.
+        """
+        deadline = time.monotonic() + budget if budget else None
+        cache_before = cache_stats()
         utc_now      = datetime.utcnow()
         since_dt     = utc_now - timedelta(days=LOOKBACK_DAYS)
-        overall_total = 0
-
-        for client in clients:
-            kws   = [strip_accents(kw.strip('"').lower()) for kw in client.keywords.split(",") if kw.strip()]
-            if not kws:
-                self.stdout.write(self.style.WARNING(f"{client.name}: sem keywords"))
-                continue
-
-            seen  = set()
-            query = build_advanced_query(kws, getattr(client, "operators", None))
-
-            # ──────────────── THREAD POOL ────────────────
-            with ThreadPoolExecutor(max_workers=4) as exe:
-                futures = {
-                    exe.submit(self.fetch_newsdata,   client, query, since_dt, utc_now, seen): "NewsData",
-                    exe.submit(self.fetch_google_rss, client, kws,               seen): "GoogleRSS",
-                    exe.submit(self.fetch_rss_feeds,  client, kws,     since_dt, seen): "RSSFeeds",
-                    exe.submit(self.fetch_scrape,     client, kws,               seen): "WebScrape",
-                }
-                
-
-                total = 0
-                for fut in as_completed(futures):
-                    src = futures[fut]
-                    try:
-                        cnt = fut.result()
-                        total += cnt
-                        self.stdout.write(self.style.SUCCESS(f"{client.name} • {src}: {cnt} novas"))
-                    except Exception as e:
-                        self.stdout.write(self.style.ERROR(f"{client.name} • {src} erro: {e}"))
-
-            overall_total += total
-            self.stdout.write(self.style.SUCCESS(f"{client.name}: total inseridas {total} notícias"))
-
-        self.stdout.write(self.style.SUCCESS(f"🎉 Geral: {overall_total} notícias inseridas"))
-
-
-    def fetch_newsdata(self, client, query, since_dt, until_dt, seen):
-        cnt = 0
-        if not NEWSDATA_KEY:
-            return cnt
-        params = {
-            'apikey': NEWSDATA_KEY,
-            'q': query,
-            'language': 'pt',
-            'from_date': since_dt.strftime('%Y-%m-%d'),
-            'to_date': until_dt.strftime('%Y-%m-%d'),
-        }
-        resp = requests.get(NEWSDATA_URL, params=params, timeout=30)
-        data = resp.json() if resp.ok else {}
-        for item in data.get('results', []):
-            url = item.get('link') or item.get('url')
-            if url and url not in seen:
-                seen.add(url)
-                save_article(
-                    client,
-                    item.get('title', '')[:300],
-                    url,
-                    item.get('pubDate'),
-                    item.get('source_id') or item.get('source_name', '')
-                )
-                cnt += 1
-        return cnt
-
-
-    def fetch_google_rss(self, client, kws, seen):
-        cnt = 0
-        try:
-            query = " OR ".join(f'"{kw}"' if ' ' in kw else kw for kw in kws)
-            rss_url = (
-                'https://news.google.com/rss/search?'
-                'hl=pt-BR&gl=BR&ceid=BR:pt-150&q=' + quote_plus(query)
-            )
-            feed = feedparser.parse(rss_url)
-            self.stdout.write(
-                f"▶ GoogleRSS retornou {len(feed.entries)} itens para {client.name}"
-            )
-            for entry in feed.entries:
-                title = strip_accents((entry.get('title') or '').strip().lower())
-                url = entry.get('link')
-                if not url or url in seen:
-                    continue
-                pub_struct = entry.get('published_parsed') or entry.get('updated_parsed')
-                if not pub_struct:
-                    continue
-                pub_dt = datetime.fromtimestamp(
-                    time.mktime(pub_struct), tz=timezone.utc
-                )
-                seen.add(url)
-                save_article(
-                    client,
-                    entry.get('title', '')[:300],
-                    url,
-                    pub_dt.isoformat(),
-                    entry.get('source', {}).get('title', '')
-                )
-                cnt += 1
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(
-                    f"{client.name} • GoogleRSS erro: {e}"
-                )
-            )
-        return cnt
-
-    def fetch_rss_feeds(self, client, kws, last_fetch_time, seen):
-        cnt = 0
-        last_fetch = (
-            last_fetch_time.replace(tzinfo=timezone.utc)
-            if last_fetch_time.tzinfo is None
-            else last_fetch_time.astimezone(timezone.utc)
+        ctx = FetchContext(
+            since_dt, utc_now, self.stdout, self.style, concurrency=concurrency, recorder=self.recorder,
+            deadline=deadline, scoped=scoped,
         )
-        try:
-            for rss_url in RSS_FEEDS:
-                feed = feedparser.parse(rss_url)
-                for entry in feed.entries:
-                    title = (entry.get('title') or '').strip()
-                    if not any(kw in title.lower() for kw in kws):
-                        continue
-                    url = entry.get('link')
-                    if not url or url in seen:
-                        continue
-                    pub_struct = (entry.get('published_parsed') or entry.get('updated_parsed'))
-                    if not pub_struct:
-                        continue
-                    pub_dt = datetime.fromtimestamp(
-                        time.mktime(pub_struct), tz=timezone.utc
-                    )
-                    if pub_dt <= last_fetch:
-                        continue
-                    seen.add(url)
-                    save_article(
-                        client,
-                        title,
-                        url,
-                        pub_dt.isoformat(),
-                        entry.get('source', {}).get('title', '')
-                    )
-                    cnt += 1
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(
-                    f"{client.name} • RSSFeeds erro: {e}"
-                )
-            )
-        return cnt
-
-    def fetch_scrape(self, client, kws, seen):
-        cnt = 0
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        for site in SCRAPE_SITES:
-            try:
-                r = requests.get(site['url'], headers=headers, timeout=15)
-                r.raise_for_status()
-            except Exception:
-                continue
-            time.sleep(1)
-            soup = BeautifulSoup(r.text, 'html.parser')
-            for block in soup.select(site['title_selector']):
-                title = block.get_text(strip=True) or ''
-                if not any(kw in title.lower() for kw in kws):
-                    continue
-                link_tag = block.select_one(site['link_selector'])
-                if not link_tag:
-                    continue
-                url = link_tag.get('href')
-                if not url or url in seen:
-                    continue
-                raw = None
-                date_tag = block.select_one(site['date_selector'])
-                if date_tag:
-                    raw = date_tag.get_text(strip=True)
-                seen.add(url)
-                save_article(client, title, url, raw, site['url'])
-                cnt += 1
-        return cnt
-
-    def fetch_newsapi(self, client, query, since_dt, until_dt, seen):
-        cnt = 0
-        if not NEWSAPI_KEY:
-            return cnt
 
-        limit_since = until_dt - timedelta(days=MAX_NEWSAPI_DAYS)
-        since_dt_api = max(since_dt, limit_since)
-        api = NewsApiClient(api_key=NEWSAPI_KEY)
+        self.report_progress(0, len(clients) + 1, "Baixando feeds")
+        connectors, entries = self.load_entries(ctx, clients)
 
-        try:
-            resp = api.get_everything(
-                q=query,
-                language='pt',
-                from_param=since_dt_api.strftime('%Y-%m-%d'),
-                to=until_dt.strftime('%Y-%m-%d'),
-                sort_by='relevancy',
-                page_size=100,
-                domains=','.join(d.strip() for d in client.domains.split(',')) if client.domains else None
-            )
-        except Exception as e:
+        def run_client(client):
+            if deadline and time.monotonic() > deadline:
+                return False
+            try:
+                self.write_client(client, connectors, entries.get(client.id, {}))
+                return True
+            finally:
+                # cada thread abre a própria conexão com o banco
+                connection.close()
+
+        skipped = 0
+        finished = []
+        # a fila do executor é FIFO: os de maior prioridade começam primeiro
+        with ThreadPoolExecutor(max_workers=concurrency) as exe:
+            futures = {exe.submit(run_client, client): client for client in clients}
+            for done, fut in enumerate(as_completed(futures), start=1):
+                client = futures[fut]
+                try:
+                    if not fut.result():
+                        skipped += 1
+                    else:
+                        finished.append(client)
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"{client.name} erro: {e}"))
+                self.report_progress(done, len(clients) + 1, client.name)
+
+        self.writer.flush()
+        # só agora, fora das threads: as janelas andam apenas para quem terminou
+        for client in finished:
+            save_watermarks(client, {
+                source: until for (cid, source), until in ctx.fetched.items() if cid == client.id
+            })
+        if scoped:
+            # clientes fora da coleta podem casar com as mesmas entradas
+            blocked = {origin for origin, _ in ctx.held}
+        else:
+            done_ids = {client.id for client in finished}
+            blocked = {
+                entry["origin"]
+                for cid, by_source in entries.items() if cid not in done_ids
+                for found in by_source.values() for entry in found
+            }
+        held = ctx.commit(blocked)
+        if held:
+            self.stdout.write(self.style.WARNING(
+                f"{held} feeds com entradas de clientes não gravados serão relidos na próxima coleta"
+            ))
+        for name, st in cache_stats(since=cache_before).items():
             self.stdout.write(
-                self.style.WARNING(
-                    f"NewsAPI pulado: {e}"
-                )
+                f"Cache {name}: {st['hits']} hits, {st['misses']} misses, "
+                f"{st['evictions']} removidos"
             )
-            return cnt
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f"Tempo da coleta esgotado: {skipped} clientes ficaram para a próxima"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"🎉 Geral: {self.writer.inserted} notícias inseridas "
+            f"({self.writer.duplicates} duplicadas)"
+        ))
+        return skipped
+
+    def load_entries(self, ctx, clients):
+        """
+        Roda os conectores habilitados. As requisições dos conectores HTTP vão
+        todas num único fetch_all (um pool, limites globais e por host); as
+        APIs, que têm cliente e cota próprios, rodam em threads enquanto isso.
+        Devolve (conectores, {client_id: {conector: entradas}}).
+        """
+        connectors = get_connectors()
+        found = {connector.name: [] for connector in connectors}
+
+        def guarded(connector, fn, *args):
+            try:
+                return fn(*args)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"{connector.label} erro: {e}"))
+                return None
 
-        for idx, art in enumerate(resp.get('articles', [])):
+        def run_api(connector):
             try:
-                url = art.get('url')
-                if not url or url in seen:
+                return guarded(connector, connector.fetch, ctx, clients) or []
+            finally:
+                connection.close()
+
+        http = []
+        apis = []
+        for connector in connectors:
+            candidates = connector.candidates(clients)
+            if not candidates:
+                continue
+            if isinstance(connector, HTTPConnector):
+                reqs = guarded(connector, connector.requests, ctx, candidates)
+                if reqs is not None:
+                    http.append((connector, candidates, reqs))
+            else:
+                apis.append(connector)
+
+        with ThreadPoolExecutor(max_workers=max(len(apis), 1)) as exe:
+            api_futures = {connector.name: exe.submit(run_api, connector) for connector in apis}
+            results = iter(fetch_all(req for _, _, reqs in http for req in reqs))
+            for connector, candidates, reqs in http:
+                raw = list(islice(results, len(reqs)))
+                found[connector.name] = guarded(connector, connector.parse, ctx, candidates, raw) or []
+            for name, fut in api_futures.items():
+                found[name] = fut.result()
+
+        entries = {}
+        for connector in connectors:
+            self.stdout.write(f"▶ {connector.label}: {len(found[connector.name])} itens carregados")
+            for entry in found[connector.name]:
+                for client_id in entry["clients"]:
+                    entries.setdefault(client_id, {}).setdefault(connector.name, []).append(entry)
+        return connectors, entries
+
+    def write_client(self, client, connectors, entries):
+        """Grava as entradas de um cliente (`entries`: {conector: entradas})"""
+        if not client_keywords(client):
+            self.stdout.write(self.style.WARNING(f"{client.name}: sem keywords"))
+            return
+
+        seen = set()
+        for connector in connectors:
+            if not connector.accepts(client):
+                continue
+            cnt = 0
+            for entry in entries.get(connector.name, []):
+                url = entry['url']
+                if url in seen:
                     continue
                 seen.add(url)
-
-                # Proteção extra em todos os campos
-                title = art.get('title') or ''
-                published = art.get('publishedAt') or ''
-                source = art.get('source') or {}
-                if not isinstance(source, dict):
-                    source = {}
-
-                source_name = source.get('name', '')
-
-                # Certifique-se de que a função save_article está definida e acessível
-                # ou substitua pela sua lógica de salvamento.
-                # Exemplo:
-                # from .models import Article # Se Article for um modelo Django
-                # Article.objects.create(
-                #     client=client,
-                #     title=title[:300],
-                #     url=url,
-                #     published_at=datetime.datetime.strptime(published, '%Y-%m-%dT%H:%M:%SZ'), # Ajuste o formato se necessário
-                #     source_name=source_name
-                # )
-                save_article( # Esta função precisa ser definida em seu escopo
+                self.writer.add(
                     client,
-                    title[:300],
+                    entry['title'][:300],
                     url,
-                    published,
-                    source_name
+                    entry['published'],
+                    entry['source'],
+                    origin=entry['origin'],
                 )
                 cnt += 1
-            except Exception as e:
-                # Mostra tudo o que está vindo no artigo para debugar
-                print(f"[ERRO FETCH NEWSAPI] Artigo {idx} problemático: {art}")
-                print(f"Erro: {e}")
+            self.stdout.write(self.style.SUCCESS(f"{client.name} • {connector.label}: {cnt} encontradas"))
 
-        return cnt
+        self.writer.flush()
+        stats = self.writer.stats[client.id]
+        self.stdout.write(self.style.SUCCESS(
+            f"{client.name}: total inseridas {stats['inserted']} notícias "
+            f"({stats['duplicates']} duplicadas)"
+        ))
 
+    def report_progress(self, done, total, message=""):
+        if self.progress:
+            self.progress(done, total, message)
+
+
+def buscar_noticias_para_clientes(clientes):
+    """Busca para vários clientes, com todos os conectores; devolve quantas notícias inseriu"""
+    cmd = Command()
+    cmd.fetch_clients(list(clientes), scoped=True)
+    return cmd.writer.inserted
 
 
 def buscar_noticias_para_cliente(cliente):
     """Função que executa as buscas de fontes para um único cliente"""
-    # Parte da lógica já presente no método handle()
-    from datetime import datetime, timedelta
-    kws = [strip_accents(kw.strip('"').lower()) for kw in cliente.keywords.split(",") if kw.strip()]
-    if not kws:
-        return 0
-
-    seen = set()
-    utc_now = datetime.utcnow()
-    since_dt = utc_now - timedelta(days=LOOKBACK_DAYS)
-    query = build_advanced_query(kws, getattr(cliente, "operators", None))
-    total = 0
-
-    # O ideal seria também modularizar essas funções para não depender de self
-    # Por simplicidade, vamos chamar só as funções que não dependem de self
-    total += Command().fetch_google_rss(cliente, kws, seen)
-    total += Command().fetch_rss_feeds(cliente, kws, since_dt, seen)
-    total += Command().fetch_scrape(cliente, kws, seen)
-    # Descomente as linhas abaixo se NewsAPI/NewsData estiverem configuradas
-    total += Command().fetch_newsapi(cliente, query, since_dt, utc_now, seen)
-    total += Command().fetch_newsdata(cliente, query, since_dt, utc_now, seen)
-
-    return total
-          
-
+    return buscar_noticias_para_clientes([cliente])
@@ -1,10 +1,11 @@
 # newsclip/management/commands/generate_report.py
 
+import csv
 import os
 import pathlib
 
-import pandas as pd
 import pdfkit
+import xlsxwriter
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.core.management.base import BaseCommand
@@ -12,9 +13,70 @@ from django.template.loader import render_to_string
 from django.utils import timezone
 from django.utils.text import slugify
 
+from newsclip.clustering import collapse_clusters
 from newsclip.models import Client, Article
 
 
+COLUMNS = ["Título", "Data", "Link", "Fonte", "Resumo"]
+# linhas lidas do banco por vez
+CHUNK_SIZE = 2000
+
+
+def iter_rows(qs, collapsed=False):
+    """
+    Linhas do relatório lidas em blocos do banco, sem carregar tudo na memória.
+    Com collapsed=True (qs vindo de collapse_clusters), a fonte indica quantas
+    outras cópias da mesma notícia foram omitidas.
+    """
+    tz = timezone.get_current_timezone()
+    fields = ["story__title", "published_at", "story__url", "story__source", "story__summary"]
+    rows = qs.values_list(*fields, "copies") if collapsed else qs.values_list(*fields)
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        title, published_at, url, source, summary = row[:5]
+        copies = row[5] if collapsed else 1
+        yield [
+            title,
+            published_at.astimezone(tz).strftime("%d/%m/%Y %H:%M") if published_at else "",
+            url,
+            f"{source} (+{copies - 1})" if copies > 1 else source,
+            summary or "",
+        ]
+
+
+def write_csv(path, rows):
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_xlsx(path, rows):
+    """
+    Escreve o Excel em modo constant_memory (cada linha vai direto para o disco)
+    e calcula a largura das colunas à medida que as linhas passam.
+    """
+    workbook = xlsxwriter.Workbook(str(path), {"constant_memory": True})
+    worksheet = workbook.add_worksheet("Artigos")
+    header = workbook.add_format({"bold": True, "font_color": "#FFFFFF", "bg_color": "#4F81BD"})
+    worksheet.write_row(0, 0, COLUMNS, header)
+    widths = [len(col) for col in COLUMNS]
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        worksheet.write_row(count, 0, row)
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(value))
+    for i, width in enumerate(widths):
+        worksheet.set_column(i, i, width + 2)
+    worksheet.autofilter(0, 0, count, len(COLUMNS) - 1)
+    worksheet.freeze_panes(1, 0)
+    workbook.close()
+    return count
+
+
 class Command(BaseCommand):
     help = "Gera relatório (PDF/Excel/CSV) de notícias para um cliente num intervalo arbitrário"
 
@@ -31,6 +93,15 @@ class Command(BaseCommand):
             "--format", choices=["pdf", "xlsx", "csv"], required=True,
             help="Formato de saída"
         )
+        parser.add_argument(
+            "--collapse", action="store_true",
+            help="Agrupa quase-duplicatas: uma linha por notícia, com o número de cópias"
+        )
+        parser.add_argument(
+            "--engine", choices=["pdfkit", "reportlab"], default=None,
+            help="Motor do PDF: pdfkit (wkhtmltopdf) ou reportlab (em processo). "
+                 "Padrão: settings.REPORT_PDF_ENGINE"
+        )
 
     def handle(self, *args, **options):
         client_id  = options["client_id"]
@@ -62,25 +133,15 @@ class Command(BaseCommand):
         else:
             qs = Article.objects.filter(client=client).order_by("published_at")
 
+        collapsed = bool(options.get("collapse"))
+        if collapsed:
+            qs = collapse_clusters(qs).order_by("published_at")
+
         if not qs.exists():
             msg = "nenhum artigo neste período." if days is not None else "nenhum artigo cadastrado."
             self.stdout.write(self.style.WARNING(f"{client.name}: {msg}"))
             return
 
-        # monta DataFrame
-        data = []
-        for art in qs:
-            data.append({
-                "Título": art.title,
-                "Data": art.published_at.astimezone(
-                    timezone.get_current_timezone()
-                ).strftime("%d/%m/%Y %H:%M"),
-                "Link": art.url,
-                "Fonte": art.source,
-                "Resumo": getattr(art, "summary", "") or ""
-            })
-        df = pd.DataFrame(data)
-
         # prepara diretório
         rep_dir = pathlib.Path(settings.MEDIA_ROOT) / "reports"
         rep_dir.mkdir(parents=True, exist_ok=True)
@@ -104,35 +165,44 @@ class Command(BaseCommand):
         filename    = f"relatorio_{slug}_{date_str}_v{v}_{label}.{out_format}"
         output_path = rep_dir / filename
 
-        # === CSV / XLSX ===
+        # === CSV / XLSX (gravados linha a linha) ===
         if out_format in ("csv", "xlsx"):
             if out_format == "xlsx":
-                with pd.ExcelWriter(output_path, engine="xlsxwriter") as writer:
-                    df.to_excel(writer, index=False, sheet_name="Artigos")
-                    workbook  = writer.book
-                    worksheet = writer.sheets["Artigos"]
-                    max_row, max_col = df.shape
-                    worksheet.add_table(
-                        0, 0, max_row, max_col - 1,
-                        {
-                            "columns": [{"header": h} for h in df.columns],
-                            "style": "Table Style Medium 9",
-                            "autofilter": True
-                        }
-                    )
-                    for i, col in enumerate(df.columns):
-                        width = max(df[col].astype(str).map(len).max(), len(col)) + 2
-                        worksheet.set_column(i, i, width)
+                count = write_xlsx(output_path, iter_rows(qs, collapsed))
                 self.stdout.write(self.style.SUCCESS(
-                    f"{client.name}: relatório Excel gerado → {output_path}"
+                    f"{client.name}: relatório Excel gerado ({count} artigos) → {output_path}"
                 ))
             else:  # CSV
-                df.to_csv(output_path, index=False, encoding="utf-8")
+                count = write_csv(output_path, iter_rows(qs, collapsed))
                 self.stdout.write(self.style.SUCCESS(
-                    f"{client.name}: relatório CSV gerado → {output_path}"
+                    f"{client.name}: relatório CSV gerado ({count} artigos) → {output_path}"
                 ))
             return
 
+        interval = "Completo" if days is None else f"Últimos {days} dias"
+        engine = options.get("engine") or getattr(settings, "REPORT_PDF_ENGINE", "pdfkit")
+
+        # === PDF (reportlab, página a página) ===
+        if engine == "reportlab":
+            try:
+                from newsclip.pdf_report import render_report_pdf
+            except ImportError:
+                self.stderr.write(self.style.ERROR(
+                    "❌ reportlab não instalado. Use --engine pdfkit ou instale reportlab."
+                ))
+                return
+            count = render_report_pdf(
+                output_path,
+                client.name,
+                interval,
+                timezone.localtime(now),
+                iter_rows(qs, collapsed),
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"{client.name}: relatório PDF gerado ({count} artigos) → {output_path}"
+            ))
+            return
+
         # === PDF (wkhtmltopdf) ===
         bin_path = getattr(settings, "WKHTMLTOPDF_CMD", None)
         if not bin_path or not os.path.isfile(bin_path):
@@ -146,8 +216,8 @@ class Command(BaseCommand):
 
         html = render_to_string("report_templates/report.html", {
             "client": client,
-            "articles": df.to_dict(orient="records"),
-            "interval": "Completo" if days is None else f"Últimos {days} dias",
+            "articles": [dict(zip(COLUMNS, row)) for row in iter_rows(qs, collapsed)],
+            "interval": interval,
             "generated_at": now,
         })
         config  = pdfkit.configuration(wkhtmltopdf=bin_path)
@@ -0,0 +1,22 @@
+# newsclip/management/commands/rebuild_article_stats.py
+
+from django.core.management.base import BaseCommand
+
+from newsclip.rollup import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula do zero o rollup diário de artigos (ArticleDailyStat). "
+        "Só é necessário se artigos forem alterados fora do app (SQL direto, shell…)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--client-id", type=int, action="append", dest="client_ids",
+            help="Recalcula só este cliente (pode repetir)"
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild(options["client_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Rollup recalculado: {total} artigos contabilizados"))
@@ -0,0 +1,34 @@
+# newsclip/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from newsclip.models import Story
+from newsclip.search import get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Recria do zero o índice de busca textual das notícias (FTS5 no SQLite, "
+        "tsvector/GIN no Postgres). As novas já são indexadas na gravação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        qs = Story.objects.order_by("id").only("id", "title", "summary", "body")
+        total, last_id = 0, 0
+        with transaction.atomic():
+            backend.clear()
+            while True:
+                chunk = list(qs.filter(id__gt=last_id)[:options["chunk_size"]])
+                if not chunk:
+                    break
+                backend.index(chunk)
+                last_id = chunk[-1].id
+                total += len(chunk)
+                self.stdout.write(f"  {total} notícias indexadas…", ending="\r")
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(f"Índice de busca recriado: {total} notícias"))
@@ -0,0 +1,70 @@
+# newsclip/management/commands/reclassify_topics.py
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from newsclip.models import Article, Story
+from newsclip.rollup import apply_deltas, queryset_deltas
+from newsclip.topics import UNCLASSIFIED, TopicClassifier, story_text
+
+
+class Command(BaseCommand):
+    help = (
+        "Reclassifica o tópico das notícias já gravadas com os dicionários atuais "
+        "(Topic), em lotes, ajustando o rollup diário dos clientes afetados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=0,
+            help="Só notícias gravadas nos últimos N dias (0 = todas)"
+        )
+        parser.add_argument(
+            "--unclassified", action="store_true",
+            help=f'Só as notícias ainda em "{UNCLASSIFIED}"'
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        classifier = TopicClassifier.from_db()
+        qs = Story.objects.order_by("id").only("id", "title", "summary", "topic")
+        if options["days"]:
+            qs = qs.filter(created_at__gte=timezone.now() - timedelta(days=options["days"]))
+        if options["unclassified"]:
+            qs = qs.filter(topic__in=[UNCLASSIFIED, ""])
+
+        total = changed = 0
+        last_id = 0
+        while True:
+            # por faixa de id: cada lote é uma consulta curta, sem OFFSET
+            chunk = list(qs.filter(id__gt=last_id)[:options["chunk_size"]])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            total += len(chunk)
+            updated = []
+            for story, topic in zip(chunk, classifier.classify_many(story_text(s) for s in chunk)):
+                if story.topic != topic:
+                    story.topic = topic
+                    updated.append(story)
+            if updated:
+                changed += self._save(updated)
+            self.stdout.write(f"  {total} notícias verificadas, {changed} alteradas…", ending="\r")
+
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(
+            f"{changed} de {total} notícias com tópico alterado"
+        ))
+
+    def _save(self, stories):
+        # o tópico faz parte da chave do rollup: tira as contagens antigas e põe as novas
+        links = Article.objects.filter(story__in=[s.id for s in stories])
+        with transaction.atomic():
+            deltas = queryset_deltas(links, -1)
+            updated = Story.objects.bulk_update(stories, ["topic"], batch_size=500)
+            deltas.update(queryset_deltas(links))
+            apply_deltas(deltas)
+        return updated
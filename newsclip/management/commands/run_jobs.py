@@ -0,0 +1,49 @@
+# newsclip/management/commands/run_jobs.py
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from newsclip.jobs import claim_next, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = "Worker da fila de jobs: executa buscas de notícias e relatórios agendados pela interface"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=5,
+            help="Segundos de espera quando a fila está vazia"
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Esvazia a fila e sai (útil em cron)"
+        )
+        parser.add_argument(
+            "--stale-minutes", type=int, default=10,
+            help="Jobs em execução sem sinal do worker há mais tempo que isso voltam para a fila "
+                 "(ou falham, se as tentativas acabaram)"
+        )
+
+    def handle(self, *args, **options):
+        stale = timedelta(minutes=options["stale_minutes"])
+        self.stdout.write(self.style.SUCCESS("▶ Worker de jobs iniciado"))
+        while True:
+            requeued, failed = requeue_stale(stale)
+            if requeued:
+                self.stdout.write(self.style.WARNING(f"{requeued} job(s) travado(s) devolvido(s) à fila"))
+            if failed:
+                self.stdout.write(self.style.ERROR(f"{failed} job(s) travado(s) sem mais tentativas"))
+
+            job = claim_next()
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+                continue
+
+            self.stdout.write(f"▶ {job.kind} #{job.pk} {job.params}")
+            job = run_job(job)
+            style = self.style.SUCCESS if job.status == "done" else self.style.ERROR
+            self.stdout.write(style(f"{job.kind} #{job.pk}: {job.status} {job.message}"))
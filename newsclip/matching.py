@@ -0,0 +1,125 @@
+# newsclip/matching.py
+
+import re
+import unicodedata
+from collections import deque
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def strip_accents(s: str) -> str:
+    """Remove acentos de uma string"""
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', s)
+        if not unicodedata.combining(c)
+    )
+
+
+def tokenize(text: str) -> list[str]:
+    """Quebra o texto em palavras sem acento e em minúsculas"""
+    return _TOKEN_RE.findall(strip_accents(text or "").casefold())
+
+
+def client_keywords(client) -> list[str]:
+    """Lista de keywords do cliente, sem aspas e normalizadas"""
+    return [
+        strip_accents(kw.strip().strip('"').strip().lower())
+        for kw in (client.keywords or "").split(",")
+        if kw.strip().strip('"').strip()
+    ]
+
+
+class KeywordMatcher:
+    """
+    Autômato Aho-Corasick sobre palavras (não caracteres): cada keyword
+    vira uma sequência de tokens, então "rio preto" só casa com as duas
+    palavras inteiras e em sequência. Um título é percorrido uma única vez,
+    independente de quantas keywords/clientes existam.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out  = [[]]
+        # link de dicionário: o sufixo mais longo (pelos links de falha) que
+        # também termina uma keyword; as saídas não são copiadas entre estados
+        self._dict = [0]
+        self._built = True
+
+    def __len__(self):
+        return len(self._goto) - 1
+
+    def add(self, keyword: str, value) -> None:
+        tokens = tokenize(keyword)
+        if not tokens:
+            return
+        state = 0
+        for tok in tokens:
+            nxt = self._goto[state].get(tok)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._dict.append(0)
+                self._goto[state][tok] = nxt
+            state = nxt
+        if value not in self._out[state]:
+            self._out[state].append(value)
+        self._built = False
+
+    def build(self) -> "KeywordMatcher":
+        """Calcula os links de falha e de dicionário (BFS)"""
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            state = queue.popleft()
+            for tok, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and tok not in self._goto[fail]:
+                    fail = self._fail[fail]
+                suffix = self._fail[nxt] = self._goto[fail].get(tok, 0)
+                self._dict[nxt] = suffix if self._out[suffix] else self._dict[suffix]
+        self._built = True
+        return self
+
+    def iter_matches(self, text: str):
+        """Gera o valor associado a cada ocorrência de keyword no texto"""
+        for _, value in self.iter_positions(tokenize(text)):
+            yield value
+
+    def iter_positions(self, tokens):
+        """
+        (posição do último token, valor) de cada ocorrência numa sequência de
+        tokens já normalizados (tokenize). Um token que nenhuma keyword tem
+        volta o autômato à raiz: serve de separador entre textos.
+        """
+        if not self._built:
+            self.build()
+        goto, fail, out, dict_ = self._goto, self._fail, self._out, self._dict
+        state = 0
+        for pos, tok in enumerate(tokens):
+            while state and tok not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(tok, 0)
+            node = state if out[state] else dict_[state]
+            while node:
+                for value in out[node]:
+                    yield pos, value
+                node = dict_[node]
+
+    def match(self, text: str) -> set:
+        """Conjunto de valores (ex.: IDs de cliente) cujas keywords aparecem no texto"""
+        return set(self.iter_matches(text))
+
+    @classmethod
+    def from_clients(cls, clients) -> "KeywordMatcher":
+        matcher = cls()
+        for client in clients:
+            for kw in client_keywords(client):
+                matcher.add(kw, client.id)
+        return matcher.build()
@@ -0,0 +1,166 @@
+# newsclip/metrics.py
+#
+# Instrumentação das coletas: durante o fetch_news o FetchRecorder junta em
+# memória os números de cada fonte (tempos, status, bytes, entradas) e, no
+# fim, grava uma FetchRun com as FetchSourceStat. O painel de fontes e o
+# endpoint /metrics (formato de texto do Prometheus) leem daqui.
+
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+from newsclip.models import FetchRun, FetchSourceStat
+
+
+class FetchRecorder:
+    """Números por fonte de uma coleta; `key` é o mesmo `origin` passado ao ArticleWriter"""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def source(self, key, kind, url, client=None):
+        with self._lock:
+            stat = self._stats.get(key)
+            if stat is None:
+                stat = self._stats[key] = FetchSourceStat(kind=kind, url=url, client=client)
+            return stat
+
+    def response(self, key, kind, result, client=None):
+        """Registra um resultado do fetch_engine"""
+        stat = self.source(key, kind, result["url"], client)
+        timings = result.get("timings") or {}
+        stat.http_status = result["status"]
+        stat.error = result["error"] or ""
+        stat.cached = bool(result.get("cached"))
+        stat.bytes = len(result["content"] or b"")
+        stat.total_ms = result["elapsed"] * 1000
+        stat.connect_ms = timings["connect"] * 1000 if "connect" in timings else None
+        stat.tls_ms = timings["tls"] * 1000 if "tls" in timings else None
+        stat.wait_ms = timings["wait"] * 1000 if "wait" in timings else None
+        return stat
+
+    @contextmanager
+    def timed(self, stat, field="parse_ms"):
+        started = time.monotonic()
+        try:
+            yield stat
+        finally:
+            setattr(stat, field, (getattr(stat, field) or 0) + (time.monotonic() - started) * 1000)
+
+    def save(self, run, writer):
+        """Grava as fontes na `run`, com inseridas/duplicadas contadas pelo writer"""
+        for key, stat in self._stats.items():
+            counts = writer.origins.get(key, {})
+            stat.run = run
+            stat.inserted = counts.get("inserted", 0)
+            stat.duplicates = counts.get("duplicates", 0)
+        FetchSourceStat.objects.bulk_create(self._stats.values(), batch_size=500)
+
+
+def prune_runs(keep_days):
+    return FetchRun.objects.filter(started_at__lt=timezone.now() - timedelta(days=keep_days)).delete()
+
+
+def source_health(runs=20):
+    """
+    Uma linha por fonte nas últimas `runs` coletas: erros, tempo médio e
+    máximo, entradas e inseridas. As com mais falhas e mais lentas primeiro.
+    """
+    run_ids = list(
+        FetchRun.objects.exclude(status="running").values_list("id", flat=True)[:runs]
+    )
+    failed = Q(error__gt="") | Q(http_status__gte=400)
+    return (
+        FetchSourceStat.objects
+        .filter(run_id__in=run_ids)
+        .values("kind", "url")
+        .annotate(
+            runs=Count("id"),
+            failures=Count("id", filter=failed),
+            avg_ms=Avg("total_ms"),
+            max_ms=Max("total_ms"),
+            entries=Sum("entries"),
+            inserted=Sum("inserted"),
+            last_run=Max("run_id"),
+        )
+        .order_by("-failures", "-avg_ms")
+    )
+
+
+# —————————————————————————————————————————
+# Formato de texto do Prometheus
+# —————————————————————————————————————————
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+SOURCE_METRICS = [
+    # (nome, tipo, ajuda, valor a partir da FetchSourceStat)
+    ("newsclip_fetch_source_up", "gauge", "1 se a fonte respondeu sem erro na última coleta",
+     lambda s: int(s.ok)),
+    ("newsclip_fetch_source_http_status", "gauge", "Status HTTP da última coleta (0 = sem resposta)",
+     lambda s: s.http_status or 0),
+    ("newsclip_fetch_source_duration_seconds", "gauge", "Tempo total da requisição",
+     lambda s: (s.total_ms or 0) / 1000),
+    ("newsclip_fetch_source_connect_seconds", "gauge", "Tempo de DNS + conexão TCP",
+     lambda s: (s.connect_ms or 0) / 1000),
+    ("newsclip_fetch_source_wait_seconds", "gauge", "Tempo até o primeiro byte da resposta",
+     lambda s: (s.wait_ms or 0) / 1000),
+    ("newsclip_fetch_source_parse_seconds", "gauge", "Tempo de parse das entradas",
+     lambda s: (s.parse_ms or 0) / 1000),
+    ("newsclip_fetch_source_bytes", "gauge", "Tamanho da resposta",
+     lambda s: s.bytes),
+    ("newsclip_fetch_source_entries", "gauge", "Entradas lidas",
+     lambda s: s.entries),
+    ("newsclip_fetch_source_matched", "gauge", "Pares entrada x cliente que casaram",
+     lambda s: s.matched),
+    ("newsclip_fetch_source_inserted", "gauge", "Artigos inseridos",
+     lambda s: s.inserted),
+    ("newsclip_fetch_source_duplicates", "gauge", "Artigos que já existiam",
+     lambda s: s.duplicates),
+]
+
+
+def prometheus_text():
+    """Métricas da última coleta concluída, no formato de exposição do Prometheus"""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+
+    run = FetchRun.objects.exclude(status="running").first()
+    metric("newsclip_fetch_runs_total", "counter", "Coletas registradas, por status", [
+        (_labels(status=r["status"]), r["n"])
+        for r in FetchRun.objects.order_by().values("status").annotate(n=Count("id"))
+    ])
+    if run is None:
+        return "\n".join(lines) + "\n"
+
+    metric("newsclip_fetch_last_run_timestamp_seconds", "gauge", "Início da última coleta",
+           [("", int(run.started_at.timestamp()))])
+    metric("newsclip_fetch_last_run_duration_seconds", "gauge", "Duração da última coleta",
+           [("", run.duration or 0)])
+    metric("newsclip_fetch_last_run_success", "gauge", "1 se a última coleta terminou sem erro",
+           [("", int(run.status == "done"))])
+    metric("newsclip_fetch_last_run_inserted", "gauge", "Artigos inseridos na última coleta",
+           [("", run.inserted)])
+
+    sources = list(run.sources.all())
+    for name, kind, help_text, value in SOURCE_METRICS:
+        metric(name, kind, help_text, [
+            (_labels(kind=s.kind, source=s.url, client=s.client_id or ""), value(s))
+            for s in sources
+        ])
+    return "\n".join(lines) + "\n"
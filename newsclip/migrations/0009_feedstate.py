@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0008_client_instagram_client_x_client_youtube'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.TextField(unique=True, verbose_name='Feed')),
+                ('etag', models.CharField(blank=True, max_length=500, verbose_name='ETag')),
+                ('modified', models.CharField(blank=True, max_length=100, verbose_name='Last-Modified')),
+                ('last_entry_at', models.DateTimeField(blank=True, null=True, verbose_name='Última entrada vista')),
+                ('last_status', models.IntegerField(blank=True, null=True, verbose_name='Último status HTTP')),
+                ('checked_at', models.DateTimeField(blank=True, null=True, verbose_name='Última verificação')),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('newsclip', '0009_feedstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50, verbose_name='Tipo')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('dedupe_key', models.CharField(db_index=True, max_length=300)),
+                ('status', models.CharField(choices=[('queued', 'Na fila'), ('running', 'Executando'), ('done', 'Concluído'), ('failed', 'Falhou')], db_index=True, default='queued', max_length=10)),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='Progresso (%)')),
+                ('message', models.CharField(blank=True, max_length=500, verbose_name='Mensagem')),
+                ('output', models.TextField(blank=True, verbose_name='Saída')),
+                ('error', models.TextField(blank=True, verbose_name='Erro')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Máx. tentativas')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Executar a partir de')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='newsclip.client')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
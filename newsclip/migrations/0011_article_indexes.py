@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0010_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['client', '-published_at'], name='article_client_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('excluded', False)), fields=['client', '-published_at'], name='article_client_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['client', 'source'], name='article_client_source_idx'),
+        ),
+        # só remove o índice simples do FK depois que os compostos existem
+        migrations.AlterField(
+            model_name='article',
+            name='client',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='articles', to='newsclip.client'),
+        ),
+    ]
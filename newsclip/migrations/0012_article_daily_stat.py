@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def fill_daily_stats(apps, schema_editor):
+    Article = apps.get_model("newsclip", "Article")
+    ArticleDailyStat = apps.get_model("newsclip", "ArticleDailyStat")
+    rows = (
+        Article.objects.order_by()
+        .annotate(day=TruncDate("published_at"))
+        .values("client_id", "day", "source", "topic", "excluded")
+        .annotate(n=Count("id"))
+    )
+    ArticleDailyStat.objects.bulk_create(
+        (
+            ArticleDailyStat(
+                client_id=r["client_id"], day=r["day"], source=r["source"],
+                topic=r["topic"], excluded=r["excluded"], count=r["n"],
+            )
+            for r in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0011_article_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(blank=True, null=True, verbose_name='Dia')),
+                ('source', models.CharField(blank=True, max_length=500, verbose_name='Fonte')),
+                ('topic', models.CharField(blank=True, max_length=500, verbose_name='Tópico')),
+                ('excluded', models.BooleanField(default=False, verbose_name='Excluído')),
+                ('count', models.IntegerField(default=0, verbose_name='Artigos')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='newsclip.client')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='articledailystat',
+            constraint=models.UniqueConstraint(fields=('client', 'day', 'source', 'topic', 'excluded'), name='article_daily_stat_unique'),
+        ),
+        migrations.RunPython(fill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0012_article_daily_stat'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_client_pub_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_client_visible_idx',
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['client', '-published_at', '-id'], name='article_client_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('excluded', False)), fields=['client', '-published_at', '-id'], name='article_client_visible_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0013_article_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='cluster',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='Grupo de duplicatas'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='simhash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='SimHash'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0014_article_cluster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResolvedURL',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.TextField(unique=True, verbose_name='Link original (canônico)')),
+                ('resolved_url', models.TextField(verbose_name='Destino (canônico)')),
+                ('status', models.IntegerField(blank=True, null=True, verbose_name='Status HTTP')),
+                ('resolved_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Resolvido em')),
+            ],
+        ),
+    ]
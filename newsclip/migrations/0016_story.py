@@ -0,0 +1,92 @@
+from django.core.management.color import no_style
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+import django.db.models.deletion
+
+
+STORY_FIELDS = ["url", "title", "source", "published_at", "summary", "topic", "created_at", "simhash", "cluster"]
+
+
+def split_stories(apps, schema_editor):
+    """
+    Hoje cada URL existe uma única vez (Article.url era unique), então cada
+    artigo vira uma Story com o mesmo id e a ligação é só story_id = id.
+    """
+    Article = apps.get_model("newsclip", "Article")
+    Story = apps.get_model("newsclip", "Story")
+    batch = []
+    for row in Article.objects.order_by("id").values("id", *STORY_FIELDS).iterator(chunk_size=2000):
+        batch.append(Story(**row))
+        if len(batch) >= 2000:
+            Story.objects.bulk_create(batch)
+            batch = []
+    Story.objects.bulk_create(batch)
+    Article.objects.update(story_id=F("id"))
+    # auto_now_add sobrescreve created_at no bulk_create: copia de volta do artigo
+    Story.objects.update(created_at=Subquery(
+        Article.objects.filter(id=OuterRef("id")).values("created_at")[:1]
+    ))
+
+    # ids explícitos: a sequência (Postgres) precisa continuar depois do maior
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Story]):
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    # Postgres: o UPDATE do story_id (FK adiável) deixa eventos de trigger
+    # pendentes e os ALTER TABLE seguintes na mesma transação falham. Cada
+    # operação roda na sua; o RunPython continua atômico.
+    atomic = False
+
+    dependencies = [
+        ('newsclip', '0015_resolvedurl'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Story',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.TextField(unique=True, verbose_name='Link')),
+                ('title', models.CharField(max_length=500, verbose_name='Título')),
+                ('source', models.CharField(blank=True, max_length=500, verbose_name='Fonte')),
+                ('published_at', models.DateTimeField(blank=True, null=True, verbose_name='Publicação')),
+                ('summary', models.TextField(blank=True, verbose_name='Resumo')),
+                ('topic', models.CharField(blank=True, max_length=500, verbose_name='Tópico')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('simhash', models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='SimHash')),
+                ('cluster', models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='Grupo de duplicatas')),
+            ],
+            options={
+                'verbose_name': 'notícia',
+            },
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='story',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='links', to='newsclip.story'),
+        ),
+        migrations.RunPython(split_stories, migrations.RunPython.noop, atomic=True),
+        migrations.AlterField(
+            model_name='article',
+            name='story',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='links', to='newsclip.story'),
+        ),
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_client_source_idx',
+        ),
+        migrations.RemoveField(model_name='article', name='title'),
+        migrations.RemoveField(model_name='article', name='url'),
+        migrations.RemoveField(model_name='article', name='source'),
+        migrations.RemoveField(model_name='article', name='summary'),
+        migrations.RemoveField(model_name='article', name='topic'),
+        migrations.RemoveField(model_name='article', name='simhash'),
+        migrations.RemoveField(model_name='article', name='cluster'),
+        migrations.AddConstraint(
+            model_name='article',
+            constraint=models.UniqueConstraint(fields=('client', 'story'), name='article_client_story_unique'),
+        ),
+    ]
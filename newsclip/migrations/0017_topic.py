@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+# o dicionário que ficava fixo em SimpleTopicClassifier (mais plurais, já
+# que agora a comparação é por palavra inteira e não por substring)
+TOPICS = [
+    ("Política", "presidente, governo, ministro, senado, câmara, política, políticas, político, políticos, eleição, eleições, deputado, deputados, prefeito, governador"),
+    ("Economia", "economia, inflação, juros, pib, comércio, financeiro, financeira, mercado, dólar, bolsa, impostos"),
+    ("Esportes", "jogo, jogos, time, times, futebol, campeonato, esportes, olímpico, olímpicos, olimpíadas, copa"),
+    ("Tecnologia", "tecnologia, startup, startups, inovação, software, hardware, internet, inteligência artificial, aplicativo"),
+    ("Cultura", "cultura, música, filme, filmes, arte, literatura, teatro, cinema, show, festival"),
+    ("Saúde", "saúde, hospital, hospitais, vacina, vacinas, vacinação, doença, doenças, médico, médicos, tratamento"),
+]
+
+
+def seed_topics(apps, schema_editor):
+    Topic = apps.get_model("newsclip", "Topic")
+    Topic.objects.bulk_create(
+        [Topic(name=name, keywords=keywords) for name, keywords in TOPICS],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0016_story'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Topic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nome')),
+                ('keywords', models.TextField(help_text='Separe por vírgulas; acentos e maiúsculas são ignorados')),
+                ('active', models.BooleanField(default=True, verbose_name='Ativo')),
+            ],
+            options={
+                'verbose_name': 'tópico',
+            },
+        ),
+        migrations.RunPython(seed_topics, migrations.RunPython.noop),
+    ]
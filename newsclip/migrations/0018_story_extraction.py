@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0017_topic'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='body',
+            field=models.BinaryField(blank=True, null=True, verbose_name='Texto (zlib)'),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='extract_status',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='Status HTTP da extração'),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='extracted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Extraído em'),
+        ),
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(condition=models.Q(('extracted_at__isnull', True)), fields=['-created_at'], name='story_extract_pending_idx'),
+        ),
+    ]
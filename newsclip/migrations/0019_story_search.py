@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+# o índice de busca não é um campo do model: a estrutura depende do banco
+# (ver newsclip/search.py). Para indexar as notícias já gravadas, rodar
+# manage.py rebuild_search_index depois desta migração.
+
+POSTGRES_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE TEXT SEARCH CONFIGURATION pt_unaccent (COPY = portuguese)",
+    "ALTER TEXT SEARCH CONFIGURATION pt_unaccent "
+    "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem",
+    "ALTER TABLE newsclip_story ADD COLUMN search_vector tsvector",
+    "CREATE INDEX story_search_idx ON newsclip_story USING GIN (search_vector)",
+]
+POSTGRES_REVERSE_SQL = [
+    "DROP INDEX IF EXISTS story_search_idx",
+    "ALTER TABLE newsclip_story DROP COLUMN IF EXISTS search_vector",
+    "DROP TEXT SEARCH CONFIGURATION IF EXISTS pt_unaccent",
+]
+
+# termos já chegam sem acento e reduzidos ao radical
+SQLITE_SQL = [
+    "CREATE VIRTUAL TABLE newsclip_story_fts USING fts5("
+    "title, summary, body, tokenize = 'unicode61 remove_diacritics 2')",
+]
+SQLITE_REVERSE_SQL = [
+    "DROP TABLE IF EXISTS newsclip_story_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0018_story_extraction'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES_SQL, "sqlite": SQLITE_SQL}),
+            _run({"postgresql": POSTGRES_REVERSE_SQL, "sqlite": SQLITE_REVERSE_SQL}),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0019_story_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Início')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fim')),
+                ('status', models.CharField(choices=[('running', 'Executando'), ('done', 'Concluído'), ('failed', 'Falhou')], default='running', max_length=10)),
+                ('clients', models.PositiveIntegerField(default=0, verbose_name='Clientes')),
+                ('inserted', models.PositiveIntegerField(default=0, verbose_name='Inseridas')),
+                ('duplicates', models.PositiveIntegerField(default=0, verbose_name='Duplicadas')),
+                ('error', models.TextField(blank=True, verbose_name='Erro')),
+            ],
+            options={
+                'verbose_name': 'coleta',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FetchSourceStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('rss', 'Feed RSS'), ('google', 'Google News'), ('scrape', 'Página (scraping)'), ('newsdata', 'NewsData'), ('newsapi', 'NewsAPI')], max_length=10, verbose_name='Tipo')),
+                ('url', models.TextField(verbose_name='Fonte')),
+                ('http_status', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Status HTTP')),
+                ('error', models.TextField(blank=True, verbose_name='Erro')),
+                ('cached', models.BooleanField(default=False, verbose_name='Do cache')),
+                ('bytes', models.PositiveIntegerField(default=0, verbose_name='Bytes')),
+                ('connect_ms', models.FloatField(blank=True, null=True, verbose_name='Conexão (ms)')),
+                ('tls_ms', models.FloatField(blank=True, null=True, verbose_name='TLS (ms)')),
+                ('wait_ms', models.FloatField(blank=True, null=True, verbose_name='Espera (ms)')),
+                ('total_ms', models.FloatField(blank=True, null=True, verbose_name='Download (ms)')),
+                ('parse_ms', models.FloatField(blank=True, null=True, verbose_name='Parse (ms)')),
+                ('entries', models.PositiveIntegerField(default=0, verbose_name='Entradas')),
+                ('matched', models.PositiveIntegerField(default=0, verbose_name='Casadas')),
+                ('inserted', models.PositiveIntegerField(default=0, verbose_name='Inseridas')),
+                ('duplicates', models.PositiveIntegerField(default=0, verbose_name='Duplicadas')),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='newsclip.client')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sources', to='newsclip.fetchrun')),
+            ],
+            options={
+                'verbose_name': 'fonte da coleta',
+                'indexes': [models.Index(fields=['url', 'run'], name='fetchsource_url_run_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0020_fetch_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='priority',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Na coleta, clientes com prioridade maior são buscados primeiro', verbose_name='Prioridade'),
+        ),
+        migrations.AddField(
+            model_name='fetchrun',
+            name='skipped',
+            field=models.PositiveIntegerField(default=0, verbose_name='Clientes pulados (tempo esgotado)'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0021_client_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=20, verbose_name='Fonte')),
+                ('fetched_until', models.DateTimeField(verbose_name='Buscado até')),
+                ('signature', models.CharField(max_length=40, verbose_name='Assinatura das keywords')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watermarks', to='newsclip.client')),
+            ],
+            options={
+                'verbose_name': 'janela de coleta',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='fetchwatermark',
+            constraint=models.UniqueConstraint(fields=('client', 'source'), name='watermark_client_source_unique'),
+        ),
+    ]
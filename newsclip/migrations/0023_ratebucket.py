@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0022_fetchwatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='API')),
+                ('tokens', models.FloatField(verbose_name='Fichas')),
+                ('updated_at', models.FloatField(verbose_name='Atualizado em (epoch)')),
+                ('paused_until', models.FloatField(default=0, verbose_name='Pausado até (epoch)')),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'cota de API',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:22
+
+from django.db import migrations, models
+import newsclip.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0023_ratebucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='sources',
+            field=models.CharField(blank=True, help_text='Conectores usados na coleta, separados por vírgula (rss, google, scrape, newsdata, newsapi); vazio = todos', max_length=200, validators=[newsclip.models.validate_sources], verbose_name='Fontes'),
+        ),
+    ]
@@ -0,0 +1,219 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:25
+
+from django.db import migrations, models
+
+
+# o catálogo que ficava fixo em newsclip/sources.py (RSS_FEEDS); as chaves do
+# caminho viram as tags: região para os blocos regionais, categoria para os
+# temáticos
+RSS_FEEDS = {
+    "nacionais": {
+        "grandes_portais": [
+            "https://g1.globo.com/rss/g1/",
+            "https://www.uol.com.br/rss/",
+            "https://rss.folha.uol.com.br/emcimadahora/rss091.xml",
+            "https://www.estadao.com.br/rss/",
+            "https://www.cnnbrasil.com.br/feed/",
+            "https://www.terra.com.br/rss/",
+            "https://www.gazetadopovo.com.br/rss/",
+            "https://www.noticiasaominuto.com.br/rss",
+            "https://agenciabrasil.ebc.com.br/rss/ultimasnoticias/feed.xml",
+            "https://www.brasildefato.com.br/rss2.xml",
+            "https://www.jornaldebrasilia.com.br/feed",
+            "https://braziljournal.com/feed",
+            "https://www.camara.leg.br/noticias/rss/noticias.xml",
+            "https://res.stj.jus.br/hrestp-c-portalp/RSS.xml",
+            "https://www.bcb.gov.br/rss/ultimasnoticias",
+            "https://www.gov.br/pt-br/noticias/rss.xml"
+        ],
+        "regionais": [
+            "https://diariodeolimpia.com.br/rss",
+            "https://www.revistaeriopreto.com.br/feed",
+            "https://www.opopular.com.br/rss",
+            "https://www.acritica.com/rss",
+            "https://www.jornaldocomercio.com/rss",
+            "https://www.jornalnh.com.br/rss",
+            "https://www.correiodopovo.com.br/rss",
+            "https://www.jornaldacapital.com.br/rss"
+        ],
+        "sao_paulo": {
+            "capital": [
+                "https://noticias.r7.com/sao-paulo/rss.xml",
+                "https://www.band.uol.com.br/sao-paulo/noticias/rss.xml",
+                "https://www.metropoles.com/sao-paulo/feed"
+            ],
+            "sao_jose_do_rio_preto": [
+                "https://www.diariodaregiao.com.br/rss",
+                "https://www.sbtinterior.com/noticias/sao-jose-do-rio-preto/rss",
+                "https://temmais.com/sao-jose-do-rio-preto-e-regiao/feed/",
+                "https://www.acidadeon.com/riopreto/feed/"
+            ],
+            "olimpia": [
+                "https://diariodeolimpia.com.br/rss"
+            ],
+            "interior": [
+                "https://www.acidadeon.com/araraquara/feed/",
+                "https://www.acidadeon.com/campinas/feed/",
+                "https://jornalcidade.net/feed/",
+                "https://www.liberal.com.br/rss/"
+            ]
+        },
+        "minas_gerais": [
+            "https://www.em.com.br/rss.xml",
+            "https://www.itatiaia.com.br/rss/noticias",
+            "https://www.otempo.com.br/rss",
+            "https://www.hojeemdia.com.br/rss",
+            "https://www.mg.supernoticia.com.br/rss"
+        ],
+        "rio_de_janeiro": [
+            "https://g1.globo.com/rj/rss/g1-rj/feed.xml",
+            "https://odia.ig.com.br/_Conteúdo/rss.xml",
+            "https://extra.globo.com/rss.xml",
+            "https://www.band.uol.com.br/rio-de-janeiro/noticias/rss.xml",
+            "https://noticias.r7.com/rio-de-janeiro/rss.xml"
+        ],
+        "brasilia": [
+            "https://correiobraziliense.webnode.com.br/rss/all.xml",
+            "https://agenciabrasil.ebc.com.br/feed/"
+        ],
+        "economia": [
+            "https://www.bcb.gov.br/rss/ultimasnoticias",
+            "https://www.bcb.gov.br/rss/notas",
+            "https://agenciabrasil.ebc.com.br/economia/feed",
+            "https://br.investing.com/rss/news.rss",
+            "https://br.investing.com/rss/news_285.rss",
+            "https://rss.folha.uol.com.br/mercado/rss091.xml",
+            "https://www.gazetadopovo.com.br/economia/feed/",
+            "https://www.cepea.org.br/br/rss/indicadores.xml",
+            "https://www.bloomberglinea.com.br/feed/",
+            "https://valor.globo.com/rss"
+        ],
+        "tecnologia": [
+            "https://news.google.com/rss/topics/CAAqJQgKIh9DQkFTRVFvSUwyMHZNREUxWm5JU0JYQjBMVUpTS0FBUAE?hl=pt-BR&gl=BR&ceid=BR%3Apt-419",
+            "https://canaltech.com.br/rss/",
+            "https://www.tudocelular.com/rss/rss.xml",
+            "https://www.nextpit.com.br/feed/main.xml",
+            "https://tecnoblog.net/feed/",
+            "https://macmagazine.com.br/feed/",
+            "https://www.oficinadanet.com.br/rss",
+            "https://g1.globo.com/dynamo/tecnologia/rss2.xml",
+            "https://insideevs.uol.com.br/rss/articles/all/",
+            "https://www.inovacaotecnologica.com.br/boletim/rss.php",
+            "https://www.tecmundo.com.br/rss"
+        ],
+        "agro": [
+            "https://www.noticiasagricolas.com.br/rss/",
+            "https://www.noticiasagricolas.com.br/rss/cotacoes",
+            "https://www.cepea.org.br/br/rss/agricola.xml",
+            "https://www.canalrural.com.br/feed/",
+            "https://summitagro.estadao.com.br/feed/",
+            "https://www.embrapa.br/busca-de-noticias/-/asset_publisher/hMIqZUyfOUt3/rss?inheritRedirect=true"
+        ],
+        "politica": [
+            "https://agenciabrasil.ebc.com.br/politica/feed",
+            "https://www1.folha.uol.com.br/poder/rss091.xml",
+            "https://www.gazetadopovo.com.br/republica/feed/",
+            "https://www.camara.leg.br/noticias/rss/agencia",
+            "https://www12.senado.leg.br/noticias/feed"
+        ],
+        "imobiliario": [
+            "https://exame.com/invest/onde-investir/imoveis/feed/",
+            "https://valor.globo.com/imoveis/rss"
+        ],
+        "parques_turismo": [
+            "https://www.panrotas.com.br/rss/noticias",
+            "https://g1.globo.com/dynamo/turismo-e-viagem/rss2.xml"
+        ]
+    },
+    "internacionais": {
+        "principais": [
+            "https://feeds.bbci.co.uk/news/rss.xml",
+            "https://rss.cnn.com/rss/edition.rss",
+            "https://www.reuters.com/rssFeed/topNews",
+            "https://rss.nytimes.com/services/xml/rss/nyt/HomePage.xml",
+            "https://feeds.elpais.com/mrss-s/pages/ep/site/elpais.com/section/america/portada",
+            "https://rss.dw.com/rdf/rss-en-top",
+            "https://www.voaportugues.com/rssfeeds",
+            "https://www.latimes.com/feeds",
+            "http://feeds.feedburner.com/vfdotcomrss",
+            "https://feeds.bbci.co.uk/news/world/rss.xml",
+            "https://rss.cnn.com/rss/edition_world.rss",
+            "https://www.reuters.com/rssFeed/worldNews",
+            "https://rss.nytimes.com/services/xml/rss/nyt/World.xml",
+            "https://feeds.elpais.com/mrss-s/pages/ep/site/elpais.com/section/internacional/portada",
+            "https://rss.dw.com/rdf/rss-en-world",
+            "https://www.aljazeera.com/xml/rss/all.xml",
+            "https://feeds.nbcnews.com/nbcnews/public/news",
+            "https://www.cnbc.com/id/100727362/device/rss/rss.html",
+            "https://abcnews.go.com/abcnews/internationalheadlines",
+            "https://www.cbsnews.com/latest/rss/world",
+            "https://news.un.org/feed/subscribe/en/news/all/rss.xml",
+            "https://globalnews.ca/feed/",
+            "https://news.sky.com/feeds/rss/world.xml"
+        ]
+    }
+}
+
+SCOPES = {"nacionais": "nacional", "internacionais": "internacional"}
+REGIONAL = {"regionais", "sao_paulo", "minas_gerais", "rio_de_janeiro", "brasilia"}
+
+
+def catalog_rows(node, path=()):
+    if isinstance(node, dict):
+        for key, child in node.items():
+            yield from catalog_rows(child, path + (key,))
+        return
+    scope, *rest = path
+    if rest and rest[0] in REGIONAL:
+        region, category = "/".join(rest), ""
+    else:
+        region, category = SCOPES[scope], "/".join(rest)
+    for url in node:
+        yield url, region, category
+
+
+def import_feeds(apps, schema_editor):
+    Feed = apps.get_model("newsclip", "Feed")
+    feeds = {}
+    for url, region, category in catalog_rows(RSS_FEEDS):
+        # URL repetida: fica a região mais específica e a primeira categoria
+        tags = feeds.setdefault(url, {"region": region, "category": category})
+        if region.count("/") > tags["region"].count("/"):
+            tags["region"] = region
+        tags["category"] = tags["category"] or category
+    Feed.objects.bulk_create(
+        [Feed(url=url, **tags) for url, tags in feeds.items()],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0024_client_sources'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Feed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.TextField(unique=True, verbose_name='Feed')),
+                ('region', models.CharField(blank=True, max_length=100, verbose_name='Região')),
+                ('category', models.CharField(blank=True, max_length=100, verbose_name='Categoria')),
+                ('interval', models.PositiveIntegerField(default=30, help_text='Tempo normal entre leituras; cresce sozinho enquanto o feed falha ou não traz novidade', verbose_name='Intervalo (minutos)')),
+                ('active', models.BooleanField(default=True, verbose_name='Ativo')),
+                ('disabled_reason', models.CharField(blank=True, max_length=200, verbose_name='Motivo da desativação')),
+                ('next_poll_at', models.DateTimeField(blank=True, null=True, verbose_name='Próxima leitura')),
+                ('failures', models.PositiveIntegerField(default=0, verbose_name='Falhas seguidas')),
+                ('empty_polls', models.PositiveIntegerField(default=0, verbose_name='Leituras seguidas sem novidade')),
+                ('last_new_at', models.DateTimeField(blank=True, null=True, verbose_name='Último item novo')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'feed',
+                'ordering': ('region', 'category', 'url'),
+            },
+        ),
+        migrations.RunPython(import_feeds, migrations.RunPython.noop),
+    ]
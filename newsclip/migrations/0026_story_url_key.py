@@ -0,0 +1,103 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:36
+
+import base64
+import binascii
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.db import migrations, models
+
+
+# Cópia congelada de newsclip.canonical (url_key com network=False): as
+# notícias gravadas antes da forma canônica ainda têm utm_*, fragmento etc.,
+# e a chave precisa bater com a das cópias que a coleta traz agora.
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "ref_url", "referrer", "ocid", "cmpid",
+    "xtor", "amp_js_v", "_ga", "_gl", "s_cid",
+    "oc",
+}
+TRACKING_PREFIXES = ("utm_", "at_", "pk_", "__twitter", "hsa_")
+REDIRECT_HOSTS = {"news.google.com", "feedproxy.google.com", "t.co", "bit.ly", "ow.ly", "lnkd.in"}
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+URL_IN_BYTES_RE = re.compile(rb"https?://[\x21-\x7e]+")
+
+
+def canonical_url(url):
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return url
+    host = parts.hostname.rstrip(".")
+    if port and str(port) != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not (k.lower() in TRACKING_PARAMS or k.lower().startswith(TRACKING_PREFIXES))
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def decode_google_news_url(url):
+    parts = urlsplit(url)
+    if parts.hostname != "news.google.com" or "/articles/" not in parts.path:
+        return None
+    token = parts.path.rsplit("/", 1)[-1]
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    match = URL_IN_BYTES_RE.search(raw)
+    return match.group().decode() if match else None
+
+
+def url_key(canonical):
+    scheme, sep, rest = canonical.partition("://")
+    return rest if sep and scheme in DEFAULT_PORTS else canonical
+
+
+def save_keys(Story, ResolvedURL, stories):
+    canonical = {story.pk: canonical_url(story.url) for story in stories}
+    # wrappers de redirect: destino já conhecido (ResolvedURL) ou decodificável, sem rede
+    wrappers = {c for c in canonical.values() if (urlsplit(c).hostname or "") in REDIRECT_HOSTS}
+    memo = dict(ResolvedURL.objects.filter(url__in=wrappers).values_list("url", "resolved_url"))
+    for story in stories:
+        url = canonical[story.pk]
+        if url in wrappers:
+            decoded = decode_google_news_url(url)
+            url = memo.get(url) or (canonical_url(decoded) if decoded else url)
+        story.url_key = url_key(url)
+    Story.objects.bulk_update(stories, ["url_key"])
+
+
+def fill_url_keys(apps, schema_editor):
+    Story = apps.get_model("newsclip", "Story")
+    ResolvedURL = apps.get_model("newsclip", "ResolvedURL")
+    batch = []
+    for story in Story.objects.only("id", "url").iterator(chunk_size=2000):
+        batch.append(story)
+        if len(batch) >= 2000:
+            save_keys(Story, ResolvedURL, batch)
+            batch = []
+    save_keys(Story, ResolvedURL, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0025_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='url_key',
+            field=models.TextField(db_index=True, default='', editable=False, verbose_name='Chave do link'),
+        ),
+        migrations.RunPython(fill_url_keys, migrations.RunPython.noop),
+    ]
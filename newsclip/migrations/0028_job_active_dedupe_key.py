@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+def fail_duplicates(apps, schema_editor):
+    # jobs ativos repetidos (da corrida antiga no enqueue): fica o mais antigo
+    Job = apps.get_model("newsclip", "Job")
+    seen = set()
+    for job in Job.objects.filter(status__in=["queued", "running"]).order_by("created_at", "pk"):
+        if job.dedupe_key in seen:
+            Job.objects.filter(pk=job.pk).update(status="failed", message="Duplicado de outro job ativo")
+        seen.add(job.dedupe_key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsclip', '0027_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('dedupe_key',), name='job_active_dedupe_key'),
+        ),
+    ]
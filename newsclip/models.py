@@ -1,3 +1,6 @@
+import zlib
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -6,6 +9,16 @@ created_at = models.DateTimeField(auto_now_add=True, default=timezone.now)
 
 source = models.CharField("Fonte", max_length=500, blank=True)  # antes era 200
 
+def validate_sources(value):
+    from newsclip.sources import CONNECTORS
+
+    unknown = {s.strip().lower() for s in value.split(",") if s.strip()} - CONNECTORS.keys()
+    if unknown:
+        raise ValidationError(
+            f"Fontes desconhecidas: {', '.join(sorted(unknown))} (disponíveis: {', '.join(CONNECTORS)})"
+        )
+
+
 class Client(models.Model):
     name    = models.CharField("Nome do cliente", max_length=500)
     keywords= models.TextField(help_text="Separe por vírgulas")
@@ -19,26 +32,344 @@ class Client(models.Model):
     )
     users   = models.ManyToManyField(get_user_model(), related_name="clients",
                                      help_text="Quem pode ver/editar este cliente")
+    priority = models.PositiveSmallIntegerField(
+        "Prioridade", default=0,
+        help_text="Na coleta, clientes com prioridade maior são buscados primeiro"
+    )
+    sources = models.CharField(
+        "Fontes", max_length=200, blank=True, validators=[validate_sources],
+        help_text="Conectores usados na coleta, separados por vírgula "
+                  "(rss, google, scrape, newsdata, newsapi); vazio = todos"
+    )
 
     def __str__(self):
         return self.name
 
 
-class Article(models.Model):
-    client       = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="articles")
-    title        = models.CharField("Título", max_length=500)
-    url = models.TextField("Link", unique=True)
+class Topic(models.Model):
+    """Dicionário de um tópico para a classificação das notícias (newsclip.topics)"""
+    name     = models.CharField("Nome", max_length=100, unique=True)
+    keywords = models.TextField(help_text="Separe por vírgulas; acentos e maiúsculas são ignorados")
+    active   = models.BooleanField("Ativo", default=True)
 
-    published_at = models.DateTimeField("Publicação", null=True, blank=True, db_index=True)
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "tópico"
+
+
+class Story(models.Model):
+    """
+    Uma notícia (uma por URL), gravada uma única vez mesmo quando casa com
+    vários clientes: resumo, tópico e agrupamento são calculados só aqui.
+    """
+    url          = models.TextField("Link", unique=True)
+    # URL sem o esquema (newsclip.canonical.url_key): http e https da mesma página são a mesma notícia
+    url_key      = models.TextField("Chave do link", db_index=True, editable=False, default="")
+    title        = models.CharField("Título", max_length=500)
     source       = models.CharField("Fonte", max_length=500, blank=True)
+    published_at = models.DateTimeField("Publicação", null=True, blank=True)
     summary      = models.TextField("Resumo", blank=True)
     topic        = models.CharField("Tópico", max_length=500, blank=True)
+    created_at   = models.DateTimeField(auto_now_add=True, db_index=True)
+    # quase-duplicatas (newsclip.clustering): cluster é o simhash da primeira notícia do grupo
+    simhash      = models.BigIntegerField("SimHash", null=True, blank=True, editable=False)
+    cluster      = models.BigIntegerField("Grupo de duplicatas", null=True, blank=True, editable=False)
+    # texto completo (newsclip.extraction), comprimido com zlib; extracted_at nulo = ainda não tentado
+    body           = models.BinaryField("Texto (zlib)", null=True, blank=True, editable=False)
+    extracted_at   = models.DateTimeField("Extraído em", null=True, blank=True, editable=False)
+    extract_status = models.PositiveSmallIntegerField("Status HTTP da extração", null=True, blank=True, editable=False)
+
+    def __str__(self):
+        return self.title[:80]
+
+    def save(self, *args, **kwargs):
+        from newsclip.canonical import url_key
+
+        self.url_key = url_key(self.url)
+        super().save(*args, **kwargs)
+
+    @property
+    def text(self):
+        """Texto completo descomprimido ("" se não foi extraído)"""
+        return zlib.decompress(self.body).decode() if self.body else ""
+
+    class Meta:
+        verbose_name = "notícia"
+        indexes = [
+            # fila da extração: só as ainda não tentadas, das mais novas para as mais antigas
+            models.Index(
+                fields=["-created_at"],
+                name="story_extract_pending_idx",
+                condition=models.Q(extracted_at__isnull=True),
+            ),
+        ]
+
+
+class Article(models.Model):
+    """Ligação cliente ↔ notícia: o que é próprio de cada cliente (excluído, quando entrou)"""
+    # o índice simples do FK fica redundante com os compostos abaixo (client é o prefixo)
+    client       = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="articles", db_index=False)
+    story        = models.ForeignKey(Story, on_delete=models.CASCADE, related_name="links")
+    # cópia de story.published_at, para os índices por cliente abaixo
+    published_at = models.DateTimeField("Publicação", null=True, blank=True, db_index=True)
     excluded     = models.BooleanField("Excluído manualmente", default=False)
     created_at   = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.client.name}: {self.title[:50]}..."
 
+    # campos da notícia, para templates e código que tratam o artigo como antes
+    # (use select_related("story") nas listas)
+    title   = property(lambda self: self.story.title)
+    url     = property(lambda self: self.story.url)
+    source  = property(lambda self: self.story.source)
+    summary = property(lambda self: self.story.summary)
+    topic   = property(lambda self: self.story.topic)
+
     class Meta:
         ordering = ['-published_at']
+        constraints = [
+            models.UniqueConstraint(fields=["client", "story"], name="article_client_story_unique"),
+        ]
+        indexes = [
+            # relatórios, visão geral e API: artigos do cliente por data
+            # (id desempata a paginação por cursor da API)
+            models.Index(fields=["client", "-published_at", "-id"], name="article_client_pub_idx"),
+            # client_news e gráficos: só os não excluídos, por data
+            models.Index(
+                fields=["client", "-published_at", "-id"],
+                name="article_client_visible_idx",
+                condition=models.Q(excluded=False),
+            ),
+        ]
+
+
+class ArticleDailyStat(models.Model):
+    """
+    Contagem de artigos por cliente/dia/fonte/tópico/excluído, mantida a cada
+    inserção e exclusão em lote (newsclip.rollup). Os gráficos de client_news
+    leem daqui em vez de agregar o histórico inteiro de Article.
+    """
+    client   = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="daily_stats")
+    day      = models.DateField("Dia", null=True, blank=True)
+    source   = models.CharField("Fonte", max_length=500, blank=True)
+    topic    = models.CharField("Tópico", max_length=500, blank=True)
+    excluded = models.BooleanField("Excluído", default=False)
+    count    = models.IntegerField("Artigos", default=0)
+
+    def __str__(self):
+        return f"{self.client_id} {self.day} {self.source}: {self.count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["client", "day", "source", "topic", "excluded"],
+                name="article_daily_stat_unique",
+            ),
+        ]
+
+
+class ResolvedURL(models.Model):
+    """Destino já resolvido de um link de redirect (Google News, encurtadores)"""
+    url          = models.TextField("Link original (canônico)", unique=True)
+    resolved_url = models.TextField("Destino (canônico)")
+    status       = models.IntegerField("Status HTTP", null=True, blank=True)
+    resolved_at  = models.DateTimeField("Resolvido em", default=timezone.now)
+
+    def __str__(self):
+        return f"{self.url} → {self.resolved_url}"
+
+
+class FeedState(models.Model):
+    """Estado HTTP de cada feed para GET condicional (ETag / Last-Modified)"""
+    url           = models.TextField("Feed", unique=True)
+    etag          = models.CharField("ETag", max_length=500, blank=True)
+    modified      = models.CharField("Last-Modified", max_length=100, blank=True)
+    last_entry_at = models.DateTimeField("Última entrada vista", null=True, blank=True)
+    last_status   = models.IntegerField("Último status HTTP", null=True, blank=True)
+    checked_at    = models.DateTimeField("Última verificação", null=True, blank=True)
+
+    def __str__(self):
+        return self.url
 
+
+class Feed(models.Model):
+    """
+    Feed RSS do catálogo. A coleta só lê os ativos cuja próxima leitura já
+    chegou; falhas e leituras sem novidade espaçam as leituras e, se
+    persistirem, desativam o feed (newsclip.feeds.record_poll).
+    """
+    url             = models.TextField("Feed", unique=True)
+    region          = models.CharField("Região", max_length=100, blank=True)
+    category        = models.CharField("Categoria", max_length=100, blank=True)
+    interval        = models.PositiveIntegerField(
+        "Intervalo (minutos)", default=30,
+        help_text="Tempo normal entre leituras; cresce sozinho enquanto o feed falha ou não traz novidade"
+    )
+    active          = models.BooleanField("Ativo", default=True)
+    disabled_reason = models.CharField("Motivo da desativação", max_length=200, blank=True)
+    next_poll_at    = models.DateTimeField("Próxima leitura", null=True, blank=True)
+    failures        = models.PositiveIntegerField("Falhas seguidas", default=0)
+    empty_polls     = models.PositiveIntegerField("Leituras seguidas sem novidade", default=0)
+    last_new_at     = models.DateTimeField("Último item novo", null=True, blank=True)
+    created_at      = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.url
+
+    class Meta:
+        verbose_name = "feed"
+        ordering = ("region", "category", "url")
+
+
+class FetchWatermark(models.Model):
+    """Até quando uma API já foi buscada para o cliente (coleta incremental, newsclip.watermarks)"""
+    client        = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="watermarks")
+    source        = models.CharField("Fonte", max_length=20)
+    fetched_until = models.DateTimeField("Buscado até")
+    signature     = models.CharField("Assinatura das keywords", max_length=40)
+    updated_at    = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.client} • {self.source}"
+
+    class Meta:
+        verbose_name = "janela de coleta"
+        constraints = [
+            models.UniqueConstraint(fields=["client", "source"], name="watermark_client_source_unique"),
+        ]
+
+
+class RateBucket(models.Model):
+    """Fichas restantes da cota de uma API, compartilhadas entre processos (newsclip.apis.TokenBucket)"""
+    name       = models.CharField("API", max_length=50, unique=True)
+    tokens     = models.FloatField("Fichas")
+    updated_at = models.FloatField("Atualizado em (epoch)")
+    paused_until = models.FloatField("Pausado até (epoch)", default=0)
+    version    = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.tokens:.1f}"
+
+    class Meta:
+        verbose_name = "cota de API"
+
+
+class FetchRun(models.Model):
+    """Uma execução do fetch_news, com os totais; o detalhe por fonte fica em FetchSourceStat"""
+    STATUS_CHOICES = [
+        ("running", "Executando"),
+        ("done",    "Concluído"),
+        ("failed",  "Falhou"),
+    ]
+
+    started_at  = models.DateTimeField("Início", default=timezone.now, db_index=True)
+    finished_at = models.DateTimeField("Fim", null=True, blank=True)
+    status      = models.CharField(max_length=10, choices=STATUS_CHOICES, default="running")
+    clients     = models.PositiveIntegerField("Clientes", default=0)
+    inserted    = models.PositiveIntegerField("Inseridas", default=0)
+    duplicates  = models.PositiveIntegerField("Duplicadas", default=0)
+    skipped     = models.PositiveIntegerField("Clientes pulados (tempo esgotado)", default=0)
+    error       = models.TextField("Erro", blank=True)
+
+    def __str__(self):
+        return f"Coleta #{self.pk} ({self.status})"
+
+    @property
+    def duration(self):
+        return (self.finished_at - self.started_at).total_seconds() if self.finished_at else None
+
+    class Meta:
+        ordering = ['-started_at']
+        verbose_name = "coleta"
+
+
+class FetchSourceStat(models.Model):
+    """
+    Números de uma fonte (feed, página, busca do Google News de um cliente,
+    API de um cliente) numa coleta: tempos da requisição, status e quantas
+    entradas viraram artigos. Tempos em milissegundos; connect inclui o DNS.
+    """
+    KIND_CHOICES = [
+        ("rss",      "Feed RSS"),
+        ("google",   "Google News"),
+        ("scrape",   "Página (scraping)"),
+        ("newsdata", "NewsData"),
+        ("newsapi",  "NewsAPI"),
+    ]
+
+    run         = models.ForeignKey(FetchRun, on_delete=models.CASCADE, related_name="sources")
+    kind        = models.CharField("Tipo", max_length=10, choices=KIND_CHOICES)
+    url         = models.TextField("Fonte")
+    client      = models.ForeignKey(Client, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    http_status = models.PositiveSmallIntegerField("Status HTTP", null=True, blank=True)
+    error       = models.TextField("Erro", blank=True)
+    cached      = models.BooleanField("Do cache", default=False)
+    bytes       = models.PositiveIntegerField("Bytes", default=0)
+    connect_ms  = models.FloatField("Conexão (ms)", null=True, blank=True)
+    tls_ms      = models.FloatField("TLS (ms)", null=True, blank=True)
+    wait_ms     = models.FloatField("Espera (ms)", null=True, blank=True)
+    total_ms    = models.FloatField("Download (ms)", null=True, blank=True)
+    parse_ms    = models.FloatField("Parse (ms)", null=True, blank=True)
+    entries     = models.PositiveIntegerField("Entradas", default=0)
+    matched     = models.PositiveIntegerField("Casadas", default=0)
+    inserted    = models.PositiveIntegerField("Inseridas", default=0)
+    duplicates  = models.PositiveIntegerField("Duplicadas", default=0)
+
+    @property
+    def ok(self):
+        return not self.error and (self.http_status is None or self.http_status < 400)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.url}"
+
+    class Meta:
+        verbose_name = "fonte da coleta"
+        indexes = [
+            # histórico de uma fonte (painel de fontes lentas/mortas)
+            models.Index(fields=["url", "run"], name="fetchsource_url_run_idx"),
+        ]
+
+
+class Job(models.Model):
+    """Tarefa demorada (busca de notícias, relatório) executada pelo worker run_jobs"""
+    STATUS_CHOICES = [
+        ("queued",  "Na fila"),
+        ("running", "Executando"),
+        ("done",    "Concluído"),
+        ("failed",  "Falhou"),
+    ]
+
+    kind         = models.CharField("Tipo", max_length=50)
+    params       = models.JSONField("Parâmetros", default=dict, blank=True)
+    dedupe_key   = models.CharField(max_length=300, db_index=True)
+    status       = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued", db_index=True)
+    progress     = models.PositiveSmallIntegerField("Progresso (%)", default=0)
+    message      = models.CharField("Mensagem", max_length=500, blank=True)
+    output       = models.TextField("Saída", blank=True)
+    error        = models.TextField("Erro", blank=True)
+    attempts     = models.PositiveSmallIntegerField("Tentativas", default=0)
+    max_attempts = models.PositiveSmallIntegerField("Máx. tentativas", default=3)
+    run_after    = models.DateTimeField("Executar a partir de", default=timezone.now)
+    client       = models.ForeignKey(Client, on_delete=models.CASCADE, null=True, blank=True, related_name="jobs")
+    created_by   = models.ForeignKey(get_user_model(), on_delete=models.SET_NULL, null=True, blank=True)
+    created_at   = models.DateTimeField(auto_now_add=True)
+    started_at   = models.DateTimeField(null=True, blank=True)
+    # último sinal de vida do worker que está rodando o job
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at  = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # no máximo um job ativo por chave: o banco resolve pedidos simultâneos
+            models.UniqueConstraint(
+                fields=["dedupe_key"], condition=models.Q(status__in=["queued", "running"]),
+                name="job_active_dedupe_key",
+            ),
+        ]
@@ -0,0 +1,61 @@
+# newsclip/pagination.py
+#
+# Paginação por cursor (keyset) em (published_at, id), do mais novo para o
+# mais antigo. Em vez de OFFSET, cada página continua "depois" do último item
+# da anterior, então a página 1000 custa o mesmo que a primeira.
+
+import base64
+import binascii
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(published_at, pk):
+    raw = f"{published_at.isoformat() if published_at else ''}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Devolve (published_at ou None, id); InvalidCursor se o cursor não for nosso"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        published_at, pk = raw.rsplit("|", 1)
+        return (datetime.fromisoformat(published_at) if published_at else None), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError) as e:
+        raise InvalidCursor(str(e)) from e
+
+
+def keyset_page(qs, cursor=None, limit=50, fields=("id", "published_at")):
+    """
+    Uma página de `qs` em ordem (-published_at, -id), artigos sem data por
+    último. Devolve (linhas como dicts de .values(*fields), próximo cursor ou None).
+    """
+    fields = list(dict.fromkeys([*fields, "id", "published_at"]))
+    published_at, pk = decode_cursor(cursor) if cursor else (None, None)
+
+    # os com data e os sem data são consultados à parte, para que cada parte
+    # seja um intervalo simples do índice (client, -published_at, -id)
+    rows = []
+    if cursor is None or published_at is not None:
+        dated = qs.filter(published_at__isnull=False).order_by("-published_at", "-id")
+        if cursor:
+            dated = (
+                dated.filter(published_at__lte=published_at)
+                .exclude(published_at=published_at, id__gte=pk)
+            )
+        # um item a mais só para saber se existe próxima página
+        rows = list(dated.values(*fields)[:limit + 1])
+    if len(rows) <= limit:
+        undated = qs.filter(published_at__isnull=True).order_by("-id")
+        if cursor and published_at is None:
+            undated = undated.filter(id__lt=pk)
+        rows += list(undated.values(*fields)[:limit + 1 - len(rows)])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["published_at"], rows[-1]["id"])
+    return rows, next_cursor
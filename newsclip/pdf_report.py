@@ -0,0 +1,139 @@
+# newsclip/pdf_report.py
+#
+# Renderizador de PDF em processo (reportlab), alternativa ao wkhtmltopdf.
+# Desenha o mesmo conteúdo do report_templates/report.html página a página,
+# consumindo as linhas de um iterador: nenhuma lista de artigos fica em memória.
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas
+
+
+PAGE_W, PAGE_H = A4
+MARGIN = 1 * cm
+FONT, FONT_BOLD, FONT_SIZE = "Helvetica", "Helvetica-Bold", 9
+LINE_H = FONT_SIZE * 1.3
+PADDING = 4
+
+# larguras das colunas Título / Data / Fonte
+_usable = PAGE_W - 2 * MARGIN
+COL_WIDTHS = [_usable * 0.62, _usable * 0.14, _usable * 0.24]
+HEADERS = ["Título", "Data", "Fonte"]
+
+LINK_COLOR = colors.HexColor("#0066cc")
+HEADER_BG = colors.HexColor("#f5f5f5")
+ZEBRA_BG = colors.HexColor("#fafafa")
+BORDER = colors.HexColor("#dddddd")
+
+
+class _ReportCanvas:
+
+    def __init__(self, path, client_name, interval):
+        self.c = canvas.Canvas(str(path), pagesize=A4, pageCompression=1)
+        self.c.setTitle(f"Relatório de {client_name}")
+        self.client_name = client_name
+        self.interval = interval
+        self.page = 0
+        self.y = 0
+
+    def start_page(self, first=False):
+        if self.page:
+            self.c.showPage()
+        self.page += 1
+        self.y = PAGE_H - MARGIN
+        if first:
+            self.c.setFont(FONT_BOLD, 18)
+            self.c.drawCentredString(PAGE_W / 2, self.y - 18, "Clipping App")
+            self.c.setFont(FONT_BOLD, 14)
+            self.c.drawCentredString(PAGE_W / 2, self.y - 40, f"Relatório de {self.client_name}")
+            self.y -= 56
+        self.c.setFont(FONT, 7)
+        self.c.setFillColor(colors.grey)
+        self.c.drawRightString(PAGE_W - MARGIN, MARGIN / 2, f"Página {self.page}")
+        self.c.setFillColor(colors.black)
+
+    def summary(self, lines):
+        self.c.setFont(FONT, 10)
+        for label, value in lines:
+            self.c.setFont(FONT_BOLD, 10)
+            self.c.drawString(MARGIN, self.y - 10, label)
+            self.c.setFont(FONT, 10)
+            self.c.drawString(MARGIN + self.c.stringWidth(label, FONT_BOLD, 10) + 4, self.y - 10, value)
+            self.y -= 14
+        self.y -= 8
+
+    def table_header(self):
+        h = LINE_H + 2 * PADDING
+        self._row_box(h, HEADER_BG)
+        self.c.setFont(FONT_BOLD, FONT_SIZE)
+        x = MARGIN
+        for width, title in zip(COL_WIDTHS, HEADERS):
+            self.c.drawString(x + PADDING, self.y - PADDING - FONT_SIZE, title)
+            x += width
+        self.y -= h
+
+    def row(self, index, title, date, source, url):
+        cells = [
+            simpleSplit(title, FONT, FONT_SIZE, COL_WIDTHS[0] - 2 * PADDING) or [""],
+            [date],
+            simpleSplit(source, FONT, FONT_SIZE, COL_WIDTHS[2] - 2 * PADDING) or [""],
+        ]
+        h = max(len(lines) for lines in cells) * LINE_H + 2 * PADDING
+        if self.y - h < MARGIN:
+            self.start_page()
+            self.table_header()
+        self._row_box(h, ZEBRA_BG if index % 2 == 0 else None)
+
+        x = MARGIN
+        for col, lines in enumerate(cells):
+            self.c.setFillColor(LINK_COLOR if col == 0 and url else colors.black)
+            self.c.setFont(FONT, FONT_SIZE)
+            for i, line in enumerate(lines):
+                self.c.drawString(x + PADDING, self.y - PADDING - FONT_SIZE - i * LINE_H, line)
+            x += COL_WIDTHS[col]
+        self.c.setFillColor(colors.black)
+        if url:
+            self.c.linkURL(url, (MARGIN, self.y - h, MARGIN + COL_WIDTHS[0], self.y), relative=0)
+        self.y -= h
+
+    def _row_box(self, h, fill):
+        self.c.setStrokeColor(BORDER)
+        if fill is not None:
+            self.c.setFillColor(fill)
+        x = MARGIN
+        for width in COL_WIDTHS:
+            self.c.rect(x, self.y - h, width, h, stroke=1, fill=int(fill is not None))
+            x += width
+        self.c.setFillColor(colors.black)
+
+    def footer(self, total):
+        if self.y - LINE_H < MARGIN:
+            self.start_page()
+        self.c.setFont("Helvetica-Oblique", FONT_SIZE)
+        self.c.drawRightString(PAGE_W - MARGIN, self.y - LINE_H, f"Total de notícias: {total}")
+
+    def save(self):
+        self.c.save()
+
+
+def render_report_pdf(path, client_name, interval, generated_at, rows):
+    """
+    Gera o PDF do relatório em `path`. `rows` é um iterador de linhas no formato
+    de generate_report.COLUMNS (Título, Data, Link, Fonte, Resumo); devolve o
+    total de artigos desenhados.
+    """
+    doc = _ReportCanvas(path, client_name, interval)
+    doc.start_page(first=True)
+    doc.summary([
+        ("Período:", interval),
+        ("Gerado em:", generated_at.strftime("%d/%m/%Y")),
+    ])
+    doc.table_header()
+    total = 0
+    for total, (title, date, url, source, _summary) in enumerate(rows, start=1):
+        doc.row(total, title, date[:10], source, url)
+    doc.footer(total)
+    doc.save()
+    return total
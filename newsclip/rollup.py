@@ -0,0 +1,106 @@
+# newsclip/rollup.py
+#
+# Manutenção de ArticleDailyStat: cada gravação/alteração de Article em lote
+# (e de fonte/tópico de uma Story) passa por aqui e ajusta as contagens do dia, sem reagregar o histórico.
+
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from newsclip.models import Article, ArticleDailyStat
+
+
+def _day(published_at):
+    if published_at is None:
+        return None
+    if timezone.is_aware(published_at):
+        return timezone.localtime(published_at).date()
+    return published_at.date()
+
+
+def _key(client_id, day, source, topic, excluded):
+    return (client_id, day, source or "", topic or "", bool(excluded))
+
+
+def article_deltas(articles, sign=1):
+    """Contagens (+1/-1 por artigo) agrupadas pela chave do rollup"""
+    deltas = Counter()
+    for art in articles:
+        deltas[_key(art.client_id, _day(art.published_at), art.source, art.topic, art.excluded)] += sign
+    return deltas
+
+
+def queryset_deltas(qs, sign=1):
+    """Mesmo que article_deltas, mas agregando no banco (para exclusões em lote)"""
+    rows = (
+        qs.order_by()
+        .annotate(day=TruncDate("published_at"))
+        .values("client_id", "day", "story__source", "story__topic", "excluded")
+        .annotate(n=Count("id"))
+    )
+    deltas = Counter()
+    for r in rows:
+        key = _key(r["client_id"], r["day"], r["story__source"], r["story__topic"], r["excluded"])
+        deltas[key] += sign * r["n"]
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Soma as diferenças nas linhas do rollup, criando as que ainda não existem"""
+    with transaction.atomic():
+        for (client_id, day, source, topic, excluded), n in deltas.items():
+            if not n:
+                continue
+            lookup = dict(client_id=client_id, day=day, source=source, topic=topic, excluded=excluded)
+            if ArticleDailyStat.objects.filter(**lookup).update(count=F("count") + n):
+                continue
+            try:
+                with transaction.atomic():
+                    ArticleDailyStat.objects.create(count=n, **lookup)
+            except IntegrityError:
+                # outro worker criou a linha no meio tempo
+                ArticleDailyStat.objects.filter(**lookup).update(count=F("count") + n)
+
+
+def set_excluded(qs, excluded):
+    """
+    qs.update(excluded=…) que também move as contagens entre excluídos e
+    visíveis. Devolve o número de artigos alterados, como update().
+    """
+    with transaction.atomic():
+        changing = qs.filter(excluded=not excluded)
+        deltas = queryset_deltas(changing, -1)
+        for (client_id, day, source, topic, _), n in list(deltas.items()):
+            deltas[_key(client_id, day, source, topic, excluded)] -= n
+        updated = changing.update(excluded=excluded)
+        apply_deltas(deltas)
+    return updated
+
+
+def delete_articles(qs):
+    """qs.delete() descontando os artigos removidos do rollup"""
+    with transaction.atomic():
+        apply_deltas(queryset_deltas(qs, -1))
+        return qs.delete()
+
+
+def rebuild(client_ids=None):
+    """Recalcula o rollup do zero a partir de Article (todos ou só os clientes dados)"""
+    articles = Article.objects.all()
+    stats = ArticleDailyStat.objects.all()
+    if client_ids is not None:
+        articles = articles.filter(client_id__in=client_ids)
+        stats = stats.filter(client_id__in=client_ids)
+    with transaction.atomic():
+        stats.delete()
+        ArticleDailyStat.objects.bulk_create(
+            (
+                ArticleDailyStat(client_id=k[0], day=k[1], source=k[2], topic=k[3], excluded=k[4], count=n)
+                for k, n in queryset_deltas(articles).items()
+            ),
+            batch_size=1000,
+        )
+    return stats.aggregate(total=Sum("count"))["total"] or 0
@@ -0,0 +1,199 @@
+# newsclip/search.py
+#
+# Busca textual nas notícias (título, resumo e texto extraído). A
+# implementação depende do banco em uso:
+#  - Postgres (DATABASE_URL): coluna tsvector em Story com índice GIN e a
+#    configuração "pt_unaccent" (unaccent + stemmer português do Postgres);
+#  - SQLite: tabela virtual FTS5 com os termos já sem acento e reduzidos ao
+#    radical em Python (o mesmo stemmer Snowball português).
+# Nos dois casos o índice é alimentado pelo app (index_stories) quando a
+# notícia é gravada ou tem o texto extraído, e a busca devolve os artigos
+# de um cliente por relevância, paginados por cursor (relevância, id).
+
+import base64
+import binascii
+import re
+from functools import lru_cache
+
+from django.db import connection
+from nltk.stem.snowball import PortugueseStemmer
+
+from newsclip.clustering import STOPWORDS
+from newsclip.matching import strip_accents
+from newsclip.models import Article, Story
+from newsclip.pagination import InvalidCursor
+
+
+FTS_TABLE = "newsclip_story_fts"
+PG_CONFIG = "pt_unaccent"
+
+_WORD_RE = re.compile(r"\w+")
+_stemmer = PortugueseStemmer()
+
+
+@lru_cache(maxsize=100_000)
+def _stem(word):
+    # palavras vazias aparecem em quase toda notícia: só deixariam a busca lenta
+    if strip_accents(word) in STOPWORDS:
+        return None
+    return strip_accents(_stemmer.stem(word))
+
+
+def search_terms(text):
+    """Radicais sem acento das palavras do texto, na ordem em que aparecem"""
+    stems = (_stem(w) for w in _WORD_RE.findall((text or "").casefold()))
+    return [s for s in stems if s]
+
+
+def encode_cursor(score, pk):
+    return base64.urlsafe_b64encode(f"{score!r}|{pk}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        score, pk = raw.rsplit("|", 1)
+        return float(score), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError) as e:
+        raise InvalidCursor(str(e)) from e
+
+
+class SQLiteSearch:
+    """FTS5: bm25 com pesos por coluna (título > resumo > texto)"""
+
+    def index(self, stories):
+        rows = [
+            (s.id, " ".join(search_terms(s.title)), " ".join(search_terms(s.summary)),
+             " ".join(search_terms(s.text)))
+            for s in stories
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, title, summary, body) VALUES (%s, %s, %s, %s)",
+                rows,
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def remove(self, story_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in story_ids])
+
+    def page(self, client_id, query, after, limit):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        # todos os termos precisam aparecer; as aspas tornam cada um literal
+        match = " ".join(f'"{t}"' for t in dict.fromkeys(terms))
+        where, params = "", [match, client_id, client_id]
+        if after:
+            where = "AND (r.score < %s OR (r.score = %s AND a.id < %s))"
+            params += [after[0], after[0], after[1]]
+        # só as notícias do cliente são pontuadas: termos comuns casam com boa
+        # parte do acervo e o bm25 de todas elas seria jogado fora no JOIN
+        sql = f"""
+            SELECT a.id, r.score FROM (
+                SELECT rowid AS story_id, -bm25({FTS_TABLE}, 10.0, 4.0, 1.0) AS score
+                FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH %s AND rowid IN (
+                    SELECT story_id FROM {Article._meta.db_table} WHERE client_id = %s AND NOT excluded
+                )
+            ) r
+            JOIN {Article._meta.db_table} a ON a.story_id = r.story_id
+            WHERE a.client_id = %s AND NOT a.excluded {where}
+            ORDER BY r.score DESC, a.id DESC
+            LIMIT %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, limit])
+            return cursor.fetchall()
+
+
+class PostgresSearch:
+    """tsvector com pesos A/B/C (título, resumo, texto) e ts_rank_cd"""
+
+    def index(self, stories):
+        rows = [(s.text, s.id) for s in stories]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"""
+                UPDATE {Story._meta.db_table} SET search_vector =
+                    setweight(to_tsvector('{PG_CONFIG}', title), 'A')
+                    || setweight(to_tsvector('{PG_CONFIG}', summary), 'B')
+                    || setweight(to_tsvector('{PG_CONFIG}', %s), 'C')
+                WHERE id = %s
+                """,
+                rows,
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {Story._meta.db_table} SET search_vector = NULL")
+
+    def remove(self, story_ids):
+        # o vetor fica na própria linha da notícia e sai junto com ela
+        pass
+
+    def page(self, client_id, query, after, limit):
+        where, params = "", [query, client_id]
+        if after:
+            where = "WHERE r.score < %s OR (r.score = %s AND r.id < %s)"
+            params += [after[0], after[0], after[1]]
+        sql = f"""
+            SELECT r.id, r.score FROM (
+                SELECT a.id, ts_rank_cd(s.search_vector, q) AS score
+                FROM {Story._meta.db_table} s
+                JOIN {Article._meta.db_table} a ON a.story_id = s.id,
+                     websearch_to_tsquery('{PG_CONFIG}', %s) q
+                WHERE s.search_vector @@ q AND a.client_id = %s AND NOT a.excluded
+            ) r
+            {where}
+            ORDER BY r.score DESC, r.id DESC
+            LIMIT %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, limit])
+            return cursor.fetchall()
+
+
+def get_backend():
+    return PostgresSearch() if connection.vendor == "postgresql" else SQLiteSearch()
+
+
+def index_stories(stories):
+    """Coloca (ou atualiza) as notícias no índice de busca"""
+    stories = [s for s in stories if s.id is not None]
+    if stories:
+        get_backend().index(stories)
+
+
+def unindex_stories(story_ids):
+    """Tira do índice notícias que vão ser (ou foram) apagadas"""
+    story_ids = list(story_ids)
+    if story_ids:
+        get_backend().remove(story_ids)
+
+
+def search_articles(client_id, query, cursor=None, limit=20):
+    """
+    Artigos (visíveis) do cliente que contêm todos os termos de `query`, do
+    mais relevante para o menos. Devolve (artigos com .score, próximo cursor
+    ou None); InvalidCursor se o cursor não for nosso.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    # um item a mais só para saber se existe próxima página
+    rows = get_backend().page(client_id, query, after, limit + 1)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+
+    articles = Article.objects.select_related("story").in_bulk([pk for pk, _ in rows])
+    result = []
+    for pk, score in rows:
+        if pk in articles:
+            articles[pk].score = score
+            result.append(articles[pk])
+    return result, next_cursor
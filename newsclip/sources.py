@@ -0,0 +1,485 @@
+# newsclip/sources.py
+#
+# Conectores das fontes de notícias do fetch_news. Cada conector busca de uma
+# vez para uma lista de clientes e devolve entradas normalizadas (title, url,
+# published, source, origin e o conjunto `clients` de IDs que casaram); quem
+# grava é o comando. A busca é dividida em download (a parte de rede) e parse
+# (todo o resto), para o bench_connectors poder gravar as respostas num
+# arquivo e medir cada conector depois, sem rede.
+#
+# Fonte nova = subclasse de Connector com @register: passa a rodar em toda
+# coleta (ou só nos clientes que a listarem em Client.sources).
+
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, timezone
+from urllib.parse import quote_plus, urljoin
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.db import connection
+
+from newsclip.apis import NewsAPI, NewsDataAPI, assign_to_clients, combine_queries
+from newsclip.canonical import canonical_url, resolve_urls
+from newsclip.feeds import (
+    due_feeds, entry_datetime, feed_request, load_feed_states, read_feed, record_poll, save_feed_states,
+    save_polls,
+)
+from newsclip.fetch_engine import fetch_all
+from newsclip.matching import KeywordMatcher, client_keywords
+from newsclip.metrics import FetchRecorder
+from newsclip.models import Feed, FeedState
+from newsclip.watermarks import window_start
+
+
+# Quantos dias atrás a NewsAPI permite buscar no plano gratuito
+MAX_NEWSAPI_DAYS = 30
+
+
+SCRAPE_SITES = [
+    {
+        "url": "https://www.camara.leg.br/noticias/",
+        "title_selector": "h3.g-chamada__titulo",
+        "link_selector": "h3.g-chamada__titulo a",
+        "date_selector": "span.g-chamada__data",
+    },
+    {
+        "url": "https://www12.senado.leg.br/noticias/ultimas",
+        "title_selector": "h3.title",
+        "link_selector": "h3.title a",
+        "date_selector": "span.date",
+    },
+]
+
+
+def google_news_url(kws):
+    query = " OR ".join(f'"{kw}"' if ' ' in kw else kw for kw in kws)
+    return (
+        'https://news.google.com/rss/search?'
+        'hl=pt-BR&gl=BR&ceid=BR:pt-150&q=' + quote_plus(query)
+    )
+
+
+def scrape_request(site):
+    # intervalo de 1s entre páginas do mesmo host, como o antigo time.sleep(1)
+    return {"url": site['url'], "site": site, "delay": 1.0, "timeout": 15}
+
+
+def client_domains(client):
+    return ','.join(d.strip() for d in client.domains.split(',') if d.strip()) if client.domains else None
+
+
+def build_advanced_query(keywords, operators=None):
+    """Monta query avançada com operadores OR padrão"""
+    if not operators:
+        return " OR ".join(f'"{kw}"' if ' ' in kw else kw for kw in keywords)
+    parts = []
+    for i, kw in enumerate(keywords):
+        if i > 0:
+            parts.append(operators.get(keywords[i-1], 'OR'))
+        parts.append(f'"{kw}"' if ' ' in kw else kw)
+    return ' '.join(parts)
+
+
+def feed_entries(raw_entries, origin=None):
+    """Normaliza entradas do feedparser (descarta as sem link ou sem data)"""
+    entries = []
+    for entry in raw_entries:
+        url = entry.get('link')
+        pub_dt = entry_datetime(entry)
+        if not url or not pub_dt:
+            continue
+        entries.append({
+            'title': (entry.get('title') or '').strip(),
+            'url': url,
+            'published_at': pub_dt,
+            'published': pub_dt.isoformat(),
+            'source': entry.get('source', {}).get('title', ''),
+            'origin': origin,
+        })
+    return entries
+
+
+def scrape_entries(result):
+    """Blocos de notícia de uma página baixada de SCRAPE_SITES"""
+    if result["error"] or result["status"] != 200:
+        return []
+    site = result["request"]["site"]
+    soup = BeautifulSoup(result["content"], 'html.parser')
+    entries = []
+    for block in soup.select(site['title_selector']):
+        link_tag = block.select_one(site['link_selector'])
+        if not link_tag or not link_tag.get('href'):
+            continue
+        date_tag = block.select_one(site['date_selector'])
+        entries.append({
+            'title': block.get_text(strip=True) or '',
+            # links relativos ficam absolutos em relação à página
+            'url': urljoin(result["final_url"], link_tag.get('href')),
+            'published': date_tag.get_text(strip=True) if date_tag else None,
+            'source': site['url'],
+            'origin': site['url'],
+        })
+    return entries
+
+
+def client_sources(client):
+    """Conectores escolhidos para o cliente (None = todos)"""
+    names = {s.strip().lower() for s in (getattr(client, "sources", "") or "").split(",") if s.strip()}
+    return names or None
+
+
+# —————————————————————————————————————————
+# Contexto e registro
+# —————————————————————————————————————————
+
+class FetchContext:
+    """
+    O que os conectores recebem de uma coleta: a janela completa (UTC sem tz),
+    o paralelismo, o prazo da coleta (time.monotonic(), None = sem limite),
+    onde registrar métricas e escrever mensagens. Com bench=True nada de
+    estado é lido ou gravado (FeedState, janelas incrementais) e as URLs são
+    só normalizadas, sem rede: é o modo do bench_connectors. Com scoped=True
+    (coleta de só parte dos clientes) o FeedState, que é de todos os clientes,
+    não é lido nem gravado: as entradas casadas só com esses clientes não
+    podem marcar o feed como visto para os outros.
+    """
+
+    def __init__(self, since, until, stdout, style, concurrency=1, recorder=None, bench=False,
+                 deadline=None, scoped=False):
+        self.since = since
+        self.until = until
+        self.stdout = stdout
+        self.style = style
+        self.concurrency = max(concurrency, 1)
+        self.recorder = recorder or FetchRecorder()
+        self.bench = bench
+        self.scoped = scoped
+        self.deadline = deadline
+        # {(client_id, fonte): até quando} das buscas incrementais completas
+        self.fetched = {}
+        # [(origem, FeedState ou Feed)]: estado dos feeds lidos, gravado só em commit()
+        self.held = []
+
+    @property
+    def shares_feed_state(self):
+        return not (self.bench or self.scoped)
+
+    def feed_states(self, urls):
+        # estados só em memória: sem GET condicional nem corte pela última entrada vista
+        if not self.shares_feed_state:
+            return {url: FeedState(url=url) for url in dict.fromkeys(urls)}
+        return load_feed_states(urls)
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def hold(self, origin, obj):
+        """Guarda o estado de um feed para gravar depois que as entradas dele forem gravadas"""
+        if self.shares_feed_state:
+            self.held.append((origin, obj))
+
+    def commit(self, blocked):
+        """
+        Grava os estados guardados, menos os das origens em `blocked` (que têm
+        entradas de clientes que não foram gravados: com o ETag e a última
+        entrada vista atualizados, a próxima coleta não as veria de novo).
+        Devolve quantos ficaram para trás.
+        """
+        ready = [obj for origin, obj in self.held if origin not in blocked]
+        save_feed_states(o for o in ready if isinstance(o, FeedState))
+        save_polls([o for o in ready if isinstance(o, Feed)])
+        return len(self.held) - len(ready)
+
+    def canonicalize(self, entries):
+        """Troca entry['url'] pela forma canônica (redirects já conhecidos resolvidos, fora do bench)"""
+        urls = {e["url"] for e in entries}
+        # sem rede: wrappers desconhecidos ficam para a extração
+        resolved = {u: canonical_url(u) for u in urls} if self.bench else resolve_urls(urls, network=False)
+        for entry in entries:
+            entry["url"] = resolved[entry["url"]]
+        return entries
+
+
+CONNECTORS = {}
+
+
+def register(cls):
+    CONNECTORS[cls.name] = cls
+    return cls
+
+
+def get_connectors(names=None):
+    """Conectores habilitados (todos, ou só os de `names`), na ordem de registro"""
+    connectors = []
+    for name, cls in CONNECTORS.items():
+        if names is not None and name not in names:
+            continue
+        connector = cls()
+        if connector.enabled():
+            connectors.append(connector)
+    return connectors
+
+
+class Connector:
+    name = ""   # chave no registro, em Client.sources e em FetchSourceStat.kind
+    label = ""  # nome nas mensagens
+
+    def enabled(self):
+        return True
+
+    def accepts(self, client):
+        sources = client_sources(client)
+        return sources is None or self.name in sources
+
+    def candidates(self, clients):
+        """Clientes que este conector atende (com keywords e a fonte liberada)"""
+        return [c for c in clients if client_keywords(c) and self.accepts(c)]
+
+    def download(self, ctx, clients):
+        """Respostas cruas; precisam ser serializáveis em JSON (bytes à parte)"""
+        raise NotImplementedError
+
+    def parse(self, ctx, clients, raw):
+        """Entradas normalizadas (com `clients`) a partir do que o download devolveu"""
+        raise NotImplementedError
+
+    def fetch(self, ctx, clients):
+        clients = self.candidates(clients)
+        if not clients:
+            return []
+        return self.parse(ctx, clients, self.download(ctx, clients))
+
+    def match(self, ctx, entries, clients):
+        """Casa os títulos com as keywords dos clientes e fica só com as que casaram"""
+        matcher = KeywordMatcher.from_clients(clients)
+        matched = []
+        for entry in entries:
+            entry["clients"] = matcher.match(entry["title"])
+            ctx.recorder.source(entry["origin"], self.name, None).matched += len(entry["clients"])
+            if entry["clients"]:
+                matched.append(entry)
+        # URLs canônicas (e redirects resolvidos) antes de qualquer dedupe
+        return ctx.canonicalize(matched)
+
+    def read_feeds(self, ctx, results, owners=None):
+        """Entradas dos feeds baixados; `owners`: {url: clientes} dos feeds que são de um cliente só"""
+        owners = owners or {}
+        states = ctx.feed_states(r["url"] for r in results)
+        entries = []
+        for result in results:
+            url = result["url"]
+            clients = owners.get(url, [])
+            stat = ctx.recorder.response(url, self.name, result, client=clients[0] if len(clients) == 1 else None)
+            if result["error"]:
+                ctx.stdout.write(ctx.style.ERROR(f"{url} erro: {result['error']}"))
+            try:
+                with ctx.recorder.timed(stat):
+                    found = feed_entries(read_feed(states[url], result), origin=url)
+            except Exception as e:
+                ctx.stdout.write(ctx.style.ERROR(f"{url} erro: {e}"))
+                stat.error = stat.error or f"{type(e).__name__}: {e}"
+                found = []
+            stat.entries = len(found)
+            entries += found
+        for url, state in states.items():
+            ctx.hold(url, state)
+        return entries
+
+
+# —————————————————————————————————————————
+# Conectores
+# —————————————————————————————————————————
+
+class HTTPConnector(Connector):
+    """
+    Conector que só baixa páginas/feeds pelo fetch_engine: devolve as
+    requisições e o fetch_news junta as de todos num único fetch_all (um pool
+    de conexões, limites globais e por host valendo para todas as fontes).
+    """
+
+    def requests(self, ctx, clients):
+        raise NotImplementedError
+
+    def download(self, ctx, clients):
+        return fetch_all(self.requests(ctx, clients))
+
+
+@register
+class GoogleNewsConnector(HTTPConnector):
+    """Uma busca do Google News por cliente (as keywords vão na URL)"""
+    name, label = "google", "GoogleRSS"
+
+    def requests(self, ctx, clients):
+        urls = {google_news_url(client_keywords(c)) for c in clients}
+        return [feed_request(state) for state in ctx.feed_states(urls).values()]
+
+    def parse(self, ctx, clients, raw):
+        owners = {}
+        for client in clients:
+            owners.setdefault(google_news_url(client_keywords(client)), []).append(client)
+        entries = self.read_feeds(ctx, raw, owners)
+        for entry in entries:
+            entry["clients"] = {c.id for c in owners.get(entry["origin"], [])}
+            ctx.recorder.source(entry["origin"], self.name, None).matched += len(entry["clients"])
+        return ctx.canonicalize([e for e in entries if e["clients"]])
+
+
+@register
+class RSSConnector(HTTPConnector):
+    """
+    Os feeds do catálogo (modelo Feed) que estão na hora, baixados uma vez e
+    casados com todos os clientes; depois da leitura cada feed é reagendado
+    conforme a saúde. Coletas de só parte dos clientes leem todos os feeds
+    ativos e não mexem na agenda, que é de todos.
+    """
+    name, label = "rss", "RSSFeeds"
+
+    def feeds(self, ctx):
+        # o bench mede todos os ativos, sem olhar a agenda
+        return due_feeds() if ctx.shares_feed_state else Feed.objects.filter(active=True)
+
+    def requests(self, ctx, clients):
+        states = ctx.feed_states(self.feeds(ctx).values_list("url", flat=True))
+        return [feed_request(state) for state in states.values()]
+
+    def parse(self, ctx, clients, raw):
+        entries = self.read_feeds(ctx, raw)
+        if ctx.shares_feed_state:
+            self.schedule(ctx, raw, entries)
+        since = ctx.since.replace(tzinfo=timezone.utc)
+        return self.match(ctx, [e for e in entries if e["published_at"] > since], clients)
+
+    def schedule(self, ctx, raw, entries):
+        new = Counter(e["origin"] for e in entries)
+        # 304 ou cache: o feed está bem, só não mudou
+        unchanged = {r["url"] for r in raw if r["status"] == 304 or r.get("cached")}
+        feeds = list(Feed.objects.filter(url__in=[r["url"] for r in raw]))
+        for feed in feeds:
+            record_poll(feed, ctx.recorder.source(feed.url, self.name, feed.url).ok, new[feed.url],
+                        unchanged=feed.url in unchanged)
+            if not feed.active:
+                ctx.stdout.write(ctx.style.WARNING(f"{feed.url} desativado: {feed.disabled_reason}"))
+            ctx.hold(feed.url, feed)
+
+
+@register
+class ScrapeConnector(HTTPConnector):
+    """Listas de notícias das páginas de SCRAPE_SITES"""
+    name, label = "scrape", "WebScrape"
+
+    def requests(self, ctx, clients):
+        return [scrape_request(site) for site in SCRAPE_SITES]
+
+    def parse(self, ctx, clients, raw):
+        entries = []
+        for result in raw:
+            stat = ctx.recorder.response(result["url"], self.name, result)
+            with ctx.recorder.timed(stat):
+                found = scrape_entries(result)
+            stat.entries = len(found)
+            entries += found
+        return self.match(ctx, entries, clients)
+
+
+class APIConnector(Connector):
+    """
+    Buscas numa API (newsclip.apis): clientes com a mesma janela e os mesmos
+    filtros dividem queries combinadas, baixadas em paralelo.
+    """
+    api_class = None
+    key_setting = ""
+
+    def enabled(self):
+        return bool(getattr(settings, self.key_setting, ""))
+
+    def window(self, ctx, client):
+        return ctx.since if ctx.bench else window_start(client, self.name, ctx.since)
+
+    def filters(self, client):
+        return {}
+
+    def batches(self, ctx, clients, max_length):
+        groups = {}
+        for client in clients:
+            since = self.window(ctx, client)
+            filters = self.filters(client)
+            key = (since.strftime('%Y-%m-%d'), tuple(sorted(filters.items())))
+            groups.setdefault(key, (since, filters, []))[2].append(client)
+        for since, filters, group in groups.values():
+            queries = [
+                (c.id, build_advanced_query(client_keywords(c), getattr(c, "operators", None)))
+                for c in group
+            ]
+            for ids, query in combine_queries(queries, max_length):
+                yield ids, query, since, filters
+
+    def download(self, ctx, clients):
+        api = self.api_class(getattr(settings, self.key_setting))
+
+        def search(batch):
+            ids, query, since, filters = batch
+            if ctx.expired():
+                # prazo da coleta esgotado: a janela desses clientes não anda
+                return {"clients": ids, "result": None}
+            try:
+                return {"clients": ids, "result": api.search(query, since, ctx.until, **filters)}
+            finally:
+                # cada thread abre a própria conexão com o banco (cota, cache de URLs)
+                connection.close()
+
+        batches = list(self.batches(ctx, clients, api.max_query_length))
+        with ThreadPoolExecutor(max_workers=ctx.concurrency) as exe:
+            return list(exe.map(search, batches))
+
+    def parse(self, ctx, clients, raw):
+        by_id = {c.id: c for c in clients}
+        found = []
+        for item in raw:
+            batch = [by_id[i] for i in item["clients"] if i in by_id]
+            result = item["result"]
+            if result is None:
+                ctx.stdout.write(ctx.style.WARNING(f"{self.label} ({len(batch)} clientes): fora do prazo da coleta"))
+                continue
+            origin = f"{self.name}:{','.join(str(c.id) for c in batch)}"
+            stat = ctx.recorder.source(origin, self.name, result["url"], batch[0] if len(batch) == 1 else None)
+            stat.http_status = result["status"]
+            stat.bytes = result["bytes"]
+            stat.cached = result["cached"]
+            stat.total_ms = result["elapsed"] * 1000
+            stat.error = result["error"]
+            if result["error"]:
+                ctx.stdout.write(ctx.style.WARNING(f"{self.label} ({len(batch)} clientes): {result['error']}"))
+            with ctx.recorder.timed(stat):
+                entries = [dict(e, origin=origin) for e in result["entries"] if e["url"]]
+                matched = assign_to_clients(ctx.canonicalize(entries), batch)
+            stat.entries = len(entries)
+            stat.matched = sum(len(e["clients"]) for e in matched)
+            if result["complete"] and not ctx.bench:
+                # só avança a janela se leu todas as páginas
+                for client in batch:
+                    ctx.fetched[client.id, self.name] = ctx.until
+            found += matched
+        return found
+
+
+@register
+class NewsDataConnector(APIConnector):
+    name, label = "newsdata", "NewsData"
+    api_class = NewsDataAPI
+    key_setting = "NEWSDATA_API_KEY"
+
+
+@register
+class NewsAPIConnector(APIConnector):
+    name, label = "newsapi", "NewsAPI"
+    api_class = NewsAPI
+    key_setting = "NEWSAPI_API_KEY"
+
+    def window(self, ctx, client):
+        return max(super().window(ctx, client), ctx.until - timedelta(days=MAX_NEWSAPI_DAYS))
+
+    def filters(self, client):
+        domains = client_domains(client)
+        return {"domains": domains} if domains else {}
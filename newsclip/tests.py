@@ -1,3 +1,877 @@
-from django.test import TestCase
+import argparse
+import io
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.urls import reverse
+from django.utils import timezone
+
+from newsclip.apis import TokenBucket, combine_queries
+from newsclip.cache import (
+    DjangoCacheBackend, FileSystemBackend, ResponseCache, SQLiteBackend, cache_stats, get_cache,
+)
+from newsclip.canonical import canonical_url, resolve_urls, url_key
+from newsclip.clustering import MAX_DISTANCE, ClusterIndex, article_simhash, collapse_clusters, hamming
+from newsclip.management.commands.fetch_news import Command as FetchNewsCommand, parse_client_ids
+from newsclip.extraction import extract_main_text, extract_pending, resolve_wrappers, summarize
+from newsclip.feeds import due_feeds, record_poll
+from newsclip.jobs import enqueue, report_progress, requeue_stale
+from newsclip.matching import KeywordMatcher
+from newsclip.metrics import FetchRecorder
+from newsclip.models import (
+    ArticleDailyStat, Client, Article, Feed, FeedState, FetchRun, Job, ResolvedURL, Story, Topic,
+)
+from newsclip.rollup import delete_articles, rebuild, set_excluded
+from newsclip.search import search_articles
+from newsclip.sources import FetchContext, ScrapeConnector, get_connectors
+from newsclip.topics import UNCLASSIFIED, TopicClassifier, story_text
+from newsclip.utils import ArticleWriter
+from newsclip.watermarks import save_watermarks, window_start
+
+
+class BuscarTodasNoticiasViewTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("ana", password="x")
+        self.client.force_login(self.user)
+        self.url = reverse("buscar_todas_noticias")
+        self.now = timezone.now()
+
+    def criar_cliente(self, nome, n_artigos):
+        cliente = Client.objects.create(name=nome, keywords=nome)
+        for i in range(n_artigos):
+            story = Story.objects.create(
+                title=f"{nome} {i}",
+                url=f"https://example.com/{nome}/{i}",
+                published_at=self.now - timedelta(hours=i),
+                source="example.com",
+            )
+            Article.objects.create(client=cliente, story=story, published_at=story.published_at)
+        return cliente
+
+    def contar_consultas(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx), response
+
+    def test_busca_so_com_login_e_post(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertFalse(Job.objects.exists())
+
+        resp = self.client.post(self.url)
+        job = Job.objects.get()
+        self.assertRedirects(resp, f"{self.url}?job={job.pk}")
+        self.client.post(self.url)
+        self.assertEqual(Job.objects.count(), 1)
+
+        self.client.logout()
+        self.assertEqual(self.client.post(self.url).status_code, 302)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_numero_de_consultas_nao_cresce_com_os_clientes(self):
+        self.criar_cliente("a", 7)
+        self.criar_cliente("b", 2)
+        poucos, _ = self.contar_consultas()
+
+        for i in range(10):
+            self.criar_cliente(f"c{i}", 8)
+        with self.assertNumQueries(poucos):
+            self.client.get(self.url)
+
+    def test_cinco_mais_recentes_e_total_por_cliente(self):
+        self.criar_cliente("a", 7)
+        self.criar_cliente("b", 2)
+        self.criar_cliente("vazio", 0)
+        _, response = self.contar_consultas()
+
+        itens = {item["cliente"].name: item for item in response.context["clientes_noticias"]}
+        self.assertEqual(itens["a"]["total"], 7)
+        self.assertEqual(
+            [n.title for n in itens["a"]["noticias"]],
+            [f"a {i}" for i in range(5)],
+        )
+        self.assertEqual([n.title for n in itens["b"]["noticias"]], ["b 0", "b 1"])
+        self.assertEqual(list(itens["vazio"]["noticias"]), [])
+        self.assertEqual(itens["vazio"]["total"], 0)
+
+
+class NoticiasClienteJsonTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("ana", password="x")
+        self.cliente = Client.objects.create(name="a", keywords="a")
+        self.cliente.users.add(self.user)
+        self.artigos = []
+        for i in range(2):
+            story = Story.objects.create(title=f"a {i}", url=f"https://example.com/{i}",
+                                         published_at=timezone.now() - timedelta(hours=i))
+            self.artigos.append(Article.objects.create(client=self.cliente, story=story,
+                                                       published_at=story.published_at))
+        self.url = reverse("noticias_cliente_json", args=[self.cliente.pk])
+
+    def test_acesso_so_para_usuarios_do_cliente(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        outro = get_user_model().objects.create_user("bia", password="x")
+        self.client.force_login(outro)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_excluida_some_e_invalida_o_etag(self):
+        self.client.force_login(self.user)
+        resp = self.client.get(self.url)
+        self.assertEqual([n["title"] for n in resp.json()["noticias"]], ["a 0", "a 1"])
+        etag = resp["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Article.objects.filter(pk=self.artigos[1].pk).update(excluded=True)
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([n["title"] for n in resp.json()["noticias"]], ["a 0"])
+
+
+class BuscaTextualTests(TestCase):
+
+    def setUp(self):
+        self.cliente = Client.objects.create(name="a", keywords="a")
+        self.outro = Client.objects.create(name="b", keywords="b")
+        titulos = [
+            "Vacinação contra a gripe começa na segunda",
+            "Vacinas chegam aos hospitais do interior",
+            "Time vence o jogo e lidera o campeonato",
+        ]
+        with ArticleWriter() as writer:
+            for i, titulo in enumerate(titulos):
+                writer.add(self.cliente, titulo, f"https://example.com/{i}", None, "example.com")
+            writer.add(self.outro, titulos[1], "https://example.com/1", None, "example.com")
+
+    def test_ignora_acentos_e_flexoes(self):
+        resultados, _ = search_articles(self.cliente.pk, "VACINA")
+        self.assertEqual(
+            {a.title for a in resultados},
+            {"Vacinação contra a gripe começa na segunda", "Vacinas chegam aos hospitais do interior"},
+        )
+        self.assertEqual(search_articles(self.cliente.pk, "jogos")[0][0].title,
+                         "Time vence o jogo e lidera o campeonato")
+
+    def test_so_artigos_visiveis_do_cliente(self):
+        Article.objects.filter(client=self.cliente, story__url="https://example.com/0").update(excluded=True)
+        resultados, _ = search_articles(self.cliente.pk, "vacina")
+        self.assertEqual([a.client_id for a in resultados], [self.cliente.pk])
+        self.assertEqual([a.title for a in resultados], ["Vacinas chegam aos hospitais do interior"])
+
+    def test_paginas_por_cursor_nao_se_repetem(self):
+        primeira, cursor = search_articles(self.cliente.pk, "vacina", limit=1)
+        segunda, fim = search_articles(self.cliente.pk, "vacina", cursor=cursor, limit=1)
+        self.assertIsNotNone(cursor)
+        self.assertIsNone(fim)
+        self.assertNotEqual(primeira[0].pk, segunda[0].pk)
+
+    def test_pontua_so_as_noticias_do_cliente(self):
+        with ArticleWriter() as writer:
+            writer.add(self.outro, "Vacina nova é aprovada", "https://example.com/9", None, "example.com")
+        with CaptureQueriesContext(connection) as consultas:
+            resultados, _ = search_articles(self.cliente.pk, "vacina")
+        self.assertEqual(len(resultados), 2)
+        self.assertNotIn("Vacina nova é aprovada", {a.title for a in resultados})
+        if connection.vendor == "sqlite":
+            ranking = consultas.captured_queries[0]["sql"].split(") r")[0]
+            self.assertIn(f"client_id = {self.cliente.pk}", ranking)
+
+
+class MetricasColetaTests(TestCase):
+
+    def setUp(self):
+        self.cliente = Client.objects.create(name="a", keywords="a")
+        recorder = FetchRecorder()
+        ok = recorder.response("https://feed/ok", "rss", {
+            "url": "https://feed/ok", "status": 200, "error": None, "content": b"<rss/>",
+            "elapsed": 0.2, "timings": {"connect": 0.05, "wait": 0.1},
+        })
+        ok.entries = 2
+        recorder.response("https://feed/fora", "rss", {
+            "url": "https://feed/fora", "status": None, "error": "ConnectError: timeout",
+            "content": b"", "elapsed": 20.0,
+        })
+        with ArticleWriter() as writer:
+            writer.add(self.cliente, "t1", "https://example.com/1", None, "x", origin="https://feed/ok")
+            writer.add(self.cliente, "t2", "https://example.com/2", None, "x", origin="https://feed/ok")
+        self.run = FetchRun.objects.create(status="done", finished_at=timezone.now())
+        recorder.save(self.run, writer)
+
+    def test_inseridas_por_fonte(self):
+        fontes = {s.url: s for s in self.run.sources.all()}
+        self.assertEqual(fontes["https://feed/ok"].inserted, 2)
+        self.assertEqual(fontes["https://feed/ok"].connect_ms, 50)
+        self.assertFalse(fontes["https://feed/fora"].ok)
+
+    @override_settings(METRICS_TOKEN="segredo")
+    def test_endpoint_prometheus(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        resp = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer segredo")
+        self.assertEqual(resp.status_code, 200)
+        body = resp.content.decode()
+        self.assertIn('newsclip_fetch_source_up{kind="rss",source="https://feed/fora",client=""} 0', body)
+        self.assertIn('newsclip_fetch_source_inserted{kind="rss",source="https://feed/ok",client=""} 2', body)
+
+
+class ClientIdsTests(SimpleTestCase):
+
+    def test_listas_e_faixas(self):
+        self.assertEqual(parse_client_ids("3, 7,10-20"), [(3, 3), (7, 7), (10, 20)])
+        self.assertEqual(parse_client_ids("5"), [(5, 5)])
+
+    def test_invalidos(self):
+        for valor in ("a", "3-", "9-2"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_client_ids(valor)
+
+
+class ResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def backends(self):
+        sqlite = SQLiteBackend(os.path.join(self.dir, "cache.sqlite3"), "cache_teste")
+        self.addCleanup(sqlite._conn.close)
+        return {
+            "filesystem": FileSystemBackend(os.path.join(self.dir, "fs")),
+            "sqlite": sqlite,
+            "django": DjangoCacheBackend("default", "teste", 60),
+        }
+
+    def test_ida_e_volta_em_cada_backend(self):
+        for name, backend in self.backends().items():
+            with self.subTest(backend=name):
+                cache = ResponseCache(backend, ttl=60, prune_interval=0)
+                key = cache.make_key("https://a.test/rss", ("q", 1))
+                self.assertIsNone(cache.get(key))
+                cache.set(key, b"\x00corpo")
+                self.assertEqual(cache.get(key), b"\x00corpo")
+                backend.delete(key)
+                self.assertIsNone(cache.get(key))
+                self.assertEqual((cache.hits, cache.misses, cache.sets), (1, 2, 1))
+
+    def test_entrada_vencida_vira_miss_e_sai(self):
+        for name, backend in self.backends().items():
+            with self.subTest(backend=name):
+                cache = ResponseCache(backend, ttl=60, prune_interval=0)
+                cache.set("k", b"v")
+                with mock.patch("newsclip.cache.time.time", return_value=time.time() + 61):
+                    self.assertIsNone(cache.get("k"))
+                self.assertIsNone(backend.get("k"))
+
+    def test_limpeza_tira_as_vencidas_e_as_menos_usadas(self):
+        for name in ("filesystem", "sqlite"):
+            backend = self.backends()[name]
+            with self.subTest(backend=name):
+                cache = ResponseCache(backend, ttl=60, max_entries=2, prune_interval=0)
+                for key in ("a", "b", "c"):
+                    cache.set(key, b"v")
+                agora = time.time()
+                with mock.patch("newsclip.cache.time.time", return_value=agora + 10):
+                    cache.get("a")
+                    cache.get("c")
+                    self.assertEqual(cache.prune(), 1)
+                self.assertIsNone(backend.get("b"))
+                with mock.patch("newsclip.cache.time.time", return_value=agora + 61):
+                    self.assertEqual(cache.prune(), 2)
+
+    @override_settings(NEWSCLIP_CACHE_BACKEND="sqlite", NEWSCLIP_CACHE_PRUNE_INTERVAL=0)
+    def test_metricas_por_coleta(self):
+        # caches novos só para o teste: o do processo fica como estava
+        with override_settings(NEWSCLIP_CACHE_LOCATION=self.dir), \
+                mock.patch.dict("newsclip.cache._caches", clear=True):
+            cache = get_cache("teste")
+            self.addCleanup(cache.backend._conn.close)
+            cache.get("x")
+            antes = cache_stats()
+            cache.set("x", b"v")
+            cache.get("x")
+            self.assertEqual(cache_stats()["teste"]["misses"], 1)
+            depois = cache_stats(since=antes)["teste"]
+            self.assertEqual((depois["hits"], depois["misses"], depois["hit_rate"]), (1, 0, 1.0))
+
+
+class KeywordMatcherTests(SimpleTestCase):
+
+    def matcher(self, **keywords):
+        matcher = KeywordMatcher()
+        for client, kws in keywords.items():
+            for kw in kws:
+                matcher.add(kw, client)
+        return matcher
+
+    def test_ignora_acentos_e_maiusculas(self):
+        m = self.matcher(a=["saúde"], b=["ÔNIBUS"])
+        self.assertEqual(m.match("SAUDE pública e onibus lotados"), {"a", "b"})
+
+    def test_frase_so_casa_inteira_e_em_sequencia(self):
+        m = self.matcher(a=["rio preto"])
+        self.assertEqual(m.match("Chuva em São José do Rio Preto"), {"a"})
+        self.assertEqual(m.match("Rio de Janeiro tem céu preto"), set())
+        self.assertEqual(m.match("rio rio preto"), {"a"})
+
+    def test_nao_casa_pedaco_de_palavra(self):
+        m = self.matcher(a=["rio"], b=["vacina"])
+        self.assertEqual(m.match("Riozinho e os rios; vacinação começa"), set())
+        self.assertEqual(m.match("vacina-rio"), {"a", "b"})
+
+    def test_keywords_sobrepostas_de_varios_clientes(self):
+        m = self.matcher(a=["rio"], b=["rio preto", "preto"], c=["sao jose do rio preto"], d=["jose"])
+        self.assertEqual(m.match("São José do Rio Preto"), {"a", "b", "c", "d"})
+        self.assertEqual(list(m.iter_matches("do rio preto")).count("b"), 2)
+        self.assertEqual(m.match("jose do rio"), {"a", "d"})
+
+    def test_keyword_adicionada_depois_do_build(self):
+        m = self.matcher(a=["rio preto"]).build()
+        m.add("preto", "b")
+        self.assertEqual(m.match("rio preto"), {"a", "b"})
+
+
+@override_settings(FETCH_WINDOW_OVERLAP_HOURS=2)
+class JanelaIncrementalTests(TestCase):
+
+    def setUp(self):
+        self.cliente = Client.objects.create(name="a", keywords="saúde, vacina")
+        self.agora = datetime(2024, 5, 10, 12, 0)
+        self.completa = self.agora - timedelta(days=90)
+
+    def test_cliente_novo_busca_a_janela_completa(self):
+        self.assertEqual(window_start(self.cliente, "newsdata", self.completa), self.completa)
+
+    def test_depois_de_uma_busca_pede_so_o_delta(self):
+        save_watermarks(self.cliente, {"newsdata": self.agora})
+        self.assertEqual(window_start(self.cliente, "newsdata", self.completa), self.agora - timedelta(hours=2))
+        self.assertEqual(window_start(self.cliente, "newsapi", self.completa), self.completa)
+
+    def test_keywords_alteradas_voltam_a_janela_completa(self):
+        save_watermarks(self.cliente, {"newsdata": self.agora})
+        self.cliente.keywords = "saúde, vacina, dengue"
+        self.assertEqual(window_start(self.cliente, "newsdata", self.completa), self.completa)
+
+
+class ConectoresAPITests(TestCase):
+
+    def test_queries_combinadas_respeitam_o_limite(self):
+        lotes = combine_queries([(1, "a OR b"), (2, '"c d"'), (3, "x" * 20)], 30)
+        self.assertEqual(lotes, [([1, 2], '(a OR b) OR ("c d")'), ([3], "x" * 20)])
+        self.assertTrue(all(len(q) <= 30 for _, q in lotes))
+
+    def test_balde_compartilhado_e_pausa(self):
+        balde = TokenBucket("teste", capacity=2, period=3600)
+        self.assertTrue(balde.acquire(max_wait=0))
+        # outra instância (outro processo) vê as mesmas fichas
+        self.assertTrue(TokenBucket("teste", capacity=2, period=3600).acquire(max_wait=0))
+        self.assertFalse(balde.acquire(max_wait=0))
+
+        livre = TokenBucket("outro", capacity=5, period=60)
+        livre.pause(120)
+        self.assertFalse(livre.acquire(max_wait=0))
+
+    @override_settings(NEWSAPI_API_KEY="teste")
+    def test_lote_de_api_fora_do_prazo_nao_chama_a_api(self):
+        cliente = Client.objects.create(name="a", keywords="a")
+        agora = datetime.utcnow()
+        ctx = FetchContext(agora - timedelta(days=1), agora, io.StringIO(), no_style(), deadline=0)
+        connector = get_connectors(["newsapi"])[0]
+        self.assertEqual(connector.fetch(ctx, [cliente]), [])
+        # sem resposta, a janela do cliente não anda
+        self.assertEqual(ctx.fetched, {})
+
+    def test_coleta_restrita_nao_grava_estado_de_feed(self):
+        cmd = FetchNewsCommand(stdout=io.StringIO())
+
+        def load_entries(ctx, clients):
+            ctx.held.append(("https://a.test/rss", FeedState(url="https://a.test/rss", etag='"v2"')))
+            return [], {}
+
+        with mock.patch.object(cmd, "load_entries", load_entries):
+            cmd.fetch_clients([], scoped=True)
+        self.assertFalse(FeedState.objects.exists())
+
+
+class RegistroConectoresTests(TestCase):
+
+    def test_fontes_do_cliente(self):
+        cliente = Client(name="a", keywords="x", sources="rss, scrape")
+        self.assertTrue(ScrapeConnector().accepts(cliente))
+        cliente.sources = "rss"
+        self.assertFalse(ScrapeConnector().accepts(cliente))
+        cliente.sources = "rss, telegrafo"
+        with self.assertRaises(ValidationError):
+            cliente.full_clean()
+
+    @override_settings(NEWSDATA_API_KEY="", NEWSAPI_API_KEY="k")
+    def test_apis_sem_chave_ficam_de_fora(self):
+        nomes = [c.name for c in get_connectors()]
+        self.assertIn("newsapi", nomes)
+        self.assertNotIn("newsdata", nomes)
+        self.assertEqual([c.name for c in get_connectors({"rss"})], ["rss"])
+
+    def test_parse_de_resposta_gravada(self):
+        cliente = Client.objects.create(name="a", keywords="câmara")
+        pagina = (
+            '<h3 class="g-chamada__titulo"><a href="/noticias/1?utm_source=x">Câmara aprova projeto</a></h3>'
+            '<h3 class="g-chamada__titulo"><a href="/noticias/2">Outro assunto</a></h3>'
+        ).encode()
+        site = {"url": "https://camara.test/noticias/", "title_selector": "h3.g-chamada__titulo",
+                "link_selector": "a", "date_selector": "span"}
+        raw = [{"request": {"url": site["url"], "site": site}, "url": site["url"], "final_url": site["url"],
+                "status": 200, "content": pagina, "headers": {}, "error": None, "elapsed": 0.1, "timings": {}}]
+        agora = datetime.utcnow()
+        ctx = FetchContext(agora - timedelta(days=1), agora, io.StringIO(), no_style(), bench=True)
+
+        entradas = ScrapeConnector().parse(ctx, [cliente], raw)
+        self.assertEqual([(e["url"], e["clients"]) for e in entradas],
+                         [("https://camara.test/noticias/1", {cliente.id})])
+        self.assertEqual(ctx.recorder.source(site["url"], "scrape", None).matched, 1)
+
+
+@override_settings(FEED_MAX_INTERVAL_HOURS=24, FEED_DISABLE_AFTER_FAILURES=3, FEED_STALE_DAYS=60)
+class AgendaFeedsTests(TestCase):
+
+    def setUp(self):
+        self.agora = timezone.now()
+        self.feed = Feed(url="https://feed.test/rss", interval=30, created_at=self.agora)
+
+    def test_catalogo_importado_com_tags(self):
+        olimpia = Feed.objects.get(url="https://diariodeolimpia.com.br/rss")
+        self.assertEqual(olimpia.region, "sao_paulo/olimpia")
+        self.assertEqual(Feed.objects.get(url="https://tecnoblog.net/feed/").category, "tecnologia")
+
+    def test_so_le_os_feeds_na_hora(self):
+        Feed.objects.all().delete()
+        Feed.objects.create(url="https://a.test/rss")
+        Feed.objects.create(url="https://b.test/rss", next_poll_at=self.agora + timedelta(minutes=5))
+        Feed.objects.create(url="https://c.test/rss", active=False)
+        self.assertEqual([f.url for f in due_feeds(self.agora)], ["https://a.test/rss"])
+
+    def test_falhas_dobram_o_intervalo_e_desativam(self):
+        record_poll(self.feed, False, 0, self.agora)
+        self.assertEqual(self.feed.next_poll_at, self.agora + timedelta(minutes=60))
+        record_poll(self.feed, False, 0, self.agora)
+        self.assertEqual(self.feed.next_poll_at, self.agora + timedelta(minutes=120))
+        self.assertTrue(self.feed.active)
+        record_poll(self.feed, False, 0, self.agora)
+        self.assertFalse(self.feed.active)
+
+    def test_sem_novidade_espaca_ate_o_teto(self):
+        for _ in range(3):
+            record_poll(self.feed, True, 0, self.agora)
+        self.assertEqual(self.feed.next_poll_at, self.agora + timedelta(minutes=60))
+        for _ in range(30):
+            record_poll(self.feed, True, 0, self.agora)
+        self.assertEqual(self.feed.next_poll_at, self.agora + timedelta(hours=24))
+
+        record_poll(self.feed, True, 4, self.agora)
+        self.assertEqual((self.feed.empty_polls, self.feed.next_poll_at), (0, self.agora + timedelta(minutes=30)))
+
+    def test_304_nao_espaca_as_leituras(self):
+        for _ in range(6):
+            record_poll(self.feed, True, 0, self.agora, unchanged=True)
+        self.assertEqual((self.feed.empty_polls, self.feed.next_poll_at), (0, self.agora + timedelta(minutes=30)))
+
+    def test_feed_parado_ha_muito_tempo_e_desativado(self):
+        self.feed.last_new_at = self.agora - timedelta(days=61)
+        record_poll(self.feed, True, 0, self.agora)
+        self.assertFalse(self.feed.active)
+        self.assertIn("60 dias", self.feed.disabled_reason)
+
+    def test_estado_so_e_gravado_depois_dos_clientes(self):
+        agora = datetime.utcnow()
+        ctx = FetchContext(agora - timedelta(days=1), agora, io.StringIO(), no_style())
+        pendente, gravado = ctx.feed_states(["https://a.test/rss", "https://b.test/rss"]).values()
+        for state in (pendente, gravado):
+            state.etag = '"v2"'
+            ctx.hold(state.url, state)
+        self.assertEqual(FeedState.objects.count(), 0)
+
+        self.assertEqual(ctx.commit({"https://a.test/rss"}), 1)
+        self.assertEqual(list(FeedState.objects.values_list("url", "etag")), [("https://b.test/rss", '"v2"')])
+
+
+def rss_xml(*items):
+    """Um feed RSS com (título, link) publicados há uma hora"""
+    quando = format_datetime(timezone.now() - timedelta(hours=1))
+    corpo = "".join(
+        f"<item><title>{t}</title><link>{link}</link><pubDate>{quando}</pubDate></item>" for t, link in items
+    )
+    return f'<rss version="2.0"><channel><title>t</title>{corpo}</channel></rss>'.encode()
+
+
+class FeedFalso:
+    """fetch_all de mentira: responde 304 a quem manda o ETag e guarda as requisições"""
+
+    def __init__(self, content):
+        self.content = content
+        self.requests = []
+
+    def __call__(self, reqs):
+        results = []
+        for req in reqs:
+            self.requests.append(req)
+            status = 304 if req.get("headers", {}).get("If-None-Match") == '"v1"' else 200
+            results.append({
+                "request": req, "url": req["url"], "final_url": req["url"], "status": status,
+                "content": self.content if status == 200 else b"", "headers": {"etag": '"v1"'},
+                "error": None, "elapsed": 0.0, "timings": {}, "cached": False,
+            })
+        return results
+
+
+class ColetaRestritaTests(TransactionTestCase):
+    # a coleta grava em outras threads; o catálogo de feeds volta no fim
+    serialized_rollback = True
+
+    def setUp(self):
+        Feed.objects.all().delete()
+        self.feed = Feed.objects.create(url="https://feed.test/rss")
+        self.a = Client.objects.create(name="A", keywords="vacina", sources="rss")
+        self.b = Client.objects.create(name="B", keywords="dengue", sources="rss")
+        self.fetch = FeedFalso(rss_xml(
+            ("Nova vacina aprovada", "https://n.test/vacina"), ("Casos de dengue sobem", "https://n.test/dengue"),
+        ))
+
+    def run_fetch(self, **options):
+        with mock.patch("newsclip.management.commands.fetch_news.fetch_all", self.fetch):
+            call_command("fetch_news", stdout=io.StringIO(), **options)
+
+    def test_coleta_de_um_cliente_nao_esconde_o_feed_dos_outros(self):
+        self.run_fetch(client_id=str(self.a.id))
+        self.assertEqual(list(Article.objects.values_list("client__name", flat=True)), ["A"])
+        self.assertFalse(FeedState.objects.exists())
+
+        self.run_fetch()
+        self.assertEqual(Article.objects.filter(client=self.b).count(), 1)
+        self.assertEqual(FeedState.objects.get(url=self.feed.url).etag, '"v1"')
+
+    def test_coleta_de_um_cliente_le_fora_da_agenda_sem_reagendar(self):
+        depois = timezone.now() + timedelta(hours=3)
+        Feed.objects.filter(pk=self.feed.pk).update(next_poll_at=depois)
+        self.run_fetch(client_id=str(self.a.id))
+        self.assertEqual([r["url"] for r in self.fetch.requests if "feed.test" in r["url"]], [self.feed.url])
+        self.assertEqual(Feed.objects.get(pk=self.feed.pk).next_poll_at, depois)
+
+        self.run_fetch()
+        self.assertEqual(Feed.objects.get(pk=self.feed.pk).next_poll_at, depois)
+        self.assertEqual(Article.objects.filter(client=self.b).count(), 0)
+
+
+class RollupTests(TestCase):
+
+    def setUp(self):
+        self.a = Client.objects.create(name="a", keywords="a")
+        self.b = Client.objects.create(name="b", keywords="b")
+        with ArticleWriter() as writer:
+            for i in range(6):
+                # perto da meia-noite: o dia do rollup tem que ser o mesmo do TruncDate
+                quando = f"2024-05-{10 + i % 2}T23:{30 + i}:00+00:00"
+                writer.add(self.a, f"notícia {i}", f"https://s{i % 3}.com/{i}", quando, f"s{i % 3}.com")
+                if i % 2:
+                    writer.add(self.b, f"notícia {i}", f"https://s{i % 3}.com/{i}", quando, f"s{i % 3}.com")
+
+    def rollup(self):
+        return {
+            (r.client_id, r.day, r.source, r.topic, r.excluded): r.count
+            for r in ArticleDailyStat.objects.all() if r.count
+        }
+
+    def direto(self):
+        rows = (
+            Article.objects.annotate(day=TruncDate("published_at"))
+            .values_list("client_id", "day", "story__source", "story__topic", "excluded")
+            .annotate(n=Count("id"))
+        )
+        return {row[:5]: row[5] for row in rows}
+
+    def test_rollup_acompanha_insercoes_exclusoes_e_remocoes(self):
+        self.assertEqual(self.rollup(), self.direto())
+        self.assertEqual(sum(self.rollup().values()), 9)
+
+        set_excluded(Article.objects.filter(client=self.a, story__source="s1.com"), True)
+        self.assertEqual(self.rollup(), self.direto())
+        delete_articles(Article.objects.filter(client=self.b, story__source="s0.com"))
+        self.assertEqual(self.rollup(), self.direto())
+        set_excluded(Article.objects.filter(client=self.a), False)
+        self.assertEqual(self.rollup(), self.direto())
+
+    def test_insercao_repetida_nao_conta_de_novo(self):
+        with ArticleWriter() as writer:
+            writer.add(self.a, "notícia 0", "https://s0.com/0", "2024-05-10T23:30:00+00:00", "s0.com")
+        self.assertEqual((writer.inserted, writer.duplicates), (0, 1))
+        self.assertEqual(self.rollup(), self.direto())
+
+    def test_rebuild_recalcula_do_zero(self):
+        esperado = self.direto()
+        ArticleDailyStat.objects.filter(client=self.a).update(count=F("count") + 5)
+        ArticleDailyStat.objects.create(client=self.b, day=None, count=3)
+        self.assertEqual(rebuild([self.b.id]), sum(n for k, n in esperado.items() if k[0] == self.b.id))
+        self.assertNotEqual(self.rollup(), esperado)
+        rebuild()
+        self.assertEqual(self.rollup(), esperado)
+
+
+class AgrupamentoTests(TestCase):
+
+    def test_mesma_materia_em_portais_diferentes_tem_o_mesmo_hash(self):
+        g1 = Story(title="Governo anuncia novo programa de vacinação contra a dengue - G1")
+        uol = Story(title="Governo anuncia novo programa de vacinacao contra a Dengue | UOL")
+        outra = Story(title="Prefeitura abre inscrições para concurso de professores")
+        self.assertEqual(article_simhash(g1), article_simhash(uol))
+        self.assertGreater(hamming(article_simhash(g1), article_simhash(outra)), MAX_DISTANCE)
+        self.assertIsNone(article_simhash(Story(title="de que com")))
+
+    def test_limite_da_distancia_de_hamming(self):
+        index = ClusterIndex()
+        base = 0x0123456789ABCDEF
+        self.assertEqual(index.assign(base), base)
+        # bits trocados na mesma faixa: as outras três continuam iguais
+        self.assertEqual(index.assign(base ^ 0b111), base)
+        self.assertEqual(index.assign(base ^ 0b111000), base)
+        self.assertEqual(index.assign(base ^ 0b1111 << 20), base ^ 0b1111 << 20)
+        self.assertIsNone(index.assign(None))
+        self.assertEqual(len(index), 4)
+
+    def test_writer_agrupa_e_colapso_deixa_um_por_grupo(self):
+        cliente = Client.objects.create(name="a", keywords="dengue")
+        with ArticleWriter() as writer:
+            writer.add(cliente, "Casos de dengue dobram no interior paulista - G1", "https://g1.test/1",
+                       "2024-05-10T12:00:00+00:00", "G1")
+            writer.add(cliente, "Casos de dengue dobram no interior paulista | UOL", "https://uol.test/1",
+                       "2024-05-10T09:00:00+00:00", "UOL")
+            writer.add(cliente, "Vacina contra dengue chega aos postos", "https://g1.test/2",
+                       "2024-05-10T10:00:00+00:00", "G1")
+        g1, uol, vacina = (Story.objects.get(url=u) for u in
+                           ("https://g1.test/1", "https://uol.test/1", "https://g1.test/2"))
+        self.assertEqual(g1.cluster, uol.cluster)
+        self.assertNotEqual(g1.cluster, vacina.cluster)
+
+        linhas = {a.story.url: a.copies for a in collapse_clusters(Article.objects.filter(client=cliente))}
+        # do grupo fica o publicado primeiro
+        self.assertEqual(linhas, {"https://uol.test/1": 2, "https://g1.test/2": 1})
+        self.assertEqual(ClusterIndex.recent().find(g1.simhash), g1.cluster)
+
+
+class TopicosTests(TestCase):
+
+    def setUp(self):
+        self.classifier = TopicClassifier([
+            Topic(name="Saúde", keywords="saúde, vacina, hospital"),
+            Topic(name="Cidades", keywords="rio preto, trânsito, hospital"),
+        ])
+
+    def test_dicionario_com_empate_para_o_primeiro(self):
+        self.assertEqual(self.classifier.classify("Vacina chega ao HOSPITAL"), "Saúde")
+        self.assertEqual(self.classifier.classify("Trânsito em Rio Preto perto do hospital"), "Cidades")
+        self.assertEqual(self.classifier.classify("Hospital novo"), "Saúde")
+        self.assertEqual(self.classifier.classify("Nada a ver"), UNCLASSIFIED)
+
+    def test_lote_igual_a_um_por_um_e_sem_casar_entre_textos(self):
+        textos = ["Fila no hospital", "", "Ponte em Rio", "Preto e branco", "Trânsito e vacina, trânsito"]
+        self.assertEqual(self.classifier.classify_many(textos), [self.classifier.classify(t) for t in textos])
+        self.assertEqual(self.classifier.classify_many(textos)[2:4], [UNCLASSIFIED, UNCLASSIFIED])
+
+    def test_resumo_entra_na_classificacao(self):
+        story = Story(title="Prefeitura anuncia medidas - G1", summary="Novo hospital e campanha de vacina.")
+        self.assertEqual(self.classifier.classify(story_text(story)), "Saúde")
+
+    def test_reclassify_topics_atualiza_noticias_e_rollup(self):
+        Topic.objects.all().delete()
+        Topic.objects.create(name="Saúde", keywords="vacina")
+        cliente = Client.objects.create(name="a", keywords="a")
+        with ArticleWriter() as writer:
+            writer.add(cliente, "Vacina nova", "https://s.test/1", "2024-05-10T12:00:00+00:00", "s")
+            writer.add(cliente, "Outra coisa", "https://s.test/2", "2024-05-10T12:00:00+00:00", "s")
+        self.assertEqual(sorted(Story.objects.values_list("topic", flat=True)), ["Saúde", UNCLASSIFIED])
+
+        Topic.objects.create(name="Outros", keywords="coisa")
+        call_command("reclassify_topics", "--unclassified", stdout=io.StringIO())
+        self.assertEqual(Story.objects.get(url="https://s.test/2").topic, "Outros")
+        self.assertEqual(
+            sorted(ArticleDailyStat.objects.filter(count__gt=0).values_list("topic", "count")),
+            [("Outros", 1), ("Saúde", 1)],
+        )
+
+
+class URLCanonicaTests(TestCase):
+
+    def test_mantem_o_esquema_e_compara_sem_ele(self):
+        self.assertEqual(canonical_url("HTTP://Site.com:80/a?utm_source=x&b=1#topo"), "http://site.com/a?b=1")
+        self.assertEqual(url_key("http://site.com/a"), url_key("https://site.com/a?utm_medium=y"))
+
+    def test_http_e_https_viram_a_mesma_noticia(self):
+        cliente = Client.objects.create(name="a", keywords="a")
+        with ArticleWriter() as writer:
+            writer.add(cliente, "A notícia", "http://site.com/a", None, "site")
+        with ArticleWriter() as writer:
+            writer.add(cliente, "A notícia", "https://site.com/a", None, "site")
+        self.assertEqual(Story.objects.get().url, "http://site.com/a")
+        self.assertEqual((writer.inserted, writer.duplicates), (0, 1))
+
+    def test_coleta_nao_resolve_wrapper_pela_rede(self):
+        wrapper = "https://news.google.com/read/XYZ?oc=5"
+        resolved = resolve_urls([wrapper], network=False)
+        # sem destino conhecido fica o próprio wrapper (a extração resolve depois)
+        self.assertEqual(resolved[wrapper], "https://news.google.com/read/XYZ")
+
+    def test_extracao_troca_o_wrapper_pelo_destino(self):
+        wrapper = "https://news.google.com/read/XYZ"
+        ResolvedURL.objects.create(url=wrapper, resolved_url="http://site.com/b", status=200,
+                                   resolved_at=timezone.now())
+        story = Story.objects.create(title="b", url=wrapper)
+        resolve_wrappers([story])
+        story.refresh_from_db()
+        self.assertEqual((story.url, story.url_key), ("http://site.com/b", "site.com/b"))
+
+    def test_extracao_nao_cria_segunda_noticia_com_a_mesma_chave(self):
+        wrapper = "https://news.google.com/read/XYZ"
+        ResolvedURL.objects.create(url=wrapper, resolved_url="http://site.com/b", status=200,
+                                   resolved_at=timezone.now())
+        Story.objects.create(title="b", url="https://site.com/b")
+        story = Story.objects.create(title="b", url=wrapper)
+        resolve_wrappers([story])
+        story.refresh_from_db()
+        self.assertEqual(story.url, wrapper)
+        self.assertEqual(Story.objects.filter(url_key="site.com/b").count(), 1)
+
+
+PARAGRAFOS = [
+    "A prefeitura de Olímpia anunciou nesta segunda-feira um mutirão de vacinação, com postos abertos em todos os bairros.",
+    "Segundo a secretaria de saúde, a meta é imunizar, até o fim do mês, oitenta por cento das crianças da cidade.",
+    "Os postos funcionam das oito às dezessete horas, e é preciso levar a carteirinha de vacinação e um documento.",
+]
+MATERIA = f"""
+<html><body>
+  <nav><p>Início Política Economia Esportes Cultura Tecnologia Mundo Saúde Educação Contato</p></nav>
+  <article class="materia">
+    <h1>Mutirão de vacinação</h1>
+    {"".join(f"<p>{p}</p>" for p in PARAGRAFOS)}
+    <p>Leia também</p>
+  </article>
+  <div class="comments"><p>Comentário de leitor que não faz parte da matéria, com vírgulas, muitas, e texto longo.</p></div>
+  <footer><p>Todos os direitos reservados ao portal de notícias de exemplo desde mil novecentos e noventa.</p></footer>
+</body></html>
+""".encode()
+
+
+class PaginasFalsas:
+    """fetch_all de mentira: {url: (status, html, url final)}, sem rede"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.urls = []
+
+    def __call__(self, reqs, **kwargs):
+        results = []
+        for req in reqs:
+            self.urls.append(req["url"])
+            status, content, final = self.pages.get(req["url"], (404, b"", req["url"]))
+            content_type = "application/pdf" if content.startswith(b"%PDF") else "text/html; charset=utf-8"
+            results.append({
+                "request": req, "url": req["url"], "final_url": final, "status": status, "content": content,
+                "headers": {"content-type": content_type}, "error": None, "elapsed": 0.0, "timings": {},
+                "cached": False,
+            })
+        return results
+
+
+class ExtracaoTests(TestCase):
+
+    def test_texto_principal_sem_menu_comentarios_e_rodape(self):
+        texto = extract_main_text(MATERIA)
+        self.assertEqual(texto.split("\n\n"), PARAGRAFOS)
+        self.assertEqual(extract_main_text(b"<html><body><p>curto</p></body></html>"), "")
+
+    def test_resumo_extrativo_na_ordem_original(self):
+        texto = " ".join(PARAGRAFOS)
+        self.assertEqual(summarize(texto), texto)
+        # o lide e a frase que mais repete as palavras do texto (vacinação, postos)
+        resumo = summarize(texto + " Outra frase qualquer sem relação nenhuma com o resto do texto aqui.", 2)
+        self.assertEqual(resumo, f"{PARAGRAFOS[0]} {PARAGRAFOS[2]}")
+
+    def test_extrai_pendentes_e_resolve_wrappers(self):
+        cliente = Client.objects.create(name="a", keywords="a")
+        stories = {}
+        for nome, url in [("normal", "https://site.test/a"), ("wrapper", "https://t.co/abc"),
+                          ("sumiu", "https://site.test/404"), ("pdf", "https://site.test/doc.pdf")]:
+            stories[nome] = Story.objects.create(title=f"Título {nome}", url=url, summary=f"Título {nome}.")
+            Article.objects.create(client=cliente, story=stories[nome])
+        paginas = PaginasFalsas({
+            "https://site.test/a": (200, MATERIA, "https://site.test/a"),
+            "https://t.co/abc": (200, b"", "https://site.test/b?utm_source=tw"),
+            "https://site.test/b": (200, MATERIA, "https://site.test/b"),
+            "https://site.test/doc.pdf": (200, b"%PDF-1.4", "https://site.test/doc.pdf"),
+        })
+        with mock.patch("newsclip.extraction.fetch_all", paginas), mock.patch("newsclip.canonical.fetch_all", paginas):
+            self.assertEqual(extract_pending(), (4, 2))
+
+        for story in stories.values():
+            story.refresh_from_db()
+        self.assertEqual((stories["wrapper"].url, stories["wrapper"].url_key), ("https://site.test/b", "site.test/b"))
+        self.assertEqual(ResolvedURL.objects.get(url="https://t.co/abc").resolved_url, "https://site.test/b")
+        self.assertEqual(stories["normal"].text, "\n\n".join(PARAGRAFOS))
+        self.assertTrue(stories["normal"].summary.startswith(PARAGRAFOS[0]))
+        self.assertEqual((stories["sumiu"].extract_status, stories["sumiu"].summary), (404, "Título sumiu."))
+        self.assertEqual(stories["pdf"].text, "")
+        self.assertTrue(all(s.extracted_at for s in stories.values()))
+        # o texto entra no índice de busca
+        self.assertEqual({a.story_id for a in search_articles(cliente.pk, "mutirão")[0]},
+                         {stories["normal"].pk, stories["wrapper"].pk})
+
+        # cada notícia é tentada uma vez só
+        with mock.patch("newsclip.extraction.fetch_all", paginas):
+            self.assertEqual(extract_pending(), (0, 0))
+
+
+class FilaJobsTests(TestCase):
+
+    def rodando(self, sinal_ha, attempts=0):
+        return Job.objects.create(
+            kind="fetch_news", dedupe_key=f"k{Job.objects.count()}", status="running", attempts=attempts,
+            started_at=timezone.now() - timedelta(hours=2), heartbeat_at=timezone.now() - sinal_ha,
+        )
+
+    def test_job_sem_sinal_volta_para_a_fila_como_tentativa(self):
+        vivo = self.rodando(timedelta(minutes=1))
+        parado = self.rodando(timedelta(minutes=20))
+        esgotado = self.rodando(timedelta(minutes=20), attempts=2)
+
+        self.assertEqual(requeue_stale(timedelta(minutes=10)), (1, 1))
+        for job in (vivo, parado, esgotado):
+            job.refresh_from_db()
+        self.assertEqual((vivo.status, vivo.attempts), ("running", 0))
+        self.assertEqual((parado.status, parado.attempts), ("queued", 1))
+        self.assertEqual((esgotado.status, esgotado.attempts), ("failed", 3))
+
+    def test_um_job_ativo_por_chave_no_banco(self):
+        job = enqueue("fetch_news", client_id=1)
+        self.assertEqual(enqueue("fetch_news", client_id=1), job)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Job.objects.create(kind="fetch_news", dedupe_key=job.dedupe_key)
+        # outro pedido ganhou a corrida: a consulta não viu o job, o insert esbarra nele
+        with mock.patch("newsclip.jobs._active_job", side_effect=[None, job]):
+            self.assertEqual(enqueue("fetch_news", client_id=1), job)
+
+        Job.objects.filter(pk=job.pk).update(status="done")
+        self.assertNotEqual(enqueue("fetch_news", client_id=1), job)
+
+    def test_progresso_conta_como_sinal_de_vida(self):
+        job = self.rodando(timedelta(minutes=20))
+        report_progress(job, 1, 2, "metade")
+        self.assertEqual(requeue_stale(timedelta(minutes=10)), (0, 0))
@@ -0,0 +1,67 @@
+# newsclip/topics.py
+#
+# Classificação de tópico por dicionário de palavras-chave (modelo Topic).
+# Todas as keywords de todos os tópicos vão para um único autômato
+# (KeywordMatcher), então um lote inteiro de textos é percorrido numa passada
+# só, sem acento e por palavra inteira, independente de quantos
+# tópicos/keywords existam.
+
+from bisect import bisect_right
+from collections import Counter
+
+from newsclip.clustering import normalize_text
+from newsclip.matching import KeywordMatcher, client_keywords, tokenize
+from newsclip.models import Topic
+
+
+UNCLASSIFIED = "Sem classificação"
+# entre um texto e outro no lote: não é palavra (\w), então nenhuma keyword o contém
+_SEPARATOR = "\x00"
+
+
+def story_text(story):
+    """O que é classificado: título e resumo (sem o sufixo do portal nem o resumo que só repete o título)"""
+    return normalize_text(story.title, story.summary)
+
+
+class TopicClassifier:
+    """Tópico com mais ocorrências de keywords; empate fica com o tópico cadastrado antes"""
+
+    def __init__(self, topics):
+        self.names = []
+        self._matcher = KeywordMatcher()
+        for i, topic in enumerate(topics):
+            self.names.append(topic.name)
+            # mesmo formato das keywords de cliente: separadas por vírgula
+            for kw in client_keywords(topic):
+                self._matcher.add(kw, i)
+        self._matcher.build()
+
+    @classmethod
+    def from_db(cls):
+        return cls(Topic.objects.filter(active=True).order_by("id"))
+
+    def classify(self, text):
+        return self.classify_many([text])[0]
+
+    def classify_many(self, texts):
+        """
+        Lista de tópicos, na mesma ordem dos textos. Os textos viram uma única
+        sequência de tokens, com um separador entre eles, e o autômato passa
+        por ela uma vez só; cada ocorrência conta para o texto onde terminou.
+        """
+        tokens, starts = [], []
+        for text in texts:
+            starts.append(len(tokens))
+            tokens += tokenize(text)
+            tokens.append(_SEPARATOR)
+        scores = [Counter() for _ in starts]
+        for pos, topic in self._matcher.iter_positions(tokens):
+            scores[bisect_right(starts, pos) - 1][topic] += 1
+        return [self._best(s) for s in scores]
+
+    def _best(self, scores):
+        if not scores:
+            return UNCLASSIFIED
+        best = max(scores.values())
+        return self.names[min(i for i, n in scores.items() if n == best)]
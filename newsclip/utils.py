@@ -2,16 +2,22 @@
 
 import re
 import hashlib
+import threading
 from pathlib import Path
-from collections import Counter
+from collections import Counter, defaultdict
 from django.conf import settings
-from django.db import IntegrityError
+from django.db import transaction
 from django.utils import timezone as dj_timezone
 from googlesearch import search
 from dateutil import parser as date_parser
 
 
-from newsclip.models import Article
+from newsclip.canonical import url_key
+from newsclip.models import Article, Client, Story
+from newsclip.clustering import ClusterIndex, article_simhash
+from newsclip.rollup import apply_deltas, article_deltas
+from newsclip.search import index_stories
+from newsclip.topics import TopicClassifier, story_text
 
 
 # —————————————————————————————————————————
@@ -44,63 +50,166 @@ def buscar_com_google(queries: list[str], num_results: int = 10) -> list[str]:
 
 
 # —————————————————————————————————————————
-# 3) Classificação de tópico simples
+# 3) Classificação de tópico: ver newsclip.topics (dicionários em Topic)
 # —————————————————————————————————————————
 
-class SimpleTopicClassifier:
-    def __init__(self):
-        self.topic_keywords = {
-            "Política": ["presidente","governo","ministro","senado","câmara","política"],
-            "Economia": ["economia","inflação","juros","pib","comércio","financeiro"],
-            "Esportes": ["jogo","time","futebol","campeonato","esportes","olímpico"],
-            "Tecnologia": ["tecnologia","startup","inovação","software","hardware","internet"],
-            "Cultura": ["cultura","música","filme","arte","literatura","teatro"],
-            "Saúde": ["saúde","hospital","vacina","doença","médico","tratamento"],
-        }
-
-    def classify(self, text: str) -> str:
-        text_low = text.lower()
-        scores = {
-            topic: sum(text_low.count(kw) for kw in kws)
-            for topic, kws in self.topic_keywords.items()
-        }
-        best, val = max(scores.items(), key=lambda x: x[1])
-        return best if val > 0 else "Sem classificação"
-
-_topic_clf = SimpleTopicClassifier()
-
-
 # —————————————————————————————————————————
 # 4) Salvamento de artigos no banco
 # —————————————————————————————————————————
 
-def save_article(client, title, url, raw_date, source):
+def parse_date(raw_date):
     # converte raw_date em datetime
-    dt = None
-    if raw_date:
-        try:
-            parsed = date_parser.parse(raw_date)
-            dt = parsed if parsed.tzinfo else dj_timezone.make_aware(
-                parsed, dj_timezone.get_current_timezone()
-            )
-        except Exception:
-            dt = None
-
+    if not raw_date:
+        return None
     try:
-        Article.objects.create(
-            client=client,
-            title=title[:300],
-            url=url,
-            published_at=dt,
-            source=(source or "")[:200],
-            summary=generate_summary(title),
-            topic=_topic_clf.classify(title),
+        parsed = date_parser.parse(raw_date)
+        return parsed if parsed.tzinfo else dj_timezone.make_aware(
+            parsed, dj_timezone.get_current_timezone()
         )
-    except IntegrityError:
-        # já existe
-        pass
+    except Exception:
+        return None
 
-#
 
+def build_story(title, url, raw_date, source):
+    """Monta (sem salvar) a Story com o resumo; o tópico é classificado em lote pelo ArticleWriter"""
+    return Story(
+        title=title[:300],
+        url=url,
+        url_key=url_key(url),
+        published_at=parse_date(raw_date),
+        source=(source or "")[:200],
+        summary=generate_summary(title),
+    )
 
 
+def save_article(client, title, url, raw_date, source):
+    with ArticleWriter(batch_size=1) as writer:
+        writer.add(client, title, url, raw_date, source)
+
+
+class ArticleWriter:
+    """
+    Acumula artigos em memória e grava em lotes, dentro de uma transação.
+    A notícia (Story) é gravada uma vez por URL, com resumo, tópico e grupo
+    calculados só para as novas; cada cliente que casou com ela ganha apenas
+    a ligação (Article). Pode ser usado por várias threads ao mesmo tempo.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.inserted   = 0
+        self.duplicates = 0
+        self.stats      = defaultdict(Counter)  # client_id -> inserted/duplicates
+        self.origins    = defaultdict(Counter)  # origin (fonte, ver newsclip.metrics) -> idem
+        self._buffer    = []
+        self._lock      = threading.Lock()
+        self.clusters   = None  # ClusterIndex, carregado no primeiro flush
+        self.topics     = None  # TopicClassifier, idem
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def add(self, client, title, url, raw_date, source, origin=None):
+        with self._lock:
+            self._buffer.append((client.id, title, url, raw_date, source, origin))
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+
+        # duplicatas dentro do próprio lote (http e https contam como a mesma): fica a primeira
+        unique = {}
+        for client_id, title, url, raw_date, source, origin in batch:
+            key = url_key(url)
+            if (client_id, key) in unique:
+                self._count(client_id, "duplicates", origin)
+            else:
+                unique[client_id, key] = (title, url, raw_date, source, origin)
+
+        with transaction.atomic():
+            # trava os clientes do lote (em ordem de id, sem deadlock): outro writer
+            # dos mesmos clientes espera o commit, então o que não está em
+            # `existing` é inserido por este lote e só isso entra no rollup
+            list(
+                Client.objects.select_for_update()
+                .filter(pk__in={c for c, _ in unique}).order_by("pk").values_list("pk", flat=True)
+            )
+            keys = list({key for _, key in unique})
+            stories = self._stories_by_key(keys)
+
+            # notícias novas: resumo/tópico/grupo só uma vez por URL
+            new = {}
+            for (_, key), (title, url, raw_date, source, _) in unique.items():
+                if key not in stories and key not in new:
+                    new[key] = build_story(title, url, raw_date, source)
+            if new:
+                self._classify(new.values())
+                self._assign_clusters(new.values())
+                # ignore_conflicts não devolve ids: relê as recém-criadas
+                Story.objects.bulk_create(
+                    new.values(), batch_size=self.batch_size, ignore_conflicts=True
+                )
+                created = self._stories_by_key(list(new))
+                stories.update(created)
+                index_stories(created.values())
+
+            existing = set(
+                Article.objects
+                .filter(
+                    client_id__in={c for c, _ in unique},
+                    story_id__in=[s.id for s in stories.values()],
+                )
+                .values_list("client_id", "story_id")
+            )
+            to_create = []
+            for (client_id, key), (*_, origin) in unique.items():
+                story = stories[key]
+                if (client_id, story.id) in existing:
+                    self._count(client_id, "duplicates", origin)
+                else:
+                    to_create.append(Article(
+                        client_id=client_id, story=story, published_at=story.published_at,
+                    ))
+                    self._count(client_id, "inserted", origin)
+            Article.objects.bulk_create(
+                to_create, batch_size=self.batch_size, ignore_conflicts=True
+            )
+            apply_deltas(article_deltas(to_create))
+
+    @staticmethod
+    def _stories_by_key(keys):
+        # url_key não é única (histórico anterior à chave): fica a notícia mais antiga
+        stories = {}
+        for story in Story.objects.filter(url_key__in=keys).order_by("-id"):
+            stories[story.url_key] = story
+        return stories
+
+    def _classify(self, stories):
+        if self.topics is None:
+            self.topics = TopicClassifier.from_db()
+        for story, topic in zip(stories, self.topics.classify_many(story_text(s) for s in stories)):
+            story.topic = topic
+
+    def _assign_clusters(self, stories):
+        # o índice dos últimos dias é carregado uma vez por writer (por execução)
+        if self.clusters is None:
+            self.clusters = ClusterIndex.recent()
+        for story in stories:
+            story.simhash = article_simhash(story)
+            story.cluster = self.clusters.assign(story.simhash)
+
+    def _count(self, client_id, kind, origin=None):
+        setattr(self, kind, getattr(self, kind) + 1)
+        self.stats[client_id][kind] += 1
+        if origin is not None:
+            self.origins[origin][kind] += 1
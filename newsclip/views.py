@@ -1,6 +1,7 @@
 # newsclip/views.py
 import os
 import json
+import hashlib
 import pathlib
 from .forms import ReportForm
 from django.contrib import messages
@@ -16,12 +17,10 @@ from django.contrib.auth.forms import UserCreationForm
 from django.views.generic import CreateView, UpdateView, ListView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.http import JsonResponse
-from django.core.management.base import BaseCommand
-from django.core.management import call_command
 
 from django.views.decorators.http import require_POST 
-from django.db.models import Count
-from django.db.models.functions import TruncDate
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import RowNumber, TruncDate
 from django.urls import reverse
 from .models import Client, Article
 from django.utils.text import slugify
@@ -29,7 +28,19 @@ from django.utils.text import slugify
 from newsclip.models import Article
 from django.utils import timezone
 from datetime import timedelta
-from newsclip.management.commands.fetch_news import buscar_noticias_para_cliente
+from newsclip.jobs import enqueue, job_status
+from newsclip.models import Job, ArticleDailyStat
+from newsclip.rollup import set_excluded
+from newsclip.pagination import InvalidCursor, keyset_page
+from newsclip.search import search_articles
+from newsclip.clustering import collapse_clusters
+from newsclip.metrics import prometheus_text, source_health
+from newsclip.models import FetchRun
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import urlencode
 
 # 1) Cadastro de usuário
 class SignUpView(CreateView):
@@ -43,7 +54,7 @@ class SignUpView(CreateView):
 class ClientCreateView(LoginRequiredMixin, CreateView):
     model = Client
     # Remova "users" da lista!
-    fields = ["name", "keywords", "domains", "instagram", "x", "youtube"]
+    fields = ["name", "keywords", "domains", "sources", "instagram", "x", "youtube"]
     template_name = "newsclip/client_form.html"
     success_url = reverse_lazy("dashboard")
 
@@ -56,7 +67,7 @@ class ClientCreateView(LoginRequiredMixin, CreateView):
 class ClientUpdateView(UpdateView):
     model = Client
     # Remova "users" da lista!
-    fields = ["name", "keywords", "domains", "instagram", "x", "youtube"]
+    fields = ["name", "keywords", "domains", "sources", "instagram", "x", "youtube"]
     template_name = "newsclip/client_form.html"
     success_url = reverse_lazy("dashboard")
 
@@ -66,46 +77,114 @@ class ClientUpdateView(UpdateView):
             self.object.users.add(self.request.user)
         return response
 
-class BuscarTodasNoticiasView(ListView):
+class BuscarTodasNoticiasView(LoginRequiredMixin, ListView):
     template_name = 'newsclip/todas_noticias.html'
     context_object_name = 'clientes'
 
-    def get(self, request, *args, **kwargs):
-        # Busca novas notícias para todos os clientes antes de exibir
-        clientes = Client.objects.all()
-        for cliente in clientes:
-            buscar_noticias_para_cliente(cliente)
-        return super().get(request, *args, **kwargs)
+    def post(self, request, *args, **kwargs):
+        # Agenda a busca de novas notícias para todos os clientes; a página acompanha o job
+        job = enqueue("fetch_news", user=request.user)
+        return redirect(f"{reverse('buscar_todas_noticias')}?{urlencode({'job': job.pk})}")
+
+    # quantas notícias de cada cliente aparecem antes do "ver mais"
+    noticias_por_cliente = 5
 
     def get_queryset(self):
-        return Client.objects.all().order_by('name')
+        return Client.objects.annotate(total=Count("articles")).order_by('name')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         clientes = context['clientes']
+
+        # as N mais recentes de todos os clientes numa única consulta:
+        # ROW_NUMBER() numerado por cliente, filtrado em rn <= N
+        recentes = {}
+        top = (
+            Article.objects
+            .filter(client_id__in=[c.pk for c in clientes])
+            .select_related("story")
+            .annotate(rn=Window(
+                RowNumber(),
+                partition_by=F("client_id"),
+                order_by=[F("published_at").desc(), F("id").desc()],
+            ))
+            .filter(rn__lte=self.noticias_por_cliente)
+            .order_by("client_id", "rn")
+        )
+        for artigo in top:
+            recentes.setdefault(artigo.client_id, []).append(artigo)
+
         clientes_noticias = []
         for cliente in clientes:
-            artigos = Article.objects.filter(client=cliente).order_by('-published_at')[:5]  # Só 5!
-            total = Article.objects.filter(client=cliente).count()
             clientes_noticias.append({
                 'cliente': cliente,
-                'noticias': artigos,
-                'total': total,
+                'noticias': recentes.get(cliente.pk, []),
+                'total': cliente.total,
             })
         context['clientes_noticias'] = clientes_noticias
+        job_id = self.request.GET.get("job", "")
+        context['job'] = Job.objects.filter(pk=job_id, kind="fetch_news").first() if job_id.isdigit() else None
         return context
 
+# API de notícias: páginas por cursor, tamanho limitado e só os campos pedidos
+API_PAGE_SIZE     = 50
+API_MAX_PAGE_SIZE = 200
+# nome do campo na API -> caminho no ORM (o texto da notícia fica em Story)
+API_FIELDS        = {
+    "id": "id",
+    "title": "story__title",
+    "source": "story__source",
+    "published_at": "published_at",
+    "url": "story__url",
+    "topic": "story__topic",
+    "summary": "story__summary",
+    "excluded": "excluded",
+}
+API_DEFAULT_FIELDS = ["title", "source", "published_at", "url"]
+
+
+@login_required
 def noticias_cliente_json(request, pk):
-        artigos = Article.objects.filter(client_id=pk).order_by('-published_at')
-        dados = []
-        for artigo in artigos:
-            dados.append({
-                "title": artigo.title,
-                "source": artigo.source,
-                "published_at": artigo.published_at.strftime("%d/%m/%Y %H:%M"),
-                "url": artigo.url
-            })
-        return JsonResponse({"noticias": dados})
+    """
+    Notícias visíveis do cliente, da mais nova para a mais antiga, em páginas:
+    ?limit=N (máx. API_MAX_PAGE_SIZE), ?cursor=<next_cursor da página anterior>
+    e ?fields=title,url,… Responde 304 quando o ETag não mudou.
+    """
+    client = get_object_or_404(Client, pk=pk)
+    if not (request.user.is_superuser or request.user in client.users.all()):
+        return HttpResponseForbidden()
+    try:
+        limit = min(max(int(request.GET.get("limit", API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"error": "limit inválido"}, status=400)
+    fields = [f for f in request.GET.get("fields", "").split(",") if f] or API_DEFAULT_FIELDS
+    if set(fields) - API_FIELDS.keys():
+        return JsonResponse({"error": f"Campos inválidos: {', '.join(sorted(set(fields) - API_FIELDS.keys()))}"}, status=400)
+
+    try:
+        rows, next_cursor = keyset_page(
+            Article.objects.filter(client=client, excluded=False),
+            cursor=request.GET.get("cursor"),
+            limit=limit,
+            fields=[API_FIELDS[f] for f in fields],
+        )
+    except InvalidCursor:
+        return JsonResponse({"error": "cursor inválido"}, status=400)
+
+    dados = []
+    for row in rows:
+        if row["published_at"]:
+            row["published_at"] = timezone.localtime(row["published_at"]).strftime("%d/%m/%Y %H:%M")
+        dados.append({f: row[API_FIELDS[f]] for f in fields})
+    body = {"noticias": dados, "next_cursor": next_cursor}
+
+    response = JsonResponse(body)
+    # só ETag: uma data (created_at) não muda quando um artigo é excluído
+    etag = quote_etag(hashlib.md5(response.content).hexdigest())
+    response["ETag"] = etag
+    # o widget sempre revalida, mas quase sempre recebe só um 304
+    response["Cache-Control"] = "private, no-cache"
+    return get_conditional_response(request, etag=etag, response=response)
 
 
 @login_required
@@ -120,22 +199,38 @@ from django.http import HttpResponseForbidden
 from django.db.models import Count
 from django.db.models.functions import TruncDate
 
+CLIENT_NEWS_MAX_PAGE_SIZE = 100
+
+
+def client_news_queryset(client, sort="date-desc"):
+    """Artigos visíveis do cliente na ordem da listagem (também usado pelo bench_article_queries)"""
+    qs = Article.objects.filter(client=client, excluded=False).select_related("story")
+    # id desempata artigos com o mesmo horário, para as páginas não se sobreporem
+    if sort == "date-asc":
+        return qs.order_by("published_at", "id")
+    if sort == "source":
+        return qs.order_by("story__source", "-published_at", "-id")
+    return qs.order_by("-published_at", "-id")
+
+
 @login_required
 def client_news(request, client_id):
     client = get_object_or_404(Client, id=client_id)
 
     # 1) page_size e ordenação
-    page_size   = int(request.GET.get("page_size", 20))
+    try:
+        page_size = min(max(int(request.GET.get("page_size", 20)), 1), CLIENT_NEWS_MAX_PAGE_SIZE)
+    except ValueError:
+        page_size = 20
     page_number = request.GET.get("page")
     sort        = request.GET.get("sort", "date-desc")
 
-    qs = Article.objects.filter(client=client, excluded=False)
-    if sort == "date-asc":
-        qs = qs.order_by("published_at")
-    elif sort == "source":
-        qs = qs.order_by("source", "-published_at")
-    else:
-        qs = qs.order_by("-published_at")
+    qs = client_news_queryset(client, sort)
+
+    # uma linha por notícia, juntando as cópias publicadas por vários portais
+    collapse = request.GET.get("collapse") == "1"
+    if collapse:
+        qs = collapse_clusters(qs).order_by(*qs.query.order_by)
 
     # Aqui entra o processamento do POST!
     if request.method == "POST":
@@ -145,23 +240,42 @@ def client_news(request, client_id):
             messages.warning(request, "Selecione pelo menos uma notícia.")
             return redirect(request.path)
         if acao == "excluir":
-            Article.objects.filter(id__in=ids).update(excluded=True)
+            set_excluded(Article.objects.filter(id__in=ids), True)
         elif acao == "manter":
-            Article.objects.filter(id__in=ids).update(excluded=False)
+            set_excluded(Article.objects.filter(id__in=ids), False)
         return redirect(request.path)
 
-    # 2) paginação
-    page = Paginator(qs, page_size).get_page(page_number)
+    # busca textual: resultados por relevância, paginados por cursor
+    q = request.GET.get("q", "").strip()
+    next_cursor = None
+    if q:
+        try:
+            results, next_cursor = search_articles(
+                client.id, q, cursor=request.GET.get("cursor"), limit=page_size
+            )
+        except InvalidCursor:
+            return redirect(f"{request.path}?{urlencode({'q': q})}")
 
-    # 3) para os gráficos, precisa do QS completo (sem paginar nem NULLs)
-    qs_all = qs.exclude(published_at__isnull=True)
+    # 2) gráficos, total e fontes vêm do rollup diário (ArticleDailyStat),
+    #    que não cresce com o número de artigos do cliente
+    stats = ArticleDailyStat.objects.filter(client=client, count__gt=0)
+    visible = stats.filter(excluded=False)
+
+    # 3) paginação: o total vem do rollup em vez de um COUNT em Article
+    if q:
+        page = results
+    else:
+        paginator = Paginator(qs, page_size)
+        if not collapse:
+            paginator.count = visible.aggregate(total=Sum("count"))["total"] or 0
+        page = paginator.get_page(page_number)
 
     # artigos por dia
     daily_qs = (
-        qs_all
-        .annotate(day=TruncDate("published_at"))
+        visible
+        .exclude(day__isnull=True)
         .values("day")
-        .annotate(count=Count("id"))
+        .annotate(count=Sum("count"))
         .order_by("day")
     )
     daily_labels = [d["day"].strftime("%d/%m") for d in daily_qs]
@@ -169,9 +283,10 @@ def client_news(request, client_id):
 
     # top 5 fontes
     top_sources = (
-        qs_all
+        visible
+        .exclude(day__isnull=True)
         .values("source")
-        .annotate(count=Count("id"))
+        .annotate(count=Sum("count"))
         .order_by("-count")[:5]
     )
     source_labels = [s["source"] for s in top_sources]
@@ -187,11 +302,14 @@ def client_news(request, client_id):
         "articles": page,
         "page_size": page_size,
         "sort": sort,
+        "collapse": collapse,
+        "q": q,
+        "next_cursor": next_cursor,
         "selected_source": request.GET.get("source", ""),
         "page_size_options": [10, 20, 50],
-        "sources": Article.objects.filter(client=client)
-                          .values_list("source", flat=True)
-                          .distinct(),
+        "sources": stats.order_by("source")
+                        .values_list("source", flat=True)
+                        .distinct(),
     }
     return render(request, "newsclip/client_news.html", context)
 
@@ -213,12 +331,19 @@ def bulk_update_news(request, client_id):
     # aqui definimos o queryset corretamente
     articles_qs = Article.objects.filter(client=client, id__in=ids)
 
+    # na lista agrupada, cada linha representa o grupo inteiro de cópias
+    if request.POST.get("collapse") == "1":
+        clusters = articles_qs.exclude(story__cluster__isnull=True).values("story__cluster")
+        articles_qs = Article.objects.filter(client=client).filter(
+            Q(id__in=ids) | Q(story__cluster__in=clusters)
+        )
+
     # aplica a atualização
     if action == "exclude":
-        updated = articles_qs.update(excluded=True)
+        updated = set_excluded(articles_qs, True)
         verb = "excluídos"
     else:
-        updated = articles_qs.update(excluded=False)
+        updated = set_excluded(articles_qs, False)
         verb = "marcados como mantidos"
 
     # se veio via AJAX, devolve JSON
@@ -236,13 +361,41 @@ def bulk_update_news(request, client_id):
 def fetch_news_view(request, client_id):
     if request.method != "POST":
         return HttpResponseBadRequest("Método inválido")
-    # chama sincronamente o management command
-    call_command("fetch_news", "--client-id", str(client_id))
+    client = get_object_or_404(Client, id=client_id)
+    # a busca roda no worker (run_jobs); a página acompanha pelo endpoint de status
+    job = enqueue("fetch_news", client=client, user=request.user, client_id=client.id)
 
     if request.headers.get("x-requested-with") == "XMLHttpRequest":
-        return JsonResponse({"status": "ok"})
+        return JsonResponse({
+            **job_status(job),
+            "status_url": reverse("job_status", args=[job.pk]),
+        }, status=202)
+    messages.info(request, "Busca de notícias agendada.")
     return redirect("client_news", client_id=client_id)
 
+@staff_member_required
+def fetch_runs_view(request):
+    """Painel das coletas: últimas execuções e saúde de cada fonte"""
+    return render(request, "newsclip/fetch_runs.html", {
+        "runs": FetchRun.objects.all()[:20],
+        "sources": source_health(runs=20),
+    })
+
+def metrics_view(request):
+    """Métricas da última coleta no formato de texto do Prometheus"""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    auth = request.headers.get("Authorization", "")
+    if not (request.user.is_staff or (token and constant_time_compare(auth, f"Bearer {token}"))):
+        return HttpResponseForbidden()
+    return HttpResponse(prometheus_text(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@login_required
+def job_status_view(request, job_id):
+    job = get_object_or_404(Job, pk=job_id)
+    if job.client and not (request.user.is_superuser or request.user in job.client.users.all()):
+        return HttpResponseForbidden()
+    return JsonResponse(job_status(job))
+
 @login_required
 def client_reports(request, client_id):
     client = get_object_or_404(Client, pk=client_id)
@@ -284,11 +437,18 @@ def bulk_update_news(request, client_id):
     # **Aqui** definimos o queryset corretamente
     articles_qs = Article.objects.filter(client=client, id__in=ids)
 
+    # na lista agrupada, cada linha representa o grupo inteiro de cópias
+    if request.POST.get("collapse") == "1":
+        clusters = articles_qs.exclude(story__cluster__isnull=True).values("story__cluster")
+        articles_qs = Article.objects.filter(client=client).filter(
+            Q(id__in=ids) | Q(story__cluster__in=clusters)
+        )
+
     if action == "exclude":
-        updated = articles_qs.update(excluded=True)
+        updated = set_excluded(articles_qs, True)
         verb = "excluídos"
     else:
-        updated = articles_qs.update(excluded=False)
+        updated = set_excluded(articles_qs, False)
         verb = "marcados como mantidos"
 
     # Se for AJAX, devolve JSON
@@ -321,12 +481,15 @@ def generate_report_view(request, client_id):
             else:
                 label = f"últimos {days_str} dias"
 
-            # Chama o comando passando days_str (string) para podermos tratar "all"
-            call_command(
+            # Agenda o comando passando days_str (string) para podermos tratar "all"
+            enqueue(
                 "generate_report",
+                client=client,
+                user=request.user,
                 client_id=client_id,
                 days=days_str,
-                format=out_format
+                format=out_format,
+                collapse=form.cleaned_data["collapse"],
             )
 
             messages.success(
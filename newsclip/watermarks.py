@@ -0,0 +1,46 @@
+# newsclip/watermarks.py
+#
+# Coleta incremental das APIs por cliente (NewsData, NewsAPI): guarda até
+# quando cada fonte já foi buscada e a execução seguinte pede só o que veio
+# depois, com uma folga, em vez dos LOOKBACK_DAYS inteiros. Cliente novo, ou
+# com keywords/domínios alterados, volta a buscar a janela completa.
+# Feeds RSS e o Google News não passam por aqui: o FeedState de cada feed já
+# guarda a última entrada vista (e a URL do Google muda com as keywords).
+
+import hashlib
+from datetime import timedelta, timezone
+
+from django.conf import settings
+
+from newsclip.matching import client_keywords
+from newsclip.models import FetchWatermark
+
+
+def client_signature(client):
+    """Muda quando muda o que as APIs recebem na busca do cliente"""
+    parts = [*sorted(client_keywords(client)), "|", client.domains or ""]
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+
+def window_start(client, source, full_since):
+    """
+    Início da janela de busca de `source` para o cliente: a última busca bem
+    sucedida menos FETCH_WINDOW_OVERLAP_HOURS, nunca antes de `full_since`.
+    Datas em UTC sem tz, como o fetch_news usa.
+    """
+    mark = FetchWatermark.objects.filter(client=client, source=source).first()
+    if mark is None or mark.signature != client_signature(client):
+        return full_since
+    overlap = timedelta(hours=getattr(settings, "FETCH_WINDOW_OVERLAP_HOURS", 2))
+    since = mark.fetched_until.astimezone(timezone.utc).replace(tzinfo=None) - overlap
+    return max(since, full_since)
+
+
+def save_watermarks(client, fetched):
+    """`fetched`: {fonte: início da execução (UTC sem tz)} das buscas que deram certo"""
+    signature = client_signature(client)
+    for source, until in fetched.items():
+        FetchWatermark.objects.update_or_create(
+            client=client, source=source,
+            defaults={"fetched_until": until.replace(tzinfo=timezone.utc), "signature": signature},
+        )
@@ -28,6 +28,6 @@ class MonthlyReportView(TemplateView):
         ctx['valor_total'] = entries.aggregate(v=Sum('valor_cm'))['v'] or 0
 
         # Tabela completa
-        ctx['entries'] = entries.select_related('article')
+        ctx['entries'] = entries.select_related('article__story')
         return ctx
 